@@ -0,0 +1,109 @@
+"""
+KRX CSV 원본 응답 디스크 캐시
+
+- OTP payload 전체 항목(url, 날짜, 시장, share / money 단위, locale 등)으로 키 생성
+- 응답 원본(euc-kr bytes)을 gzip 으로 압축하여 {CACHE_DIR}/{key[:2]}/{key}.csv.gz 에 저장
+- 첫 줄이 CSV 헤더인 응답만 저장 (빈 응답, KRX 오류 / 로그아웃 페이지는 저장하지 않음)
+- 오늘 이후 날짜가 포함된 요청은 데이터가 바뀔 수 있으므로 저장하지 않음
+
+캐시 모드 (환경변수 KRX_CACHE_MODE)
+    off    : 캐시 사용 안함
+    on     : 캐시에 있으면 사용, 없으면 KRX 에서 받아 저장 (기본값)
+    replay : 캐시에 있는 데이터만 사용 (KRX 요청 없음)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+
+CACHE_DIR = os.getenv("KRX_CACHE_DIR", r"D:\python_proj\venv_stock\krx_cache")
+CACHE_MODE = os.getenv("KRX_CACHE_MODE", "on")
+CACHE_MODES = ("off", "on", "replay")
+
+# 요청 기준일 항목 (가장 늦은 날짜가 오늘 이전이어야 캐시 저장)
+DATE_FIELDS = ("trdDd", "endDd")
+
+
+def cache_key(payload):
+    key_src = {k: str(v) for k, v in payload.items()}
+    return hashlib.sha256(json.dumps(key_src, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def is_csv(raw):
+    """KRX CSV 응답인지 (euc-kr 헤더 줄에 컬럼이 2개 이상, HTML / 오류 문구가 아님)"""
+    if not raw or not raw.strip():
+        return False
+    try:
+        header = raw.lstrip().split(b"\n", 1)[0].decode("euc-kr").strip()
+    except UnicodeDecodeError:
+        return False
+    if header.startswith("<"):
+        return False
+    columns = [col.strip().strip('"') for col in header.split(",")]
+    return len(columns) >= 2 and all(columns)
+
+
+def is_final(payload, today=None):
+    """요청 구간이 모두 과거 날짜인지 (다시 받아도 바뀌지 않는 데이터인지)"""
+    today = today or datetime.now().strftime("%Y%m%d")
+    dates = [str(payload[k]).replace("-", "") for k in DATE_FIELDS if k in payload]
+    return bool(dates) and max(dates) < today
+
+
+class KrxCache:
+
+    def __init__(self, cache_dir=CACHE_DIR, mode=CACHE_MODE):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"KRX_CACHE_MODE 값이 잘못되었습니다: {mode} (가능한 값: {CACHE_MODES})")
+        self.cache_dir = cache_dir
+        self.mode = mode
+
+    @property
+    def replay_only(self):
+        return self.mode == "replay"
+
+    def path(self, payload):
+        key = cache_key(payload)
+        return os.path.join(self.cache_dir, key[:2], f"{key}.csv.gz")
+
+    def get(self, payload):
+        file_path = self.path(payload)
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with gzip.open(file_path, "rb") as f:
+                return f.read()
+        except (OSError, EOFError) as e:
+            print(f"⚠️ 캐시 파일 읽기 실패, 무시합니다: {file_path} ({e})")
+            return None
+
+    def put(self, payload, raw):
+        if self.replay_only or not raw or not is_final(payload):
+            return
+        if not is_csv(raw):
+            print(f"⚠️ CSV 응답이 아니므로 캐시에 저장하지 않습니다: {payload.get('url')} {raw[:80]!r}")
+            return
+        file_path = self.path(payload)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        # 임시 파일에 쓴 뒤 교체하여 동시 실행 중에도 깨진 파일이 보이지 않도록 함
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(raw))
+            os.replace(tmp_path, file_path)
+        except OSError as e:
+            print(f"⚠️ 캐시 저장 실패: {file_path} ({e})")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def get_cache():
+    """환경변수 설정 기준 캐시 객체. off 이면 None"""
+    if CACHE_MODE == "off":
+        return None
+    return KrxCache(CACHE_DIR, CACHE_MODE)
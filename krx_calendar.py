@@ -0,0 +1,98 @@
+"""
+거래일 캘린더 (tb_work_day) 공용 모듈
+
+- tb_work_day 를 프로세스당 한번만 읽어 배열로 보관
+- 기준일 순번, N 거래일 전/후, N 거래일 구간, 기간 내 거래일을 DB 조회 없이 계산
+
+사용 예)
+    from krx_calendar import get_calendar
+
+    cal = get_calendar(engine)
+    cal.seq("20250404")          # WORK_SEQ
+    cal.shift("20250404", 1)     # 다음 거래일
+    cal.window("20250404", 7)    # 기준일 포함 과거 7거래일 (오름차순)
+    cal.range("20250401", "20250430")
+"""
+
+import threading
+import bisect
+
+import numpy as np
+
+from stockdb import get_engine, repository
+
+
+WORK_DIV = "stock"
+
+
+class TradingCalendar:
+
+    def __init__(self, days, seqs):
+        self.days = np.asarray(days, dtype=object)
+        self.seqs = np.asarray(seqs, dtype=np.int64)
+        self._day_list = list(self.days)
+        self._index = {day: i for i, day in enumerate(self._day_list)}
+
+    @classmethod
+    def load(cls, engine):
+        rows = repository.load_work_days(engine, WORK_DIV)
+        return cls([str(day) for day, _ in rows], [seq for _, seq in rows])
+
+    def __len__(self):
+        return len(self._day_list)
+
+    def __contains__(self, day):
+        return day in self._index
+
+    def _pos(self, day):
+        try:
+            return self._index[day]
+        except KeyError:
+            raise ValueError(f"{day} 은(는) 거래일(tb_work_day)이 아닙니다.") from None
+
+    @property
+    def last_day(self):
+        return self._day_list[-1] if self._day_list else None
+
+    def seq(self, day):
+        """거래일의 WORK_SEQ"""
+        return int(self.seqs[self._pos(day)])
+
+    def day(self, seq):
+        """WORK_SEQ 의 거래일 (없으면 None)"""
+        pos = int(np.searchsorted(self.seqs, seq))
+        if pos < len(self.seqs) and self.seqs[pos] == seq:
+            return self._day_list[pos]
+        return None
+
+    def shift(self, day, n, clip=False):
+        """n 거래일 후(음수면 전)의 거래일. 범위를 벗어나면 None (clip=True 면 양 끝 거래일)"""
+        pos = self._pos(day) + n
+        if clip:
+            pos = min(max(pos, 0), len(self._day_list) - 1)
+        elif pos < 0 or pos >= len(self._day_list):
+            return None
+        return self._day_list[pos]
+
+    def window(self, day, n):
+        """기준일 포함 과거 n 거래일 (오름차순). 이력이 부족하면 있는 만큼만 반환"""
+        end = self._pos(day) + 1
+        return self._day_list[max(end - n, 0):end]
+
+    def range(self, from_date, to_date):
+        """from_date ~ to_date 사이의 거래일 (오름차순, 양 끝 포함)"""
+        lo = bisect.bisect_left(self._day_list, from_date)
+        hi = bisect.bisect_right(self._day_list, to_date)
+        return self._day_list[lo:hi]
+
+
+# 프로세스 공용 캘린더
+_calendar = None
+_calendar_lock = threading.Lock()
+
+def get_calendar(engine=None, refresh=False):
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None or refresh:
+            _calendar = TradingCalendar.load(engine or get_engine())
+        return _calendar
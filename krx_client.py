@@ -0,0 +1,212 @@
+"""
+KRX 정보데이터시스템(data.krx.co.kr) CSV 다운로드 공용 클라이언트
+
+- generate.cmd(OTP 발급) → download.cmd(CSV 다운로드) 두 단계 요청을 fetch_csv 하나로 처리
+- keep-alive 세션 풀을 재사용하여 요청마다 새 연결을 맺지 않음
+- 동시 요청 수는 max_workers(환경변수 KRX_MAX_WORKERS) 로 제한
+- fetch_many 로 STK+KSQ, 7050+9000 처럼 서로 독립적인 요청을 한번에 받아옴
+- 과거 날짜 응답은 krx_cache 디스크 캐시에 저장하고, KRX_CACHE_MODE=replay 이면 캐시만 사용
+
+사용 예)
+    from krx_client import get_client, day_price_payload, MARKETS
+
+    client = get_client()
+    dfs = client.fetch_many([day_price_payload("20250404", mkt) for mkt, _ in MARKETS])
+"""
+
+import io
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from krx_cache import get_cache
+
+
+# KRX 다운로드 URL
+OTP_URL = "http://data.krx.co.kr/comm/fileDn/GenerateOTP/generate.cmd"
+DOWNLOAD_URL = "http://data.krx.co.kr/comm/fileDn/download_csv/download.cmd"
+
+# KRX 요청 헤더
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Referer": "http://data.krx.co.kr/contents/MDC/MDI/mdiLoader/index.cmd",
+}
+
+# 시장 구분 (mktId, 시장명)
+MARKETS = [("STK", "KOSPI"), ("KSQ", "KOSDAQ")]
+
+# 투자자 구분 : 기관합계 "7050", 외국인 "9000"
+INVESTOR_TYPES = ["7050", "9000"]
+
+# 동시 요청 수 / 타임아웃 / 재시도 기본값
+DEFAULT_MAX_WORKERS = int(os.getenv("KRX_MAX_WORKERS", "4"))
+REQUEST_TIMEOUT = 30  # seconds
+MAX_RETRIES = 3
+
+
+# --- 요청 payload 생성 함수 ---
+
+# 전종목 시세 (MDCSTAT01501)
+def day_price_payload(date, market="STK"):
+    return {
+        "mktId": market,
+        "trdDd": date,
+        "share": "1",
+        "money": "1",
+        "csvxls_isNo": "false",
+        "name": "fileDown",
+        "url": "dbms/MDC/STAT/standard/MDCSTAT01501"
+    }
+
+# 투자자별 순매수 상위종목 (MDCSTAT02401)
+def inv_net_buy_payload(start_date, end_date, market, investor_type):
+    return {
+        "locale": "ko_KR",
+        "mktId": market,  # ALL, STK: KOSPI, KSQ: KOSDAQ
+        "strtDd": start_date,
+        "endDd": end_date,
+        "invstTpCd": investor_type,
+        "csvxls_isNo": "false",
+        "name": "fileDown",
+        "share": "1",
+        "money": "1",
+        "url": "dbms/MDC/STAT/standard/MDCSTAT02401"
+    }
+
+# 전종목 기본정보 (MDCSTAT01901) : 표준코드(ISIN) / 단축코드
+def stock_info_payload(market="ALL"):
+    return {
+        "locale": "ko_KR",
+        "mktId": market,
+        "share": "1",
+        "csvxls_isNo": "false",
+        "name": "fileDown",
+        "url": "dbms/MDC/STAT/standard/MDCSTAT01901"
+    }
+
+# 개별종목 시세 추이 (MDCSTAT01701)
+def stock_history_payload(isu_cd, stock_cd, stock_nm, start_date, end_date):
+    return {
+        "tboxisuCd_finder_stkisu0_0": f"{stock_cd}/{stock_nm}",
+        "isuCd": isu_cd,
+        "strtDd": start_date.replace("-", ""),
+        "endDd": end_date.replace("-", ""),
+        "csvxls_isNo": "false",
+        "name": "fileDown",
+        "url": "dbms/MDC/STAT/standard/MDCSTAT01701"
+    }
+
+
+class KrxClient:
+    """세션 풀과 동시 요청 제한을 가진 KRX 다운로드 클라이언트"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, timeout=REQUEST_TIMEOUT, retries=MAX_RETRIES, cache=None):
+        self.max_workers = max(1, int(max_workers))
+        self.cache = cache
+        self.timeout = timeout
+        self.retries = retries
+        self._sessions = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+
+    def _new_session(self):
+        session = requests.Session()
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["POST"],
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(HEADERS)
+        return session
+
+    @contextmanager
+    def _session(self):
+        # 동시 요청 수 제한 후 풀에서 세션을 꺼내 쓰고 반납
+        with self._slots:
+            try:
+                session = self._sessions.get_nowait()
+            except queue.Empty:
+                session = self._new_session()
+            try:
+                yield session
+            finally:
+                self._sessions.put(session)
+
+    def fetch_csv(self, payload):
+        """OTP 발급 후 CSV 원본(euc-kr bytes)을 반환. 실패 시 None"""
+        if self.cache is not None:
+            raw = self.cache.get(payload)
+            if raw is not None:
+                return raw
+            if self.cache.replay_only:
+                print(f"⚠️ 캐시에 없는 요청입니다 (replay 모드): {payload.get('url')} {payload}")
+                return None
+
+        try:
+            with self._session() as session:
+                otp_resp = session.post(OTP_URL, data=payload, timeout=self.timeout)
+                if otp_resp.status_code != 200:
+                    print(f"Failed to get OTP: {otp_resp.status_code}")
+                    return None
+                otp_code = otp_resp.text.strip()
+
+                csv_resp = session.post(DOWNLOAD_URL, data={"code": otp_code}, timeout=self.timeout)
+                if csv_resp.status_code != 200:
+                    print(f"Failed to download CSV: {csv_resp.status_code}")
+                    return None
+        except requests.exceptions.RequestException as e:
+            print(f"❌ KRX 요청 실패: {e}")
+            return None
+
+        if csv_resp.content.strip() == b"":
+            print("CSV response is empty.")
+            return None
+
+        if self.cache is not None:
+            self.cache.put(payload, csv_resp.content)
+        return csv_resp.content
+
+    def fetch_df(self, payload):
+        """CSV 를 DataFrame 으로 반환. 실패 시 None"""
+        raw = self.fetch_csv(payload)
+        if raw is None:
+            return None
+        return pd.read_csv(io.BytesIO(raw), encoding="euc-kr")
+
+    def fetch_many(self, payloads, parse=True):
+        """여러 payload 를 동시에 요청. 결과 순서는 payloads 순서와 동일"""
+        payloads = list(payloads)
+        if not payloads:
+            return []
+        fetch = self.fetch_df if parse else self.fetch_csv
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(payloads))) as executor:
+            return list(executor.map(fetch, payloads))
+
+    def close(self):
+        while True:
+            try:
+                self._sessions.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# 프로세스 공용 클라이언트
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = KrxClient(cache=get_cache())
+        return _client
@@ -0,0 +1,124 @@
+"""
+일별 배치 상주 실행 (daemon)
+
+- 엔진, KRX 세션 풀, 거래일 캘린더를 한번 올려둔 채로 계속 실행 (스크립트별 재기동 없음)
+- 평일 장 마감 후 POLL_START ~ POLL_END 사이에 POLL_INTERVAL 간격으로 KRX 에 당일 자료 게시 여부 확인
+    전종목 시세(MDCSTAT01501) : KOSPI 거래량 합계가 0 보다 큼
+    투자자별 순매수(MDCSTAT02401) : 기관합계 자료가 1건 이상
+- 두 자료가 모두 올라오면 바로 krx_pipeline 전체 단계를 실행하고 다음 날까지 대기
+- POLL_END 까지 자료가 없으면(휴장일 등) 그날은 건너뜀
+
+실행 예)
+    python krx_daemon.py            # 상주 실행
+    python krx_daemon.py --once     # 오늘 자료 게시를 기다렸다가 한번 실행 후 종료
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from krx_client import get_client, day_price_payload, inv_net_buy_payload, INVESTOR_TYPES
+from krx_schema import STOCK_DAY_PRICE, INV_NET_BUY_DAY, parse_report
+from krx_calendar import get_calendar
+from krx_pipeline import create_pipeline_engine, run_pipeline
+
+
+# 게시 여부 확인 시간대 (HH:MM) 및 간격(초)
+POLL_START = os.getenv("DAEMON_POLL_START", "15:40")
+POLL_END = os.getenv("DAEMON_POLL_END", "20:00")
+POLL_INTERVAL = int(os.getenv("DAEMON_POLL_INTERVAL", "120"))
+
+# 대기 중 상태 확인 간격(초)
+IDLE_INTERVAL = 600
+
+
+def log(msg):
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {msg}", flush=True)
+
+
+def _at(day, hhmm):
+    hour, minute = map(int, hhmm.split(":"))
+    return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+
+# 당일 자료 게시 여부 (요청 2건)
+def is_published(base_dt, client=None):
+    client = client or get_client()
+    price_raw, inv_raw = client.fetch_many([
+        day_price_payload(base_dt, "STK"),
+        inv_net_buy_payload(base_dt, base_dt, "ALL", INVESTOR_TYPES[0]),
+    ], parse=False)
+
+    price_df = parse_report(STOCK_DAY_PRICE, price_raw, BASE_DT=base_dt, MRKT_DIV="KOSPI", STOCK_MNG=None)
+    if price_df is None or price_df["TRADE_QTY"].sum() == 0:
+        return False
+
+    inv_df = parse_report(INV_NET_BUY_DAY, inv_raw, BASE_DT=base_dt, INV_DIV=INVESTOR_TYPES[0])
+    return inv_df is not None
+
+
+# 자료가 올라올 때까지 확인. 게시되면 True, POLL_END 까지 없으면 False
+def wait_for_publish(base_dt, now=None):
+    now = now or datetime.now()
+    end_tm = _at(now, POLL_END)
+    while True:
+        try:
+            if is_published(base_dt):
+                log(f"[✔] {base_dt} KRX 자료 게시 확인")
+                return True
+        except Exception as e:
+            log(f"⚠️ 게시 여부 확인 실패: {e}")
+
+        if datetime.now() + timedelta(seconds=POLL_INTERVAL) > end_tm:
+            log(f"[!] {POLL_END} 까지 {base_dt} 자료가 없어 건너뜁니다. (휴장일 여부 확인)")
+            return False
+        log(f"[i] {base_dt} 자료 미게시, {POLL_INTERVAL}초 후 다시 확인")
+        time.sleep(POLL_INTERVAL)
+
+
+def run_day(base_dt, engine):
+    start = time.time()
+    status = run_pipeline(base_dt, engine=engine)
+    failed = [step for step, result in status.items() if result != "done"]
+    if failed:
+        log(f"[✖] {base_dt} 파이프라인 실패 단계: {failed}")
+    else:
+        log(f"[✔] {base_dt} 파이프라인 완료 ({time.time() - start:.1f}s)")
+    return not failed
+
+
+def run_daemon(once=False):
+    engine = create_pipeline_engine()
+    get_calendar(engine)
+    get_client()
+    log(f"[i] daemon 시작 (확인 시간대 {POLL_START} ~ {POLL_END}, 간격 {POLL_INTERVAL}초)")
+
+    last_dt = None
+    while True:
+        now = datetime.now()
+        base_dt = now.strftime("%Y%m%d")
+
+        if base_dt != last_dt and now.weekday() < 5 and _at(now, POLL_START) <= now < _at(now, POLL_END):
+            if wait_for_publish(base_dt, now):
+                run_day(base_dt, engine)
+            last_dt = base_dt
+            if once:
+                return
+
+        elif once and (base_dt == last_dt or now.weekday() >= 5 or now >= _at(now, POLL_END)):
+            log("[i] 오늘은 실행 대상 시간이 아닙니다.")
+            return
+
+        # 다음 확인 시각까지 대기
+        next_tm = _at(now, POLL_START)
+        if now >= next_tm:
+            next_tm += timedelta(days=1)
+        time.sleep(max(1, min(IDLE_INTERVAL, (next_tm - now).total_seconds())))
+
+
+if __name__ == "__main__":
+    try:
+        run_daemon(once="--once" in sys.argv[1:])
+    except KeyboardInterrupt:
+        log("[i] daemon 종료")
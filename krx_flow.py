@@ -0,0 +1,132 @@
+"""
+투자자별 순매수 N 거래일 구간 (tb_inv_net_buy_day)
+
+- load_window  : 기준일 포함 과거 N 거래일을 기간 범위 조회 1번으로 읽음 (long 형식)
+- universe     : 기준일 순매수 금액 / 건수 순위 top_n 이내 종목 행 (top_n=None 이면 전종목)
+- pivot_window : (종목, 거래일, 투자자) 배열에 한번에 채워 넣어 D1A, D1B ... DnA, DnB 컬럼으로 변환
+                 D1 = 기준일, Dn = n 거래일 전 / A = 기관합계(7050), B = 외국인(9000)
+- flow_window  : 위 세 단계 + 구간 합계(SUMA, SUMB). 20, 60 거래일 구간도 조회 1번, 조인 없음
+- window_panel : 여러 기준일을 한번에. (거래일, 종목, 투자자) 배열 하나에서 기준일별 N 거래일 구간을 잘라
+                 tb_stock_inv_trx_m 과 같은 행을 만듦 (기간 재계산용)
+
+실행 예)
+    python krx_flow.py 20250404                  # 20 거래일, 전종목
+    python krx_flow.py 20250404 60 --top 100     # 60 거래일, 기준일 순위 100위 이내
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from krx_calendar import get_calendar
+from stockdb import get_engine, repository
+
+
+# 투자자 구분 : 컬럼 접미사
+FLOW_INVESTORS = [("7050", "A"), ("9000", "B")]
+
+VALUE_COLUMN = "TRADE_NET_BUY_QTY"
+DEFAULT_DAYS = 20
+
+
+def load_window(con, days, investors=FLOW_INVESTORS):
+    """days(오름차순) 구간의 투자자별 순매수 long 형식"""
+    return repository.inv_net_buy_range(con, days[0], days[-1], [inv for inv, _ in investors])
+
+
+def universe(long_df, base_dt, top_n=None):
+    """기준일 행 중 순매수 금액 또는 건수 순위가 top_n 이내인 행"""
+    base = long_df[long_df["BASE_DT"] == base_dt]
+    if top_n is None:
+        return base
+    return base[(base["RANK_AMT"] <= top_n) | (base["RANK_CNT"] <= top_n)]
+
+
+def pivot_window(long_df, days, stock_cds, value_col=VALUE_COLUMN, investors=FLOW_INVESTORS):
+    """long 형식 → 종목별 D{k}{투자자}_{value_col} 컬럼 (D1 = days[-1]). 값이 없으면 0"""
+    stocks = pd.Index(stock_cds, name="STOCK_CD")
+    day_pos = pd.Index(list(days)[::-1]).get_indexer(long_df["BASE_DT"])
+    inv_pos = pd.Index([inv for inv, _ in investors]).get_indexer(long_df["INV_DIV"].astype(str))
+    stock_pos = stocks.get_indexer(long_df["STOCK_CD"])
+    ok = (day_pos >= 0) & (inv_pos >= 0) & (stock_pos >= 0)
+
+    cube = np.zeros((len(stocks), len(days), len(investors)), dtype=np.int64)
+    values = long_df[value_col].fillna(0).to_numpy(dtype=np.int64)
+    cube[stock_pos[ok], day_pos[ok], inv_pos[ok]] = values[ok]
+
+    columns = [f"D{k + 1}{suffix}_{value_col}" for k in range(len(days)) for _, suffix in investors]
+    return pd.DataFrame(cube.reshape(len(stocks), -1), index=stocks, columns=columns)
+
+
+def window_panel(long_df, days, n_days, top_n=None, value_col=VALUE_COLUMN, investors=FLOW_INVESTORS):
+    """days(오름차순) 중 n_days 번째 거래일부터 각 기준일의 과거 n_days 구간 (기준일, 종목당 1행)
+
+    종목은 기준일 순위 top_n 이내 종목. D1(기준일)은 순위 조건을 만족한 투자자 값만, D2 ~ Dn 은 전체 값
+    (tb_stock_inv_trx_m 과 같은 규칙)
+    """
+    days = list(days)
+    stocks = pd.Index(long_df["STOCK_CD"].unique())
+    day_pos = pd.Index(days).get_indexer(long_df["BASE_DT"])
+    inv_pos = pd.Index([inv for inv, _ in investors]).get_indexer(long_df["INV_DIV"].astype(str))
+    stock_pos = stocks.get_indexer(long_df["STOCK_CD"])
+    ok = (day_pos >= 0) & (inv_pos >= 0)
+    if top_n is None:
+        ranked = ok
+    else:
+        ranked = ok & ((long_df["RANK_AMT"] <= top_n) | (long_df["RANK_CNT"] <= top_n)).to_numpy()
+
+    shape = (len(days), len(stocks), len(investors))
+    values = np.zeros(shape, dtype=np.int64)
+    values[day_pos[ok], stock_pos[ok], inv_pos[ok]] = long_df[value_col].fillna(0).to_numpy(dtype=np.int64)[ok]
+    qualified = np.zeros(shape, dtype=bool)
+    qualified[day_pos[ranked], stock_pos[ranked], inv_pos[ranked]] = True
+
+    # 기준일별 대상 종목 → (행, 투자자, 거래일) 구간 (마지막 축은 오래된 날 → 기준일)
+    base_pos, row_stock = np.nonzero(qualified[n_days - 1:].any(axis=2))
+    windows = sliding_window_view(values, n_days, axis=0)[base_pos, row_stock]
+    windows[:, :, -1] *= qualified[base_pos + n_days - 1, row_stock]
+
+    names = long_df.drop_duplicates("STOCK_CD", keep="last").set_index("STOCK_CD")["STOCK_NM"]
+    out = pd.DataFrame({
+        "BASE_DT": np.asarray(days, dtype=object)[base_pos + n_days - 1],
+        "STOCK_CD": stocks[row_stock],
+    })
+    out["STOCK_NM"] = out["STOCK_CD"].map(names)
+    for k in range(1, n_days + 1):
+        for i, (_, suffix) in enumerate(investors):
+            out[f"D{k}{suffix}_{value_col}"] = windows[:, i, n_days - k]
+    return out
+
+
+def flow_window(con, base_dt, n_days=DEFAULT_DAYS, top_n=None, value_col=VALUE_COLUMN):
+    """기준일 포함 과거 n_days 거래일 투자자별 일별 순매수와 구간 합계 (종목별 1행)"""
+    days = get_calendar(con).window(base_dt, n_days)
+    long_df = load_window(con, days)
+    base = universe(long_df, base_dt, top_n)
+
+    wide = pivot_window(long_df, days, base["STOCK_CD"].unique(), value_col)
+    for _, suffix in FLOW_INVESTORS:
+        wide[f"SUM{suffix}"] = wide.filter(regex=rf"^D\d+{suffix}_").sum(axis=1)
+
+    names = base.drop_duplicates("STOCK_CD").set_index("STOCK_CD")["STOCK_NM"]
+    wide.insert(0, "STOCK_NM", names.reindex(wide.index).to_numpy())
+    return wide
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    top_n = None
+    if "--top" in args:
+        pos = args.index("--top")
+        top_n = int(args[pos + 1])
+        del args[pos:pos + 2]
+
+    if not args:
+        print("사용법: python krx_flow.py BASE_DT [N_DAYS] [--top N]")
+        sys.exit(1)
+
+    n_days = int(args[1]) if len(args) > 1 else DEFAULT_DAYS
+    result = flow_window(get_engine(), args[0], n_days, top_n)
+    print(result.sort_values("SUMA", ascending=False)[["STOCK_NM", "SUMA", "SUMB"]].head(30).to_string())
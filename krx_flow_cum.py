@@ -0,0 +1,230 @@
+"""
+투자자별 순매수 누적합 (tb_inv_flow_cum)
+
+- (투자자, 종목) 별 첫 등장 거래일부터의 순매수 수량 / 금액 누적합을 거래일(WORK_SEQ)마다 1행씩 보관
+  (해당일 거래가 없는 종목도 직전 누적값을 그대로 이어서 저장)
+- 임의 구간 합계 = 기준일 누적값 - 구간 시작 전 거래일 누적값 (뺄셈 1번)
+    window_sums : 5, 20, 60, 120 거래일 등 여러 구간을 기준일 + 구간 시작 전 거래일 행만 읽어 한번에 계산
+- 매일 적재 (append_day, krx_pipeline 의 inv_flow 단계)
+    전 거래일 누적값 + 기준일 순매수. 기준일 이후 거래일이 이미 있으면 (재적재) 이후 구간도 다시 계산
+    전 거래일 누적값이 없으면 캘린더 첫 거래일부터 다시 계산
+    여러 날짜 백필에서 다음 거래일도 대상이면 기준일만 계산 (krx_pipeline.BACKFILL_FUNCS, 이후 구간 반복 재계산 없음)
+    백필 마지막 날짜는 백필 시작 전 마지막 누적 거래일(saved_last_day)까지 다시 계산해 지워진 이후 구간 복구
+- 전체 재계산 (rebuild) : REBUILD_CHUNK_DAYS 거래일씩 나눠 numpy cumsum 으로 계산 후 구간 교체
+
+실행 예)
+    python krx_flow_cum.py 20250404              # 기관 / 외국인 5, 20, 60, 120 거래일 순매수 상위
+    python krx_flow_cum.py --rebuild             # 전체 재계산
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text, bindparam
+
+from krx_calendar import get_calendar
+from krx_flow import FLOW_INVESTORS
+from krx_loader import bulk_load
+from krx_metrics import span
+from stockdb import get_engine, repository
+
+
+TABLE_NAME = "tb_inv_flow_cum"
+
+# 기본 조회 구간 (거래일 수)
+SCREEN_WINDOWS = (5, 20, 60, 120)
+
+# 재계산 시 한번에 처리하는 거래일 수
+REBUILD_CHUNK_DAYS = 60
+
+KEY_COLUMNS = ["INV_DIV", "STOCK_CD"]
+CUM_COLUMNS = {"TRADE_NET_BUY_QTY": "CUM_QTY", "TRADE_NET_BUY_AMT": "CUM_AMT"}
+
+CREATE_TABLE_SQL = text(f"""
+    CREATE TABLE IF NOT EXISTS stock.{TABLE_NAME} (
+        WORK_SEQ  INT       NOT NULL,
+        INV_DIV   CHAR(4)   NOT NULL,
+        STOCK_CD  CHAR(6)   NOT NULL,
+        BASE_DT   DATE      NOT NULL,
+        CUM_QTY   BIGINT    NOT NULL,
+        CUM_AMT   BIGINT    NOT NULL,
+        PRIMARY KEY (WORK_SEQ, INV_DIV, STOCK_CD),
+        KEY IX_INV_FLOW_CUM_1 (BASE_DT)
+    )
+""")
+
+SELECT_CUM_SQL = text(f"""
+    SELECT WORK_SEQ, INV_DIV, STOCK_CD, CUM_QTY, CUM_AMT FROM stock.{TABLE_NAME}
+    WHERE WORK_SEQ IN :seqs
+""").bindparams(bindparam("seqs", expanding=True))
+
+SELECT_LAST_SEQ_SQL = text(f"SELECT MAX(WORK_SEQ) FROM stock.{TABLE_NAME}")
+
+DELETE_RANGE_SQL = text(f"""
+    DELETE FROM stock.{TABLE_NAME}
+    WHERE WORK_SEQ BETWEEN :from_seq AND :to_seq
+""")
+
+
+_table_ready = set()
+
+
+def ensure_table(engine):
+    if id(engine) in _table_ready:
+        return
+    with engine.begin() as conn:
+        conn.execute(CREATE_TABLE_SQL)
+    _table_ready.add(id(engine))
+
+
+def load_cum(con, seqs):
+    """WORK_SEQ 목록의 누적값 행"""
+    seqs = [int(seq) for seq in seqs]
+    if not seqs:
+        return pd.DataFrame(columns=["WORK_SEQ", *KEY_COLUMNS, *CUM_COLUMNS.values()])
+    df = pd.read_sql(SELECT_CUM_SQL, con, params={"seqs": seqs})
+    df["INV_DIV"] = df["INV_DIV"].astype(str)
+    return df
+
+
+def accumulate(start, daily, days, calendar):
+    """시작 누적값(start) + 거래일별 순매수(daily) → days 각 거래일의 누적값 행 (첫 등장 이후만)"""
+    keys = pd.MultiIndex.from_frame(
+        pd.concat([start[KEY_COLUMNS], daily[KEY_COLUMNS].astype(str)]).drop_duplicates())
+    day_pos = pd.Index(days).get_indexer(daily["BASE_DT"])
+    key_pos = keys.get_indexer(pd.MultiIndex.from_frame(daily[KEY_COLUMNS].astype(str)))
+    start_pos = keys.get_indexer(pd.MultiIndex.from_frame(start[KEY_COLUMNS]))
+
+    # 첫 등장 여부 : 시작 누적값이 있거나 구간 안에서 한번이라도 거래가 있으면 이후 거래일 모두 저장
+    seen = np.zeros((len(days), len(keys)), dtype=bool)
+    seen[day_pos, key_pos] = True
+    seen = np.logical_or.accumulate(seen, axis=0)
+    seen[:, start_pos] = True
+
+    out = {}
+    for src, dst in CUM_COLUMNS.items():
+        values = np.zeros((len(days), len(keys)), dtype=np.int64)
+        values[day_pos, key_pos] = daily[src].fillna(0).to_numpy(dtype=np.int64)
+        cum = np.cumsum(values, axis=0)
+        cum[:, start_pos] += start[dst].to_numpy(dtype=np.int64)
+        out[dst] = cum[seen]
+
+    day_idx, key_idx = np.nonzero(seen)
+    return pd.DataFrame({
+        "WORK_SEQ": np.asarray([calendar.seq(day) for day in days], dtype=np.int64)[day_idx],
+        "INV_DIV": keys.get_level_values(0)[key_idx],
+        "STOCK_CD": keys.get_level_values(1)[key_idx],
+        "BASE_DT": np.asarray(days, dtype=object)[day_idx],
+        **out,
+    })
+
+
+def recompute(engine, from_dt, to_dt, chunk_days=REBUILD_CHUNK_DAYS):
+    """from_dt ~ to_dt 누적값 재계산 (from_dt 전 거래일 누적값에서 이어서). 저장 행 수 반환"""
+    ensure_table(engine)
+    calendar = get_calendar(engine)
+    days = calendar.range(from_dt, to_dt)
+    inv_divs = [inv for inv, _ in FLOW_INVESTORS]
+
+    prev_day = calendar.shift(days[0], -1)
+    start = load_cum(engine, [calendar.seq(prev_day)] if prev_day else [])
+    rows = 0
+    for i in range(0, len(days), chunk_days):
+        chunk = days[i:i + chunk_days]
+        with span("select") as s:
+            daily = repository.inv_net_buy_range(engine, chunk[0], chunk[-1], inv_divs)
+            s.rows = len(daily)
+        with span("accumulate") as s:
+            frame = accumulate(start[KEY_COLUMNS + list(CUM_COLUMNS.values())], daily, chunk, calendar)
+            s.rows = len(frame)
+        with span("insert") as s, engine.begin() as conn:
+            conn.execute(DELETE_RANGE_SQL, {"from_seq": calendar.seq(chunk[0]), "to_seq": calendar.seq(chunk[-1])})
+            s.affected = bulk_load(frame, TABLE_NAME, conn)
+        start = frame[frame["WORK_SEQ"] == calendar.seq(chunk[-1])]
+        rows += len(frame)
+        print(f"[✔] {TABLE_NAME} {chunk[0]} ~ {chunk[-1]} 누적합 {len(frame)}건 저장")
+    return rows
+
+
+def saved_last_day(engine):
+    """누적값이 저장된 마지막 거래일 (없으면 None)"""
+    ensure_table(engine)
+    with engine.connect() as conn:
+        last_seq = conn.execute(SELECT_LAST_SEQ_SQL).scalar()
+    return get_calendar(engine).day(last_seq) if last_seq is not None else None
+
+
+def append_day(base_dt, engine, propagate=True, to_dt=None):
+    """기준일 누적값 적재. 전 거래일 누적값이 없으면 처음부터, 이후 거래일이 있으면 이후 구간까지 계산
+
+    propagate=False : 기준일까지만 계산하고 이후 거래일 누적값은 삭제 (이후 거래일도 이어서 적재하는 백필용)
+                      중간에 실패해도 다음 적재 때 전 거래일 누적값이 없어 처음부터 다시 계산됨
+    to_dt           : 이후 구간을 최소 이 거래일까지 계산 (백필 시작 전 saved_last_day, 백필 중 삭제된 구간 복구)
+    """
+    ensure_table(engine)
+    calendar = get_calendar(engine)
+    prev_day = calendar.shift(base_dt, -1)
+    with engine.connect() as conn:
+        last_seq = conn.execute(SELECT_LAST_SEQ_SQL).scalar()
+
+    from_dt = base_dt
+    if prev_day and load_cum(engine, [calendar.seq(prev_day)]).empty:
+        print(f"[i] {prev_day} 누적값이 없어 첫 거래일부터 다시 계산합니다.")
+        from_dt = calendar.days[0]
+
+    if not propagate:
+        if last_seq is not None and last_seq > calendar.seq(base_dt):
+            with engine.begin() as conn:
+                conn.execute(DELETE_RANGE_SQL, {"from_seq": calendar.seq(base_dt) + 1, "to_seq": last_seq})
+        return recompute(engine, from_dt, base_dt)
+
+    # 재적재 : 이미 계산된 이후 거래일 누적값도 함께 갱신
+    last_day = calendar.day(last_seq) if last_seq is not None else None
+    to_dt = max(base_dt, last_day or base_dt, to_dt or base_dt)
+    return recompute(engine, from_dt, to_dt)
+
+
+def rebuild(engine):
+    """캘린더 전체 거래일 누적값 재계산"""
+    calendar = get_calendar(engine)
+    return recompute(engine, calendar.days[0], calendar.last_day)
+
+
+def window_sums(con, base_dt, windows=SCREEN_WINDOWS):
+    """기준일까지 각 구간(거래일 수)의 투자자 / 종목별 순매수 합계. 컬럼 NET_QTY_{n}, NET_AMT_{n}"""
+    calendar = get_calendar(con)
+    end_seq = calendar.seq(base_dt)
+    # 구간 시작 전 거래일 (이력이 부족하면 처음부터 = 누적값 0)
+    start_seqs = {n: calendar.seq(day) if (day := calendar.shift(base_dt, -n)) else None for n in windows}
+
+    cum = load_cum(con, [end_seq] + [seq for seq in start_seqs.values() if seq is not None])
+    cum = cum.set_index(["WORK_SEQ", *KEY_COLUMNS])
+    saved = set(cum.index.get_level_values(0))
+    if end_seq not in saved:
+        raise ValueError(f"{base_dt} 누적값이 없습니다. (python krx_flow_cum.py --rebuild)")
+    end = cum.loc[end_seq]
+
+    result = pd.DataFrame(index=end.index)
+    for n, seq in start_seqs.items():
+        start = cum.loc[seq].reindex(end.index, fill_value=0) if seq in saved else None
+        for src, dst in (("CUM_QTY", "NET_QTY"), ("CUM_AMT", "NET_AMT")):
+            result[f"{dst}_{n}"] = end[src] - (start[src] if start is not None else 0)
+    return result
+
+
+if __name__ == "__main__":
+    engine = get_engine()
+
+    if "--rebuild" in sys.argv[1:]:
+        rebuild(engine)
+        sys.exit(0)
+
+    if len(sys.argv) < 2:
+        print("사용법: python krx_flow_cum.py BASE_DT | --rebuild")
+        sys.exit(1)
+
+    sums = window_sums(engine, sys.argv[1])
+    for inv, _ in FLOW_INVESTORS:
+        print(f"\n[{inv}] 20 거래일 순매수 수량 상위")
+        print(sums.loc[inv].sort_values("NET_QTY_20", ascending=False).head(20).to_string())
@@ -0,0 +1,188 @@
+"""
+매수 등급(BUY_GRADE) 규칙 (tb_stock_inv_trx_cnt)
+
+- 등급 규칙은 버전별 설정(GRADE_RULES). 위에서부터 먼저 만족하는 등급, 모두 아니면 DEFAULT_GRADE
+    조건 : [[(지표, 연산자, 값), ...], ...]  안쪽 목록은 AND, 바깥 목록은 OR
+           지표가 목록/튜플이면 컬럼 합계 (예: ("inst_cnt", "fore_cnt"))
+    GRADE_RULES_FILE(JSON) 로 코드 수정 없이 실험용 버전 추가 : {"2": {"desc": "...", "rules": [[등급, 조건], ...]}}
+- assign_grades : 지표 DataFrame 전체를 조건별 boolean 마스크로 한번에 평가 (INSERT 전에 계산)
+    grade_masks   : 등급 문자열 없이 등급별 마스크만 (krx_grade_sweep 기준값 탐색용)
+- regrade       : 저장된 전체 이력을 한번 조회해 새 규칙 버전으로 다시 평가
+    결과는 tb_stock_buy_grade (RULE_VER 별) 에 저장해 버전끼리 비교, --apply 면 BUY_GRADE 도 교체
+
+실행 예)
+    python krx_grade.py 2 20250102 20251230            # 규칙 2 로 기간 재평가 (현재 등급과 비교표 출력)
+    python krx_grade.py 2 20250102 20251230 --apply    # tb_stock_inv_trx_cnt.BUY_GRADE 도 규칙 2 로 교체
+"""
+
+import json
+import operator
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from krx_loader import bulk_load
+from krx_metrics import span
+from krx_storage import storage_table
+from stockdb import get_engine
+
+
+# 버전 : {"desc": 설명, "rules": [(등급, 조건), ...]}
+GRADE_RULES = {
+    1: {
+        "desc": "기존 CASE 식",
+        "rules": [
+            ("S", [[("buy_con_cnt", ">=", 3), ("d7_avg_trx_rate", ">", 1.3)],
+                   [("d7_avg_trx_rate", ">=", 2)]]),
+            ("A", [[(("inst_cnt", "fore_cnt"), ">=", 10)]]),
+        ],
+    },
+}
+DEFAULT_GRADE = "B"
+
+GRADE_RULES_FILE = os.getenv("GRADE_RULES_FILE")
+if GRADE_RULES_FILE and os.path.exists(GRADE_RULES_FILE):
+    with open(GRADE_RULES_FILE, encoding="utf-8") as f:
+        GRADE_RULES.update({int(ver): rule for ver, rule in json.load(f).items()})
+
+# 일별 적재에 쓰는 규칙 버전 (기본 1 = 기존 CASE 식)
+GRADE_RULE_VERSION = int(os.getenv("GRADE_RULE_VERSION", "1"))
+
+OPERATORS = {
+    ">": operator.gt, ">=": operator.ge,
+    "<": operator.lt, "<=": operator.le,
+    "==": operator.eq, "!=": operator.ne,
+}
+
+SOURCE_TABLE = "tb_stock_inv_trx_cnt"
+TABLE_NAME = "tb_stock_buy_grade"
+
+CREATE_TABLE_SQL = text(f"""
+    CREATE TABLE IF NOT EXISTS stock.{TABLE_NAME} (
+        RULE_VER   INT          NOT NULL,
+        BASE_DT    DATE         NOT NULL,
+        STOCK_CD   CHAR(6)      NOT NULL,
+        BUY_GRADE  VARCHAR(10)  NOT NULL,
+        PRIMARY KEY (RULE_VER, BASE_DT, STOCK_CD)
+    )
+""")
+
+SELECT_METRICS_SQL = text(f"""
+    SELECT * FROM stock.{SOURCE_TABLE}
+    WHERE BASE_DT BETWEEN :from_dt AND :to_dt
+""")
+
+DELETE_GRADE_SQL = text(f"""
+    DELETE FROM stock.{TABLE_NAME}
+    WHERE RULE_VER = :rule_ver AND BASE_DT BETWEEN :from_dt AND :to_dt
+""")
+
+# 저장된 규칙 버전 등급으로 BUY_GRADE 교체 (압축 전환된 테이블은 실제 테이블 대상)
+APPLY_GRADE_SQL = """
+    UPDATE stock.{target} T1
+    JOIN stock.{grade_table} T2 ON T1.BASE_DT = T2.BASE_DT AND T1.STOCK_CD = T2.STOCK_CD
+    SET T1.BUY_GRADE = T2.BUY_GRADE
+    WHERE T2.RULE_VER = :rule_ver AND T1.BASE_DT BETWEEN :from_dt AND :to_dt
+"""
+
+
+_table_ready = set()
+
+
+def ensure_table(engine):
+    if id(engine) in _table_ready:
+        return
+    with engine.begin() as conn:
+        conn.execute(CREATE_TABLE_SQL)
+    _table_ready.add(id(engine))
+
+
+def get_rules(version=None):
+    """규칙 버전의 [(등급, 조건), ...]"""
+    version = GRADE_RULE_VERSION if version is None else int(version)
+    if version not in GRADE_RULES:
+        raise ValueError(f"등급 규칙 버전 {version} 이 없습니다. (있는 버전: {sorted(GRADE_RULES)})")
+    return GRADE_RULES[version]["rules"]
+
+
+def _feature(df, name):
+    if isinstance(name, str):
+        return df[name].to_numpy()
+    return np.sum([df[col].to_numpy() for col in name], axis=0)
+
+
+def rule_mask(df, clauses):
+    """조건(OR of AND) 을 만족하는 행 마스크"""
+    mask = np.zeros(len(df), dtype=bool)
+    for clause in clauses:
+        part = np.ones(len(df), dtype=bool)
+        for name, op, value in clause:
+            part &= OPERATORS[op](_feature(df, name), value)
+        mask |= part
+    return mask
+
+
+def grade_masks(df, rules):
+    """등급별 행 마스크 {등급: mask} (위 규칙이 먼저, 한 행은 한 등급만)"""
+    masks = {}
+    decided = np.zeros(len(df), dtype=bool)
+    for grade, clauses in rules:
+        masks[grade] = rule_mask(df, clauses) & ~decided
+        decided |= masks[grade]
+    return masks
+
+
+def assign_grades(df, version=None, rules=None):
+    """지표 DataFrame(소문자 컬럼) 의 행별 등급. rules 를 주면 version 대신 사용"""
+    rules = get_rules(version) if rules is None else rules
+    grades = np.full(len(df), DEFAULT_GRADE, dtype=object)
+    for grade, mask in grade_masks(df, rules).items():
+        grades[mask] = grade
+    return pd.Series(grades, index=df.index, name="buy_grade")
+
+
+def regrade(version, from_dt, to_dt, engine=None, apply=False):
+    """기간 전체 저장 지표를 규칙 version 으로 재평가. (현재 등급, 새 등급) 건수표 반환"""
+    engine = engine or get_engine()
+    rules = get_rules(version)
+    ensure_table(engine)
+
+    with span("select") as s:
+        metrics = pd.read_sql(SELECT_METRICS_SQL, engine, params={"from_dt": from_dt, "to_dt": to_dt})
+        metrics.columns = metrics.columns.str.lower()
+        s.rows = len(metrics)
+    if metrics.empty:
+        print(f"[i] {from_dt} ~ {to_dt} {SOURCE_TABLE} 데이터가 없습니다.")
+        return pd.DataFrame()
+
+    with span("grade") as s:
+        grades = pd.DataFrame({
+            "RULE_VER": int(version),
+            "BASE_DT": metrics["base_dt"].astype(str).str.replace("-", "", regex=False),
+            "STOCK_CD": metrics["stock_cd"],
+            "BUY_GRADE": assign_grades(metrics, rules=rules).to_numpy(),
+        })
+        s.rows = len(grades)
+
+    with span("insert") as s, engine.begin() as conn:
+        conn.execute(DELETE_GRADE_SQL, {"rule_ver": int(version), "from_dt": from_dt, "to_dt": to_dt})
+        s.affected = bulk_load(grades, TABLE_NAME, conn)
+        if apply:
+            sql = text(APPLY_GRADE_SQL.format(target=storage_table(conn, SOURCE_TABLE), grade_table=TABLE_NAME))
+            conn.execute(sql, {"rule_ver": int(version), "from_dt": from_dt, "to_dt": to_dt})
+    print(f"[✔] 규칙 {version} 로 {from_dt} ~ {to_dt} {len(grades)}건 재평가" + (" (BUY_GRADE 교체)" if apply else ""))
+
+    return pd.crosstab(metrics["buy_grade"].fillna("-").rename("현재"), grades["BUY_GRADE"].rename(f"규칙 {version}"),
+                       margins=True)
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(args) != 3:
+        print("사용법: python krx_grade.py RULE_VER FROM_DATE TO_DATE [--apply]")
+        sys.exit(1)
+
+    print(regrade(int(args[0]), args[1], args[2], apply="--apply" in sys.argv[1:]).to_string())
@@ -0,0 +1,204 @@
+"""
+매수 등급(BUY_GRADE) 기준값 그리드 탐색
+
+- 저장된 지표(tb_stock_inv_trx_cnt)와 N 거래일 후 수익률(tb_stock_day_price 종가)을 한번 조회해 파일로 캐시
+- 기준값 조합마다 krx_grade.grade_masks 로 전체 이력 등급을 한번에 계산하고 S / A 등급별 성과 집계
+    cnt        : 등급 건수
+    hit_rate   : N 거래일 후 수익률 > 0 비율
+    mean_ret   : 평균 N 거래일 수익률 (%)
+    turnover   : 전 거래일에 같은 등급이 아니었던 종목 비율 (신규 편입률)
+- 조합은 프로세스 풀(SWEEP_WORKERS, 기본 CPU 수)에 나눠 계산. 이력은 작업 프로세스마다 한번만 전달
+- 수익률은 기준일 종가 → N 거래일 후 종가 (기준일 장 마감 후 등급을 계산하므로 기준일 종가 매수 가정)
+
+실행 예)
+    python krx_grade_sweep.py 20250102 20251230                    # 5 거래일 수익률, 전체 조합
+    python krx_grade_sweep.py 20250102 20251230 --horizon 10 --workers 8 --refresh
+"""
+
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from krx_calendar import get_calendar
+from krx_grade import grade_masks
+from stockdb import get_engine, repository
+
+
+SAVE_DIR = r"D:\python_proj\venv_stock\stock_file"
+CACHE_DIR = os.getenv("SWEEP_CACHE_DIR", os.path.join(SAVE_DIR, "grade_sweep"))
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", str(os.cpu_count() or 4)))
+
+DEFAULT_HORIZON = 5
+
+# 탐색 기준값 : S = (buy_con_cnt >= con_cnt AND d7_avg_trx_rate > con_rate) OR d7_avg_trx_rate >= rate
+#              A = inst_cnt + fore_cnt >= cnt_sum
+PARAM_GRID = {
+    "con_cnt": [2, 3, 4],
+    "con_rate": [round(x, 1) for x in np.arange(1.0, 2.05, 0.1)],
+    "rate": [round(x, 2) for x in np.arange(1.5, 3.01, 0.25)],
+    "cnt_sum": list(range(6, 15)),
+}
+
+# 현재 규칙 (krx_grade 규칙 1) 기준값 : 결과표에서 비교용으로 표시
+BASELINE = {"con_cnt": 3, "con_rate": 1.3, "rate": 2.0, "cnt_sum": 10}
+
+GRADES = ("S", "A")
+METRIC_COLUMNS = ["BUY_CON_CNT", "D7_AVG_TRX_RATE", "INST_CNT", "FORE_CNT"]
+
+SELECT_METRICS_SQL = text(f"""
+    SELECT BASE_DT, STOCK_CD, {", ".join(METRIC_COLUMNS)}
+    FROM stock.tb_stock_inv_trx_cnt
+    WHERE BASE_DT BETWEEN :from_dt AND :to_dt
+""")
+
+
+def sweep_rules(con_cnt, con_rate, rate, cnt_sum):
+    """기준값 조합 → krx_grade 규칙 형식"""
+    return [
+        ("S", [[("buy_con_cnt", ">=", con_cnt), ("d7_avg_trx_rate", ">", con_rate)],
+               [("d7_avg_trx_rate", ">=", rate)]]),
+        ("A", [[(("inst_cnt", "fore_cnt"), ">=", cnt_sum)]]),
+    ]
+
+
+def forward_returns(prices, days, horizon):
+    """(거래일, 종목) 종가 → horizon 거래일 후 수익률(%) long 형식"""
+    close = prices.pivot_table(index="BASE_DT", columns="STOCK_CD", values="CLOSE_PRICE", aggfunc="last")
+    close_cols = close.columns.to_numpy()
+    close = close.reindex(days).to_numpy(dtype=float)
+    fwd = np.full_like(close, np.nan)
+    fwd[:-horizon] = (close[horizon:] / close[:-horizon] - 1) * 100
+    day_idx, stock_idx = np.nonzero(~np.isnan(fwd))
+    return pd.DataFrame({
+        "BASE_DT": np.asarray(days, dtype=object)[day_idx],
+        "STOCK_CD": close_cols[stock_idx],
+        "RET": fwd[day_idx, stock_idx],
+    })
+
+
+def load_history(engine, from_dt, to_dt, horizon=DEFAULT_HORIZON, refresh=False):
+    """기간 지표 + horizon 거래일 후 수익률. 같은 기간 / horizon 은 캐시 파일 재사용"""
+    cache_path = os.path.join(CACHE_DIR, f"history_v2_{from_dt}_{to_dt}_{horizon}.pkl")
+    if not refresh and os.path.exists(cache_path):
+        print(f"[i] 캐시 사용: {cache_path}")
+        return pd.read_pickle(cache_path)
+
+    calendar = get_calendar(engine)
+    days = calendar.range(from_dt, calendar.shift(to_dt, horizon, clip=True))
+    metrics = pd.read_sql(SELECT_METRICS_SQL, engine, params={"from_dt": from_dt, "to_dt": to_dt})
+    metrics["BASE_DT"] = metrics["BASE_DT"].astype(str).str.replace("-", "", regex=False)
+    prices = repository.day_prices(engine, days[0], days[-1])
+    print(f"[i] 지표 {len(metrics)}건, 종가 {len(prices)}건 조회")
+
+    history = metrics.merge(forward_returns(prices, days, horizon), on=["BASE_DT", "STOCK_CD"], how="left")
+    history.columns = history.columns.str.lower()
+
+    # 같은 종목의 전 거래일 행 위치 (신규 편입률 계산용, 없으면 -1), 기간 내 거래일 순번 (첫 거래일 0)
+    history = history.sort_values(["stock_cd", "base_dt"]).reset_index(drop=True)
+    day_no = pd.Index(days).get_indexer(history["base_dt"])
+    same_stock = history["stock_cd"].to_numpy()[1:] == history["stock_cd"].to_numpy()[:-1]
+    consecutive = same_stock & (day_no[1:] == day_no[:-1] + 1)
+    history["prev_row"] = np.concatenate([[-1], np.where(consecutive, np.arange(len(history) - 1), -1)])
+    history["day_no"] = day_no
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    history.to_pickle(cache_path)
+    return history
+
+
+def grade_stats(history, masks):
+    """등급별 마스크의 건수, 적중률, 평균 수익률, 신규 편입률"""
+    ret = history["ret"].to_numpy()
+    prev_row = history["prev_row"].to_numpy()
+    has_prev = prev_row >= 0
+    after_first = history["day_no"].to_numpy() > 0
+    valid = ~np.isnan(ret)
+    stats = {}
+    for grade in GRADES:
+        mask = masks[grade]
+        scored = mask & valid
+        cnt = int(scored.sum())
+        # 첫 거래일만 비교 대상에서 제외. 전 거래일 행이 없으면(순위 밖) 전 거래일 등급이 아니었던 것으로 봄
+        held = mask & after_first
+        new = held & ~(has_prev & mask[np.where(has_prev, prev_row, 0)])
+        stats[f"{grade}_cnt"] = cnt
+        stats[f"{grade}_hit_rate"] = float((ret[scored] > 0).mean()) if cnt else np.nan
+        stats[f"{grade}_mean_ret"] = float(ret[scored].mean()) if cnt else np.nan
+        stats[f"{grade}_turnover"] = float(new.sum() / held.sum()) if held.any() else np.nan
+    return stats
+
+
+_history = None
+
+
+def _init_worker(history):
+    global _history
+    _history = history
+
+
+def _evaluate(combos):
+    results = []
+    for params in combos:
+        masks = grade_masks(_history, sweep_rules(**params))
+        results.append({**params, **grade_stats(_history, masks)})
+    return results
+
+
+def param_combos(grid=PARAM_GRID):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def sweep(history, grid=PARAM_GRID, workers=SWEEP_WORKERS):
+    """모든 기준값 조합 성과표 (S 평균 수익률 내림차순)"""
+    combos = param_combos(grid)
+    size = max(1, len(combos) // (workers * 4))
+    chunks = [combos[i:i + size] for i in range(0, len(combos), size)]
+    print(f"[i] {len(combos)}개 조합, {len(history)}건 이력, 프로세스 {workers}개")
+
+    if workers <= 1:
+        _init_worker(history)
+        results = [row for chunk in chunks for row in _evaluate(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(history,)) as executor:
+            results = [row for rows in executor.map(_evaluate, chunks) for row in rows]
+
+    result = pd.DataFrame(results)
+    result["baseline"] = np.logical_and.reduce([np.isclose(result[k], v) for k, v in BASELINE.items()])
+    return result.sort_values("S_mean_ret", ascending=False).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {}
+    for opt in ("--horizon", "--workers"):
+        if opt in args:
+            pos = args.index(opt)
+            options[opt] = int(args[pos + 1])
+            del args[pos:pos + 2]
+    refresh = "--refresh" in args
+    args = [a for a in args if a != "--refresh"]
+
+    if len(args) != 2:
+        print("사용법: python krx_grade_sweep.py FROM_DATE TO_DATE [--horizon N] [--workers N] [--refresh]")
+        sys.exit(1)
+
+    from_dt, to_dt = args
+    horizon = options.get("--horizon", DEFAULT_HORIZON)
+    history = load_history(get_engine(), from_dt, to_dt, horizon, refresh)
+    result = sweep(history, workers=options.get("--workers", SWEEP_WORKERS))
+
+    print(f"\n[현재 규칙 기준값] {BASELINE}")
+    print(result[result["baseline"]].to_string(index=False))
+    print(f"\n[S 평균 {horizon} 거래일 수익률 상위 20]")
+    print(result.head(20).to_string(index=False))
+
+    os.makedirs(SAVE_DIR, exist_ok=True)
+    file_path = os.path.join(SAVE_DIR, f"grade_sweep_{from_dt}_{to_dt}_{horizon}.xlsx")
+    result.to_excel(file_path, index=False)
+    print(f"[✔] 저장 완료: {file_path}")
@@ -0,0 +1,160 @@
+"""
+파이프라인 단계 실행 이력 (tb_pipeline_run)
+
+- (기준일, 단계) 별 완료 여부, 결과 행 수, 입력 데이터 지문(INPUT_HASH)을 기록
+- 재실행 시 완료 이력이 있고 입력 지문과 결과 행 수가 그대로인 단계는 건너뜀
+- 입력 지문 : 단계가 읽는 테이블의 참조 거래일 구간 행 수 + 행 내용 CRC32 XOR 합
+    inv_flow 는 전 거래일 누적값(tb_inv_flow_cum)도 입력이므로 이전 날짜를 다시 적재하면 함께 재실행
+
+재실행 대상이 되는 경우
+    - 완료 이력이 없거나 실패로 끝난 단계
+    - 선행 단계 결과(입력 테이블)가 바뀐 단계
+    - 결과 테이블의 기준일 행 수가 기록과 다른 단계 (krx_stock_init 으로 삭제된 경우 등)
+"""
+
+import hashlib
+import json
+import threading
+from datetime import datetime
+
+from sqlalchemy import inspect, text, bindparam
+
+
+LEDGER_TABLE = "tb_pipeline_run"
+
+CREATE_LEDGER_SQL = text(f"""
+    CREATE TABLE IF NOT EXISTS stock.{LEDGER_TABLE} (
+        BASE_DT     VARCHAR(8)  NOT NULL,
+        STEP_NM     VARCHAR(30) NOT NULL,
+        STATUS      VARCHAR(10) NOT NULL,
+        ROW_CNT     BIGINT,
+        INPUT_HASH  CHAR(64),
+        START_TM    DATETIME,
+        END_TM      DATETIME,
+        PRIMARY KEY (BASE_DT, STEP_NM)
+    )
+""")
+
+# 단계별 입력 : (테이블, 기준일 포함 참조 거래일 수[, 기준 거래일 이동 (-1 = 전 거래일까지)])
+STEP_INPUTS = {
+    "idx": [("tb_stock_day_price", 15)],
+    "inv_trx_m": [("tb_inv_net_buy_day", 7)],
+    "inv_flow": [("tb_inv_net_buy_day", 1), ("tb_inv_flow_cum", 1, -1)],
+    "trx_m_stat": [("tb_stock_inv_trx_m", 1)],
+    "inv_trx_cnt": [
+        ("tb_stock_inv_trx_m", 1),
+        ("tb_stock_trx_idx", 1),
+        ("tb_inv_net_buy_day", 1),
+        ("tb_stock_day_price", 1),
+    ],
+}
+
+# 단계별 결과 테이블 (기준일 행 수로 결과 유지 여부 확인)
+STEP_OUTPUTS = {
+    "day_price": "tb_stock_day_price",
+    "inv_net_buy": "tb_inv_net_buy_day",
+    "idx": "tb_stock_trx_idx",
+    "inv_trx_m": "tb_stock_inv_trx_m",
+    "inv_trx_cnt": "tb_stock_inv_trx_cnt",
+    "inv_flow": "tb_inv_flow_cum",
+}
+
+
+_ledger_ready = set()
+_columns = {}
+_lock = threading.Lock()
+
+
+def ensure_ledger(engine):
+    with _lock:
+        if id(engine) in _ledger_ready:
+            return
+        with engine.begin() as conn:
+            conn.execute(CREATE_LEDGER_SQL)
+        _ledger_ready.add(id(engine))
+
+
+def _table_columns(engine, table):
+    """테이블 컬럼 목록. 아직 없는 테이블(첫 실행 전 tb_inv_flow_cum 등)은 빈 목록 (캐시하지 않음)"""
+    with _lock:
+        if table not in _columns:
+            insp = inspect(engine)
+            if not insp.has_table(table, schema="stock"):
+                return []
+            _columns[table] = [col["name"] for col in insp.get_columns(table, schema="stock")]
+        return _columns[table]
+
+
+def table_fingerprint(engine, table, days):
+    """테이블의 지정 거래일 행 수와 행 내용 체크섬"""
+    cols = ", ".join(_table_columns(engine, table))
+    if not cols:
+        return [table, days[0], days[-1], 0, 0]
+    sql = text(f"""
+        SELECT COUNT(*), COALESCE(BIT_XOR(CRC32(CONCAT_WS('|', {cols}))), 0)
+        FROM stock.{table}
+        WHERE BASE_DT IN :days
+    """).bindparams(bindparam("days", expanding=True))
+    with engine.connect() as conn:
+        row_cnt, checksum = conn.execute(sql, {"days": list(days)}).one()
+    return [table, days[0], days[-1], int(row_cnt), int(checksum)]
+
+
+def input_hash(engine, calendar, step_name, base_dt):
+    """단계 입력 데이터 지문. 입력 테이블이 없는 단계(work_day, KRX 다운로드)는 단계명만으로 구성"""
+    parts = [step_name, base_dt]
+    for table, n_days, *offset in STEP_INPUTS.get(step_name, []):
+        end_dt = base_dt
+        if offset and base_dt in calendar:
+            end_dt = calendar.shift(base_dt, offset[0])
+            if end_dt is None:
+                # 캘린더 첫 거래일 이전 : 참조할 행 없음
+                parts.append([table, None])
+                continue
+        days = calendar.window(end_dt, n_days) if end_dt in calendar else [end_dt]
+        parts.append(table_fingerprint(engine, table, days))
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def output_rows(engine, step_name, base_dt):
+    table = STEP_OUTPUTS.get(step_name)
+    if table is None:
+        return 0
+    with engine.connect() as conn:
+        return int(conn.execute(text(f"SELECT COUNT(*) FROM stock.{table} WHERE BASE_DT = :base_dt"),
+                                {"base_dt": base_dt}).scalar())
+
+
+def is_complete(engine, step_name, base_dt, in_hash):
+    sql = text(f"""
+        SELECT STATUS, ROW_CNT, INPUT_HASH FROM stock.{LEDGER_TABLE}
+        WHERE BASE_DT = :base_dt AND STEP_NM = :step_nm
+    """)
+    with engine.connect() as conn:
+        row = conn.execute(sql, {"base_dt": base_dt, "step_nm": step_name}).first()
+    if row is None or row.STATUS != "done" or row.INPUT_HASH != in_hash:
+        return False
+    return output_rows(engine, step_name, base_dt) == row.ROW_CNT
+
+
+def record(engine, step_name, base_dt, status, in_hash, start_tm, row_cnt=None):
+    sql = text(f"""
+        INSERT INTO stock.{LEDGER_TABLE} (BASE_DT, STEP_NM, STATUS, ROW_CNT, INPUT_HASH, START_TM, END_TM)
+        VALUES (:base_dt, :step_nm, :status, :row_cnt, :input_hash, :start_tm, :end_tm)
+        ON DUPLICATE KEY UPDATE
+            STATUS = VALUES(STATUS),
+            ROW_CNT = VALUES(ROW_CNT),
+            INPUT_HASH = VALUES(INPUT_HASH),
+            START_TM = VALUES(START_TM),
+            END_TM = VALUES(END_TM)
+    """)
+    with engine.begin() as conn:
+        conn.execute(sql, {
+            "base_dt": base_dt,
+            "step_nm": step_name,
+            "status": status,
+            "row_cnt": row_cnt,
+            "input_hash": in_hash,
+            "start_tm": start_tm,
+            "end_tm": datetime.now(),
+        })
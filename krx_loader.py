@@ -0,0 +1,184 @@
+"""
+팩트 테이블 대량 적재 공용 모듈
+
+- bulk_load(df, table, con) : 타입 지정 DataFrame 을 한번에 적재
+- LOAD DATA LOCAL INFILE : 메모리에서 탭 구분 텍스트로 만든 뒤 임시 파일로 넘겨 서버에 일괄 전송
+  (드라이버(mysql-connector, pymysql)가 LOCAL INFILE 에 파일 경로만 받으므로 메모리 버퍼 대신 임시 파일 사용)
+  서버 local_infile=ON, 드라이버별 접속 옵션(stockdb.engine.LOCAL_INFILE_CONNECT_ARGS) 필요.
+  LOCAL INFILE 거부 오류(LOCAL_INFILE_REFUSED)일 때만
+  이후 다건 VALUES 로 전환하고, 그 밖의 오류는 그대로 발생
+  LOCAL 은 IGNORE 처럼 동작(중복 키, 변환 오류가 경고로 바뀜)하므로 적재 건수와 SHOW WARNINGS 를 확인해
+  누락 / 변환된 행이 있으면 오류 발생 (VALUES 경로와 같은 결과)
+- 다건 VALUES : chunk_size 행씩 INSERT ... VALUES (...), (...) 한 문장으로 전송
+- upsert=True : 기존 키는 update_cols(기본 키 외 전체) 갱신 (INSERT ... ON DUPLICATE KEY UPDATE)
+    LOAD DATA 경로는 임시 테이블에 적재한 뒤 INSERT ... SELECT ... ON DUPLICATE KEY UPDATE
+    (임시 테이블은 파티션 없이 컬럼만 복사 : 파티션 테이블은 CREATE TEMPORARY TABLE ... LIKE 불가)
+- 압축 전환된 테이블(krx_storage)은 실제 테이블({table}_data)에 STOCK_NM 을 뺀 컬럼으로 적재
+
+사용 예)
+    from krx_loader import bulk_load
+
+    bulk_load(df, "tb_stock_day_price", engine)
+    bulk_load(df, "tb_stock_trx_idx", engine, upsert=True, update_cols=["CLOSE_PRICE", "RSI", "OBV"])
+"""
+
+import csv
+import io
+import os
+import tempfile
+import threading
+
+import pandas as pd
+from sqlalchemy import table, column
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+from krx_storage import prepare_frame
+
+
+DB_SCHEMA = "stock"
+
+# 다건 VALUES 한 문장에 넣는 행 수
+LOAD_CHUNK_SIZE = 5000
+
+# 이 행 수 이상일 때만 LOAD DATA 사용 (작은 적재는 VALUES 한 문장이 더 빠름)
+LOAD_DATA_MIN_ROWS = 2000
+
+# LOAD DATA 사용 여부 (환경변수 KRX_LOAD_DATA=off 이면 VALUES 만 사용)
+USE_LOAD_DATA = os.getenv("KRX_LOAD_DATA", "on") != "off"
+
+
+# LOAD DATA LOCAL INFILE 거부 오류 코드 (이 경우만 VALUES 방식으로 전환)
+#   1148 : ER_NOT_ALLOWED_COMMAND, 3948 : ER_CLIENT_LOCAL_FILES_DISABLED,
+#   4166 : MariaDB ER_LOAD_INFILE_CAPABILITY_DISABLED, 2068 : CR_LOAD_DATA_LOCAL_INFILE_REJECTED
+LOCAL_INFILE_REFUSED = {1148, 2068, 3948, 4166}
+
+# 적재 실패로 보는 SHOW WARNINGS 수준
+WARNING_LEVELS = ("Warning", "Error")
+
+
+_load_data_failed = False
+_tmp_seq = 0
+_tmp_lock = threading.Lock()
+
+
+def _records(df):
+    """DataFrame → dict 목록 (NaN 은 None, numpy 값은 파이썬 기본 타입)"""
+    df = df.astype(object).where(df.notna(), None)
+    return df.to_dict("records")
+
+
+def _to_tsv(df):
+    """LOAD DATA 용 탭 구분 텍스트 (NULL 은 \\N, 문자열의 \\ 탭 줄바꿈은 이스케이프)"""
+    df = df.copy()
+    for col in df.columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            values = df[col].astype(object)
+            mask = values.notna()
+            df[col] = values.where(~mask, values[mask].astype(str)
+                                   .str.replace("\\", "\\\\", regex=False)
+                                   .str.replace("\t", "\\t", regex=False)
+                                   .str.replace("\n", "\\n", regex=False))
+    buf = io.StringIO()
+    df.to_csv(buf, sep="\t", header=False, index=False, na_rep="\\N",
+              lineterminator="\n", quoting=csv.QUOTE_NONE)
+    return buf.getvalue().encode("utf-8")
+
+
+def _local_infile_refused(e):
+    """LOAD DATA LOCAL INFILE 자체가 거부된 오류인지 (MySQL 오류 코드, 코드가 없는 드라이버 오류는 메시지로 판단)"""
+    orig = getattr(e, "orig", e)
+    code = getattr(orig, "errno", None)
+    if code is None and getattr(orig, "args", None):
+        code = orig.args[0]
+    if isinstance(code, int):
+        return code in LOCAL_INFILE_REFUSED
+    return "local infile" in str(orig).lower()
+
+
+def _update_cols(df, key_cols, update_cols):
+    if update_cols is not None:
+        return list(update_cols)
+    return [col for col in df.columns if col not in (key_cols or [])]
+
+
+def _insert_values(conn, df, table_name, upsert, update_cols, chunk_size):
+    target = table(table_name, *[column(col) for col in df.columns], schema=DB_SCHEMA)
+    rows = _records(df)
+    for start in range(0, len(rows), chunk_size):
+        stmt = insert(target).values(rows[start:start + chunk_size])
+        if upsert:
+            stmt = stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in update_cols})
+        conn.execute(stmt)
+
+
+def _load_data(conn, df, table_name, upsert, update_cols):
+    global _tmp_seq
+    cols = ", ".join(df.columns)
+    target = f"{DB_SCHEMA}.{table_name}"
+    if upsert:
+        with _tmp_lock:
+            _tmp_seq += 1
+            load_table = f"tmp_bulk_{table_name}_{_tmp_seq}"
+        conn.exec_driver_sql(f"CREATE TEMPORARY TABLE {load_table} SELECT {cols} FROM {target} LIMIT 0")
+    else:
+        load_table = target
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".tsv")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_to_tsv(df))
+        loaded = conn.exec_driver_sql(f"""
+            LOAD DATA LOCAL INFILE '{tmp_path.replace(os.sep, "/")}'
+            INTO TABLE {load_table}
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+            LINES TERMINATED BY '\\n'
+            ({cols})
+        """).rowcount
+        # LOCAL 은 중복 키 / 변환 오류를 경고로 넘기므로 직접 확인
+        warnings = [w for w in conn.exec_driver_sql("SHOW WARNINGS LIMIT 10").fetchall() if w[0] in WARNING_LEVELS]
+        if warnings or loaded != len(df):
+            raise RuntimeError(f"LOAD DATA {table_name}: {len(df)}건 중 {loaded}건 적재, 경고 {warnings}")
+        if upsert:
+            updates = ", ".join(f"{col} = VALUES({col})" for col in update_cols)
+            conn.exec_driver_sql(f"""
+                INSERT INTO {target} ({cols})
+                SELECT {cols} FROM {load_table}
+                ON DUPLICATE KEY UPDATE {updates}
+            """)
+    finally:
+        if upsert:
+            conn.exec_driver_sql(f"DROP TEMPORARY TABLE IF EXISTS {load_table}")
+        os.remove(tmp_path)
+
+
+def bulk_load(df, table_name, con, upsert=False, update_cols=None, key_cols=None, chunk_size=LOAD_CHUNK_SIZE):
+    """DataFrame 을 table_name 에 일괄 적재. con 은 Engine 또는 Connection. 적재 행 수 반환
+
+    upsert=True 이면 update_cols(없으면 key_cols 를 제외한 전체 컬럼)를 갱신
+    """
+    global _load_data_failed
+    if df is None or df.empty:
+        return 0
+
+    if isinstance(con, Engine):
+        with con.begin() as conn:
+            return bulk_load(df, table_name, conn, upsert, update_cols, key_cols, chunk_size)
+
+    table_name, df = prepare_frame(con, table_name, df)
+    update_cols = [col for col in _update_cols(df, key_cols, update_cols) if col in df.columns] if upsert else None
+    if USE_LOAD_DATA and not _load_data_failed and len(df) >= LOAD_DATA_MIN_ROWS:
+        try:
+            _load_data(con, df, table_name, upsert, update_cols)
+            return len(df)
+        except DBAPIError as e:
+            # local_infile 미허용 : 이후에는 VALUES 방식만 사용. 데이터 오류 등은 그대로 발생
+            if not _local_infile_refused(e):
+                raise
+            _load_data_failed = True
+            print(f"⚠️ LOAD DATA LOCAL INFILE 거부, 다건 INSERT 로 전환합니다: {e.orig}")
+
+    _insert_values(con, df, table_name, upsert, update_cols, chunk_size)
+    return len(df)
@@ -0,0 +1,173 @@
+"""
+파이프라인 단계별 계측 (tb_pipeline_metrics, JSON 실행 보고서)
+
+- span(phase) 컨텍스트로 다운로드 / 파싱 / DELETE / INSERT / UPDATE 등 구간의 소요 시간을 측정
+- 구간 안에서 s.rows(처리 행 수), s.bytes(다운로드 바이트), s.affected(DB 반영 행 수)를 채워 넣음
+- 기준일 / 단계명은 step_context 로 현재 스레드에 설정 (krx_pipeline 이 단계 실행 시 설정)
+- flush 로 모인 기록을 tb_pipeline_metrics 에 저장하고 JSON 보고서 파일 작성
+
+사용 예)
+    from krx_metrics import span
+
+    with span("download") as s:
+        raw = client.fetch_csv(payload)
+        s.bytes = len(raw)
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import text
+
+
+METRICS_TABLE = "tb_pipeline_metrics"
+REPORT_DIR = os.getenv("PIPELINE_REPORT_DIR", r"D:\python_proj\venv_stock\stock_file\metrics")
+
+CREATE_METRICS_SQL = text(f"""
+    CREATE TABLE IF NOT EXISTS stock.{METRICS_TABLE} (
+        METRIC_ID     BIGINT AUTO_INCREMENT PRIMARY KEY,
+        RUN_ID        VARCHAR(40) NOT NULL,
+        BASE_DT       VARCHAR(8),
+        STEP_NM       VARCHAR(30),
+        PHASE_NM      VARCHAR(50) NOT NULL,
+        START_TM      DATETIME(3),
+        ELAPSED_SEC   DECIMAL(12,3),
+        ROW_CNT       BIGINT,
+        BYTE_CNT      BIGINT,
+        AFFECTED_CNT  BIGINT,
+        STATUS        VARCHAR(10),
+        KEY IX_PIPELINE_METRICS_1 (BASE_DT, STEP_NM),
+        KEY IX_PIPELINE_METRICS_2 (RUN_ID)
+    )
+""")
+
+INSERT_METRICS_SQL = text(f"""
+    INSERT INTO stock.{METRICS_TABLE}
+        (RUN_ID, BASE_DT, STEP_NM, PHASE_NM, START_TM, ELAPSED_SEC, ROW_CNT, BYTE_CNT, AFFECTED_CNT, STATUS)
+    VALUES
+        (:run_id, :base_dt, :step_nm, :phase_nm, :start_tm, :elapsed_sec, :row_cnt, :byte_cnt, :affected_cnt, :status)
+""")
+
+
+_local = threading.local()
+_records = []
+_records_lock = threading.Lock()
+
+
+class Span:
+
+    def __init__(self, phase, base_dt=None, step=None):
+        self.phase = phase
+        self.base_dt = base_dt
+        self.step = step
+        self.start_tm = datetime.now()
+        self.elapsed = 0.0
+        self.rows = None
+        self.bytes = None
+        self.affected = None
+        self.status = "ok"
+
+    def to_dict(self):
+        return {
+            "base_dt": self.base_dt,
+            "step_nm": self.step,
+            "phase_nm": self.phase,
+            "start_tm": self.start_tm,
+            "elapsed_sec": round(self.elapsed, 3),
+            "row_cnt": self.rows,
+            "byte_cnt": self.bytes,
+            "affected_cnt": self.affected,
+            "status": self.status,
+        }
+
+
+def new_run_id():
+    return f"{datetime.now():%Y%m%d%H%M%S}-{os.getpid()}"
+
+
+@contextmanager
+def step_context(base_dt, step):
+    """현재 스레드에서 기록되는 구간의 기준일 / 단계명 설정"""
+    prev = getattr(_local, "ctx", None)
+    _local.ctx = (base_dt, step)
+    try:
+        yield
+    finally:
+        _local.ctx = prev
+
+
+@contextmanager
+def span(phase):
+    base_dt, step = getattr(_local, "ctx", None) or (None, None)
+    s = Span(phase, base_dt, step)
+    start = time.perf_counter()
+    try:
+        yield s
+    except BaseException:
+        s.status = "error"
+        raise
+    finally:
+        s.elapsed = time.perf_counter() - start
+        with _records_lock:
+            _records.append(s)
+
+        counts = " ".join(f"{name}={value}" for name, value in
+                          (("rows", s.rows), ("bytes", s.bytes), ("affected", s.affected)) if value is not None)
+        print(f"[⏱] {step or '-'}.{phase} {s.elapsed:.2f}s {counts}".rstrip())
+
+
+def _take_records():
+    with _records_lock:
+        records = list(_records)
+        _records.clear()
+    return records
+
+
+def summarize(records):
+    """단계별 소요 시간 합계"""
+    summary = {}
+    for r in records:
+        key = f"{r['base_dt']}:{r['step_nm']}"
+        summary[key] = round(summary.get(key, 0.0) + r["elapsed_sec"], 3)
+    return summary
+
+
+def write_report(records, run_id, report_dir=None):
+    report_dir = report_dir or REPORT_DIR
+    os.makedirs(report_dir, exist_ok=True)
+    file_path = os.path.join(report_dir, f"pipeline_{run_id}.json")
+    report = {
+        "run_id": run_id,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "summary": summarize(records),
+        "spans": records,
+    }
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    return file_path
+
+
+def flush(engine, run_id=None):
+    """모인 구간 기록을 tb_pipeline_metrics 와 JSON 보고서로 저장. 저장 실패는 배치를 멈추지 않음"""
+    run_id = run_id or new_run_id()
+    records = [dict(s.to_dict(), run_id=run_id) for s in _take_records()]
+    if not records:
+        return records
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(CREATE_METRICS_SQL)
+            conn.execute(INSERT_METRICS_SQL, records)
+        print(f"[✔] {METRICS_TABLE} {len(records)}건 저장 완료 (RUN_ID={run_id})")
+    except Exception as e:
+        print(f"⚠️ {METRICS_TABLE} 저장 실패: {e}")
+
+    try:
+        print(f"[✔] 실행 보고서 저장: {write_report(records, run_id)}")
+    except OSError as e:
+        print(f"⚠️ 실행 보고서 저장 실패: {e}")
+    return records
@@ -0,0 +1,374 @@
+"""
+스키마 버전 관리 (키 / 인덱스 추가)
+
+- 적용된 버전은 tb_schema_version 에 기록하고, 아직 적용되지 않은 버전만 순서대로 실행
+- 각 단계는 현재 상태를 확인한 뒤 실행하므로 중간에 실패해도 다시 실행하면 이어서 진행
+- 키를 추가하기 전에 중복 / NULL 키 행을 정리
+    tb_stock_day_price, tb_stock_code : 키 기준 첫 행만 남김 (INSERT IGNORE 로 새 테이블에 복사 후 교체)
+    tb_work_day : WORK_SEQ 가 중복되면 WORK_DAY 순서로 다시 번호 부여
+- 팩트 테이블 압축 전환 (krx_storage) : {table}_data 에 DATE / CHAR(6) 타입으로 복사 후 원래 이름은 호환 뷰로 교체
+    원본은 {table}_legacy 로 남겨두므로 확인 후 직접 DROP (전환 중에는 배치를 멈출 것)
+- check_plans : 파이프라인 주요 조회의 EXPLAIN 결과가 인덱스를 타는지 확인
+
+실행 예)
+    python krx_migrate.py             # 미적용 버전 실행 후 EXPLAIN 확인
+    python krx_migrate.py --status    # 적용 이력만 출력
+    python krx_migrate.py --explain   # EXPLAIN 확인만 실행
+"""
+
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+
+from krx_partition import get_partitions, partition_table
+from krx_storage import COMPACT_TABLES, NAME_COLUMN, NAME_TABLE, data_table, table_type, create_compat_view, reset_cache
+from stockdb import get_engine
+
+
+DB_SCHEMA = "stock"
+VERSION_TABLE = "tb_schema_version"
+LEGACY_SUFFIX = "_legacy"
+
+# tb_stock_inv_trx_cnt 연속 순매수 지표 컬럼 (krx_streak)
+STREAK_COLUMNS = [
+    ("INST_CUR_CNT", "INT"),
+    ("FORE_CUR_CNT", "INT"),
+    ("INST_RUN_QTY", "BIGINT"),
+    ("FORE_RUN_QTY", "BIGINT"),
+]
+
+
+# --- 현재 스키마 조회 ---
+
+def primary_key_cols(conn, table_name):
+    sql = text("""
+        SELECT COLUMN_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table_name AND INDEX_NAME = 'PRIMARY'
+        ORDER BY SEQ_IN_INDEX
+    """)
+    return [row[0].upper() for row in conn.execute(sql, {"schema": DB_SCHEMA, "table_name": table_name})]
+
+
+def has_index(conn, table_name, index_name):
+    sql = text("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table_name AND INDEX_NAME = :index_name
+    """)
+    return conn.execute(sql, {"schema": DB_SCHEMA, "table_name": table_name, "index_name": index_name}).scalar() > 0
+
+
+def column_types(conn, table_name):
+    sql = text("""
+        SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table_name
+    """)
+    return {row[0].upper(): row[1].lower() for row in conn.execute(sql, {"schema": DB_SCHEMA, "table_name": table_name})}
+
+
+def count_duplicates(conn, table_name, cols):
+    key = ", ".join(cols)
+    sql = text(f"""
+        SELECT COALESCE(SUM(cnt - 1), 0) FROM (
+            SELECT COUNT(*) AS cnt FROM {DB_SCHEMA}.{table_name}
+            GROUP BY {key} HAVING COUNT(*) > 1
+        ) d
+    """)
+    return int(conn.execute(sql).scalar())
+
+
+# --- 변경 작업 ---
+
+def add_primary_key(conn, table_name, cols):
+    """NULL 키 / 중복 행 정리 후 기본 키 추가"""
+    if primary_key_cols(conn, table_name) == [c.upper() for c in cols]:
+        print(f"    {table_name} 기본 키 ({', '.join(cols)}) 이미 있음")
+        return
+
+    null_cond = " OR ".join(f"{col} IS NULL" for col in cols)
+    deleted = conn.execute(text(f"DELETE FROM {DB_SCHEMA}.{table_name} WHERE {null_cond}")).rowcount
+    if deleted:
+        print(f"    {table_name} 키가 NULL 인 행 {deleted}건 삭제")
+
+    dup_cnt = count_duplicates(conn, table_name, cols)
+    key = ", ".join(cols)
+    if dup_cnt == 0:
+        conn.execute(text(f"ALTER TABLE {DB_SCHEMA}.{table_name} ADD PRIMARY KEY ({key})"))
+    else:
+        # 키를 가진 새 테이블에 INSERT IGNORE 로 복사 (키별 첫 행만 남음) 후 이름 교체
+        print(f"    {table_name} 중복 행 {dup_cnt}건 정리 중...")
+        new_table, old_table = f"{table_name}_dedup", f"{table_name}_old"
+        conn.execute(text(f"DROP TABLE IF EXISTS {DB_SCHEMA}.{new_table}"))
+        conn.execute(text(f"CREATE TABLE {DB_SCHEMA}.{new_table} LIKE {DB_SCHEMA}.{table_name}"))
+        conn.execute(text(f"ALTER TABLE {DB_SCHEMA}.{new_table} ADD PRIMARY KEY ({key})"))
+        conn.execute(text(f"INSERT IGNORE INTO {DB_SCHEMA}.{new_table} SELECT * FROM {DB_SCHEMA}.{table_name}"))
+        conn.execute(text(f"""
+            RENAME TABLE {DB_SCHEMA}.{table_name} TO {DB_SCHEMA}.{old_table},
+                         {DB_SCHEMA}.{new_table} TO {DB_SCHEMA}.{table_name}
+        """))
+        conn.execute(text(f"DROP TABLE {DB_SCHEMA}.{old_table}"))
+    print(f"    {table_name} 기본 키 ({key}) 추가 완료")
+
+
+def add_index(conn, table_name, index_name, cols, unique=False):
+    if has_index(conn, table_name, index_name):
+        print(f"    {table_name}.{index_name} 이미 있음")
+        return
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    conn.execute(text(f"ALTER TABLE {DB_SCHEMA}.{table_name} ADD {kind} {index_name} ({', '.join(cols)})"))
+    print(f"    {table_name}.{index_name} ({', '.join(cols)}) 추가 완료")
+
+
+# --- 버전별 작업 ---
+
+def v1_stock_day_price_pk(conn):
+    add_primary_key(conn, "tb_stock_day_price", ["BASE_DT", "STOCK_CD"])
+
+
+def v2_stock_history_index(conn):
+    # 종목별 이력 조회 (STOCK_CD = ? AND BASE_DT BETWEEN ?)
+    add_index(conn, "tb_stock_day_price", "IX_STOCK_DAY_PRICE_1", ["STOCK_CD", "BASE_DT"])
+    add_index(conn, "tb_stock_day_trx", "IX_STOCK_DAY_TRX_1", ["STOCK_CD", "BASE_DT"])
+    add_index(conn, "tb_inv_net_buy_day", "IX_INV_NET_BUY_DAY_1", ["STOCK_CD", "BASE_DT"])
+
+
+def v3_work_day_seq(conn):
+    # TEXT 컬럼은 길이 없이 인덱스를 만들 수 없으므로 VARCHAR 로 변경
+    types = column_types(conn, "tb_work_day")
+    if any("text" in types.get(col, "") for col in ("WORK_DAY", "WORK_YN", "WORK_DIV")):
+        conn.execute(text(f"""
+            ALTER TABLE {DB_SCHEMA}.tb_work_day
+                MODIFY WORK_DAY VARCHAR(8) NOT NULL,
+                MODIFY WORK_YN VARCHAR(2),
+                MODIFY WORK_DIV VARCHAR(10)
+        """))
+        print("    tb_work_day TEXT 컬럼 → VARCHAR 변경 완료")
+
+    if count_duplicates(conn, "tb_work_day", ["WORK_DIV", "WORK_SEQ"]):
+        conn.execute(text(f"""
+            UPDATE {DB_SCHEMA}.tb_work_day t
+            JOIN (
+                SELECT WORK_DAY, ROW_NUMBER() OVER (PARTITION BY WORK_DIV ORDER BY WORK_DAY) AS SEQ
+                FROM {DB_SCHEMA}.tb_work_day
+            ) r ON t.WORK_DAY = r.WORK_DAY
+            SET t.WORK_SEQ = r.SEQ
+        """))
+        print("    tb_work_day WORK_SEQ 중복 → WORK_DAY 순서로 재번호 완료")
+
+    add_index(conn, "tb_work_day", "UX_WORK_DAY_1", ["WORK_DIV", "WORK_SEQ"], unique=True)
+
+
+def v4_stock_code_pk(conn):
+    # 기본 키 컬럼은 NOT NULL 로 바뀜 (NULL 행은 add_primary_key 에서 먼저 삭제)
+    add_primary_key(conn, "tb_stock_code", ["STOCK_CD"])
+
+
+def compact_table(conn, table_name):
+    """{table}_data 로 압축 타입 복사 → 원본은 {table}_legacy 로 이름 변경 → 원래 이름은 호환 뷰"""
+    data_name, legacy_name = data_table(table_name), f"{table_name}{LEGACY_SUFFIX}"
+    current = table_type(conn, table_name)
+    if current == "VIEW":
+        print(f"    {table_name} 이미 전환됨")
+        return
+    if current is None:
+        # 이름 변경 후 뷰 생성 전에 중단된 경우
+        create_compat_view(conn, table_name)
+        print(f"    {table_name} 호환 뷰 생성 완료")
+        return
+
+    max_len = conn.execute(text(f"SELECT MAX(CHAR_LENGTH(STOCK_CD)) FROM {DB_SCHEMA}.{table_name}")).scalar() or 0
+    if max_len > 6:
+        raise RuntimeError(f"{table_name} 에 6자리를 넘는 STOCK_CD 가 있어 CHAR(6) 로 바꿀 수 없습니다.")
+
+    # 이전 실행에서 복사 중 중단된 테이블은 다시 만듦
+    conn.execute(text(f"DROP TABLE IF EXISTS {DB_SCHEMA}.{data_name}"))
+    conn.execute(text(f"CREATE TABLE {DB_SCHEMA}.{data_name} LIKE {DB_SCHEMA}.{table_name}"))
+    partitions = get_partitions(conn, table_name)
+    if partitions:
+        conn.execute(text(f"ALTER TABLE {DB_SCHEMA}.{data_name} REMOVE PARTITIONING"))
+    changes = [f"DROP COLUMN {NAME_COLUMN}"]
+    changes += [f"MODIFY {col} {col_type}" for col, col_type in COMPACT_TABLES[table_name].items()]
+    conn.execute(text(f"ALTER TABLE {DB_SCHEMA}.{data_name} {', '.join(changes)}"))
+
+    cols = ", ".join(column_types(conn, data_name))
+    copied = conn.execute(text(f"""
+        INSERT INTO {DB_SCHEMA}.{data_name} ({cols})
+        SELECT {cols} FROM {DB_SCHEMA}.{table_name}
+    """)).rowcount
+    # tb_stock_code 에 없는 종목은 종목명과 함께 추가
+    added = conn.execute(text(f"""
+        INSERT IGNORE INTO {DB_SCHEMA}.{NAME_TABLE} (STOCK_CD, STOCK_NM)
+        SELECT STOCK_CD, MAX({NAME_COLUMN}) FROM {DB_SCHEMA}.{table_name} GROUP BY STOCK_CD
+    """)).rowcount
+    conn.commit()
+    print(f"    {table_name} → {data_name} {copied}건 복사, {NAME_TABLE} 종목 {added}건 추가")
+
+    if partitions:
+        partition_table(conn, data_name, [p[1:] for p in partitions if p.startswith("p2")])
+    conn.execute(text(f"RENAME TABLE {DB_SCHEMA}.{table_name} TO {DB_SCHEMA}.{legacy_name}"))
+    create_compat_view(conn, table_name)
+    print(f"    {table_name} 호환 뷰 생성 완료 (원본 {legacy_name} 는 확인 후 DROP)")
+
+
+def v5_compact_fact_tables(conn):
+    for table_name in COMPACT_TABLES:
+        if table_type(conn, table_name) is None and table_type(conn, data_table(table_name)) is None:
+            print(f"    {table_name} 없음, 건너뜀")
+            continue
+        compact_table(conn, table_name)
+    reset_cache()
+
+
+def v6_work_day_date(conn):
+    # 거래일은 DATE 로 보관 (조회하는 쪽은 DATE_FORMAT(WORK_DAY, '%Y%m%d') 로 문자열 사용)
+    if column_types(conn, "tb_work_day").get("WORK_DAY") == "date":
+        print("    tb_work_day.WORK_DAY 이미 DATE")
+        return
+    conn.execute(text(f"""
+        ALTER TABLE {DB_SCHEMA}.tb_work_day
+            MODIFY WORK_DAY DATE NOT NULL,
+            MODIFY WORK_YN CHAR(1)
+    """))
+    print("    tb_work_day WORK_DAY → DATE 변경 완료")
+
+
+def v7_trx_cnt_streak_columns(conn):
+    # 압축 전환된 테이블은 실제 테이블에 컬럼을 추가하고 호환 뷰를 다시 만듦
+    table_name = "tb_stock_inv_trx_cnt"
+    target = data_table(table_name) if table_type(conn, table_name) == "VIEW" else table_name
+    existing = column_types(conn, target)
+    adds = [f"ADD COLUMN {col} {col_type}" for col, col_type in STREAK_COLUMNS if col not in existing]
+    if not adds:
+        print(f"    {table_name} 연속 순매수 컬럼 이미 있음")
+        return
+    conn.execute(text(f"ALTER TABLE {DB_SCHEMA}.{target} {', '.join(adds)}"))
+    if target != table_name:
+        create_compat_view(conn, table_name)
+    print(f"    {table_name} 연속 순매수 컬럼 {len(adds)}개 추가 완료")
+
+
+# (버전, 설명, 작업 함수) : 버전 순서대로 실행
+MIGRATIONS = [
+    (1, "tb_stock_day_price PK (BASE_DT, STOCK_CD)", v1_stock_day_price_pk),
+    (2, "종목별 이력 인덱스 (STOCK_CD, BASE_DT)", v2_stock_history_index),
+    (3, "tb_work_day UNIQUE (WORK_DIV, WORK_SEQ)", v3_work_day_seq),
+    (4, "tb_stock_code PK (STOCK_CD)", v4_stock_code_pk),
+    (5, "팩트 테이블 압축 타입 (DATE / CHAR(6)) + 호환 뷰", v5_compact_fact_tables),
+    (6, "tb_work_day WORK_DAY DATE", v6_work_day_date),
+    (7, "tb_stock_inv_trx_cnt 연속 순매수 지표 컬럼", v7_trx_cnt_streak_columns),
+]
+
+
+def ensure_version_table(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {DB_SCHEMA}.{VERSION_TABLE} (
+            VERSION     INT PRIMARY KEY,
+            DESCRIPTION VARCHAR(200),
+            APPLIED_TM  DATETIME
+        )
+    """))
+
+
+def applied_versions(conn):
+    ensure_version_table(conn)
+    return {row[0] for row in conn.execute(text(f"SELECT VERSION FROM {DB_SCHEMA}.{VERSION_TABLE}"))}
+
+
+def migrate(engine):
+    """미적용 버전을 순서대로 실행. 실패하면 그 버전에서 멈춤 (DDL 은 자동 커밋되므로 재실행 시 이어서 진행)"""
+    with engine.connect() as conn:
+        done = applied_versions(conn)
+        conn.commit()
+        for version, description, func in MIGRATIONS:
+            if version in done:
+                continue
+            print(f"[▶] v{version} {description}")
+            func(conn)
+            conn.execute(text(f"""
+                INSERT INTO {DB_SCHEMA}.{VERSION_TABLE} (VERSION, DESCRIPTION, APPLIED_TM)
+                VALUES (:version, :description, :applied_tm)
+            """), {"version": version, "description": description, "applied_tm": datetime.now()})
+            conn.commit()
+            print(f"[✔] v{version} 적용 완료")
+
+
+def print_status(engine):
+    with engine.connect() as conn:
+        done = applied_versions(conn)
+    for version, description, _ in MIGRATIONS:
+        print(f"  v{version} [{'적용' if version in done else '미적용'}] {description}")
+
+
+# --- EXPLAIN 확인 ---
+
+# (이름, 조회 SQL, (확인할 테이블 별칭, 테이블), 사용해야 하는 인덱스)
+HOT_QUERIES = [
+    ("일자별 시세", """
+        SELECT * FROM stock.tb_stock_day_price p WHERE p.BASE_DT = :base_dt
+     """, ("p", "tb_stock_day_price"), {"PRIMARY"}),
+    ("지표 계산 구간 시세", """
+        SELECT p.BASE_DT, p.STOCK_CD, p.CLOSE_PRICE, p.TRADE_QTY FROM stock.tb_stock_day_price p
+        WHERE p.BASE_DT BETWEEN :from_dt AND :base_dt
+     """, ("p", "tb_stock_day_price"), {"PRIMARY"}),
+    ("종목별 시세 이력", """
+        SELECT * FROM stock.tb_stock_day_price p
+        WHERE p.STOCK_CD = :stock_cd AND p.BASE_DT BETWEEN :from_dt AND :base_dt
+     """, ("p", "tb_stock_day_price"), {"IX_STOCK_DAY_PRICE_1", "PRIMARY"}),
+    ("종목별 투자자 순매수 이력", """
+        SELECT * FROM stock.tb_inv_net_buy_day n
+        WHERE n.STOCK_CD = :stock_cd AND n.BASE_DT BETWEEN :from_dt AND :base_dt
+     """, ("n", "tb_inv_net_buy_day"), {"IX_INV_NET_BUY_DAY_1", "PRIMARY"}),
+    ("거래일 순번 구간", """
+        SELECT w.WORK_DAY FROM stock.tb_work_day w
+        WHERE w.WORK_DIV = 'stock' AND w.WORK_SEQ BETWEEN 1 AND 15
+     """, ("w", "tb_work_day"), {"UX_WORK_DAY_1"}),
+    ("종목코드 조회", """
+        SELECT * FROM stock.tb_stock_code c WHERE c.STOCK_CD = :stock_cd
+     """, ("c", "tb_stock_code"), {"PRIMARY"}),
+    ("등급 갱신 시세 조인", """
+        SELECT t1.STOCK_CD, t3.PRICE_GAP_RATE
+        FROM stock.tb_stock_inv_trx_cnt t1
+        LEFT JOIN stock.tb_stock_day_price t3 ON t1.BASE_DT = t3.BASE_DT AND t1.STOCK_CD = t3.STOCK_CD
+        WHERE t1.BASE_DT = :base_dt
+     """, ("t3", "tb_stock_day_price"), {"PRIMARY"}),
+]
+
+
+def check_plans(engine, base_dt=None, stock_cd="005930"):
+    """주요 조회의 EXPLAIN 결과 확인. (이름, 통과 여부, 접근 방식, 사용 인덱스) 목록 반환"""
+    with engine.connect() as conn:
+        if base_dt is None:
+            base_dt = conn.execute(text("SELECT DATE_FORMAT(MAX(BASE_DT), '%Y%m%d') FROM stock.tb_stock_day_price")).scalar() or "20250101"
+        params = {"base_dt": base_dt, "from_dt": f"{int(base_dt[:4]) - 1}{base_dt[4:]}", "stock_cd": stock_cd}
+
+        results = []
+        for name, sql, (alias, table_name), expected in HOT_QUERIES:
+            rows = conn.execute(text("EXPLAIN " + sql), params).mappings().all()
+            # 호환 뷰로 조회하면 실행 계획에는 실제 테이블 이름으로 표시됨
+            plan = next((r for r in rows if r["table"] in (alias, data_table(table_name))), None)
+            access, key = (plan["type"], plan["key"]) if plan else (None, None)
+            # 거래일 파티션 하나로 좁혀진 경우는 파티션 전체 읽기도 통과
+            single_partition = plan is not None and bool(plan.get("partitions")) and "," not in plan["partitions"]
+            ok = plan is not None and ((access != "ALL" and key in expected) or single_partition)
+            results.append((name, ok, access, key))
+
+    for name, ok, access, key in results:
+        print(f"  [{'✔' if ok else '✖'}] {name}: type={access}, key={key}")
+    return results
+
+
+if __name__ == "__main__":
+    engine = get_engine()
+    args = sys.argv[1:]
+
+    if "--status" in args:
+        print_status(engine)
+        sys.exit(0)
+
+    if "--explain" not in args:
+        migrate(engine)
+        print_status(engine)
+
+    print("\n[i] 주요 조회 EXPLAIN 확인")
+    failed = [name for name, ok, _, _ in check_plans(engine) if not ok]
+    sys.exit(1 if failed else 0)
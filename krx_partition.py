@@ -0,0 +1,182 @@
+"""
+팩트 테이블 BASE_DT 범위 파티션 관리
+
+- 대상 테이블을 거래일(tb_work_day) 단위 RANGE COLUMNS(BASE_DT) 파티션으로 변환
+    p_old             : 캘린더 첫 거래일 이전 이력
+    pYYYYMMDD         : 해당 거래일 (이전 거래일 ~ 해당 거래일 사이 날짜 포함)
+                        BASE_DT 가 DATE 인 압축 테이블(krx_storage)은 다음 날짜 미만, 문자열이면 'YYYYMMDD~' 미만
+    pmax              : 아직 파티션이 없는 이후 날짜
+- 새 거래일이 캘린더에 추가되면 ensure_partitions 로 pmax 를 나눠 파티션 추가
+- 압축 전환된 테이블은 호환 뷰가 아닌 실제 테이블({table}_data)에 파티션 작업 실행
+- 기준일 재적재
+    clear_date       : 해당 거래일 파티션 TRUNCATE (파티션이 없으면 DELETE)
+    reload_partition : 스테이징 테이블에 적재한 뒤 EXCHANGE PARTITION 으로 한번에 교체
+
+실행 예)
+    python krx_partition.py            # 변환 계획만 출력
+    python krx_partition.py --apply    # 파티션 변환 / 추가 실행
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from krx_calendar import get_calendar
+from krx_loader import bulk_load
+from krx_storage import storage_table, prepare_frame
+from stockdb import get_engine
+
+
+DB_SCHEMA = "stock"
+
+PARTITIONED_TABLES = [
+    "tb_stock_day_price",
+    "tb_inv_net_buy_day",
+    "tb_stock_inv_trx_m",
+    "tb_stock_inv_trx_cnt",
+    "tb_stock_trx_idx",
+]
+
+
+def partition_name(day):
+    return f"p{day}"
+
+
+def _is_date_key(conn, table_name):
+    sql = text("""
+        SELECT DATA_TYPE FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table_name AND COLUMN_NAME = 'BASE_DT'
+    """)
+    return conn.execute(sql, {"schema": DB_SCHEMA, "table_name": table_name}).scalar() == "date"
+
+
+def _date_literal(day, days=0):
+    return (datetime.strptime(day, "%Y%m%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def _partition_def(day, date_key=False):
+    # DATE 는 다음 날짜 미만, 문자열은 'YYYYMMDD~' (같은 날짜 문자열보다 크고 다음 날짜보다 작음)
+    bound = _date_literal(day, 1) if date_key else f"{day}~"
+    return f"PARTITION {partition_name(day)} VALUES LESS THAN ('{bound}')"
+
+
+def get_partitions(conn, table_name):
+    """테이블 파티션 이름 목록 (파티션 테이블이 아니면 빈 목록)"""
+    sql = text("""
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table_name AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """)
+    return [row[0] for row in conn.execute(sql, {"schema": DB_SCHEMA, "table_name": table_name})]
+
+
+def partition_table(conn, table_name, days):
+    """파티션이 없는 테이블을 거래일 파티션으로 변환 (테이블 재작성)"""
+    date_key = _is_date_key(conn, table_name)
+    first = _date_literal(days[0]) if date_key else days[0]
+    parts = [f"PARTITION p_old VALUES LESS THAN ('{first}')"]
+    parts += [_partition_def(day, date_key) for day in days]
+    parts.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    conn.execute(text(f"""
+        ALTER TABLE {DB_SCHEMA}.{table_name}
+        PARTITION BY RANGE COLUMNS(BASE_DT) (
+            {", ".join(parts)}
+        )
+    """))
+
+
+def add_partitions(conn, table_name, days):
+    """pmax 를 나눠 거래일 파티션 추가 (pmax 에 이미 들어간 행은 새 파티션으로 이동)"""
+    date_key = _is_date_key(conn, table_name)
+    parts = [_partition_def(day, date_key) for day in days]
+    parts.append("PARTITION pmax VALUES LESS THAN (MAXVALUE)")
+    conn.execute(text(f"""
+        ALTER TABLE {DB_SCHEMA}.{table_name}
+        REORGANIZE PARTITION pmax INTO (
+            {", ".join(parts)}
+        )
+    """))
+
+
+def plan_partitions(conn, table_name, days):
+    """(작업 구분, 추가할 거래일) : ("create", 전체) / ("add", 새 거래일) / (None, [])"""
+    existing = get_partitions(conn, table_name)
+    if not existing:
+        return "create", list(days)
+    last_day = max((p[1:] for p in existing if p.startswith("p2")), default="")
+    return ("add", [day for day in days if day > last_day]) if days[-1] > last_day else (None, [])
+
+
+def ensure_partitions(engine, tables=PARTITIONED_TABLES, create=False, dry_run=False):
+    """캘린더 거래일 파티션 추가. create=True 이면 파티션 없는 테이블도 변환"""
+    days = list(get_calendar(engine).days)
+    if not days:
+        print("⚠️ tb_work_day 에 거래일이 없습니다.")
+        return
+
+    with engine.connect() as conn:
+        for table_name in tables:
+            target = storage_table(conn, table_name)
+            action, new_days = plan_partitions(conn, target, days)
+            if action is None or (action == "create" and not create):
+                continue
+            print(f"[i] {table_name} 파티션 {'변환' if action == 'create' else '추가'}: "
+                  f"{len(new_days)}개 ({new_days[0]} ~ {new_days[-1]})")
+            if dry_run:
+                continue
+            if action == "create":
+                partition_table(conn, target, new_days)
+            else:
+                add_partitions(conn, target, new_days)
+            conn.commit()
+            print(f"[✔] {table_name} 파티션 반영 완료")
+
+
+def has_partition(conn, table_name, base_dt):
+    return partition_name(base_dt) in get_partitions(conn, storage_table(conn, table_name))
+
+
+def clear_date(conn, table_name, base_dt):
+    """기준일 데이터 삭제. 거래일 파티션이 있으면 TRUNCATE PARTITION (DDL 이라 진행 중인 트랜잭션은 커밋됨)"""
+    table_name = storage_table(conn, table_name)
+    if has_partition(conn, table_name, base_dt):
+        conn.execute(text(f"ALTER TABLE {DB_SCHEMA}.{table_name} TRUNCATE PARTITION {partition_name(base_dt)}"))
+        return None
+    return conn.execute(text(f"DELETE FROM {DB_SCHEMA}.{table_name} WHERE BASE_DT = :base_dt"),
+                        {"base_dt": base_dt}).rowcount
+
+
+def reload_partition(engine, table_name, base_dt, df):
+    """기준일 데이터를 df 로 교체. 거래일 파티션이 있으면 스테이징 테이블과 EXCHANGE PARTITION 으로 원자적 교체"""
+    with engine.connect() as conn:
+        table_name, df = prepare_frame(conn, table_name, df)
+        target = f"{DB_SCHEMA}.{table_name}"
+        staging = f"{DB_SCHEMA}.{table_name}_stg_{base_dt}"
+
+        if not has_partition(conn, table_name, base_dt):
+            # 파티션이 없으면 한 트랜잭션에서 DELETE 후 적재
+            clear_date(conn, table_name, base_dt)
+            rows = bulk_load(df, table_name, conn)
+            conn.commit()
+            return rows
+
+        conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+        conn.execute(text(f"CREATE TABLE {staging} LIKE {target}"))
+        try:
+            conn.execute(text(f"ALTER TABLE {staging} REMOVE PARTITIONING"))
+            rows = bulk_load(df, f"{table_name}_stg_{base_dt}", conn)
+            conn.commit()
+            conn.execute(text(f"ALTER TABLE {target} EXCHANGE PARTITION {partition_name(base_dt)} WITH TABLE {staging}"))
+        finally:
+            conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+            conn.commit()
+    return rows
+
+
+if __name__ == "__main__":
+    apply = "--apply" in sys.argv[1:]
+    engine = get_engine()
+    ensure_partitions(engine, create=True, dry_run=not apply)
+    if not apply:
+        print("\n[i] 계획만 출력했습니다. 실행하려면 --apply 인자를 주세요.")
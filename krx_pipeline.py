@@ -0,0 +1,290 @@
+"""
+일별 배치 파이프라인 (프로세스 내 DAG 실행)
+
+- 각 단계 스크립트를 subprocess 대신 함수로 import 하여 한 프로세스에서 실행
+- 단계별 선행 관계를 선언하고, 선행 단계가 끝난 단계부터 병렬로 실행
+- 모든 단계가 하나의 커넥션 풀(engine)을 공유
+- 여러 날짜 백필(run_backfill) 은 (날짜, 단계) 단위로 병렬 실행하고,
+  과거 거래일을 참조하는 단계(idx, inv_trx_m, inv_flow, trx_m_stat)만 참조 구간 날짜의 선행 단계가 끝날 때까지 대기
+- 단계 실행 중에는 (기준일, 단계) 단위 DB 잠금(GET_LOCK)을 잡아 다른 프로세스의 같은 작업과 겹치지 않도록 함
+- 단계 실행 결과는 tb_pipeline_run(krx_ledger) 에 기록. resume 실행 시 완료 후 입력이 바뀌지 않은 단계는 건너뜀
+- 단계 / 구간별 소요 시간은 tb_pipeline_metrics 와 JSON 실행 보고서(krx_metrics)로 저장
+
+- 기준일 데이터는 각 단계가 다운로드 / 계산을 마친 뒤 reload_partition 으로 교체하므로 사전 삭제(init) 단계 없음
+  (KRX 다운로드가 실패하면 기존 데이터 유지. 수동 삭제는 krx_stock_init.py)
+
+단계 의존관계
+    day_price ────────────────┬── idx ───────┐
+    inv_net_buy ───────────── │ ── inv_trx_m ┴── inv_trx_cnt
+    work_day ─────────────────┴── (idx, inv_trx_m)
+    day_price ─────────────────────────────────── inv_trx_cnt
+    inv_net_buy, work_day, 전 거래일 inv_flow ──── inv_flow (누적합)
+    inv_trx_m, 전 거래일 trx_m_stat ── trx_m_stat ── inv_trx_cnt (종목별 수집 빈도 요약)
+
+실행 예)
+    python krx_pipeline.py 20250404                       # 전체 단계
+    python krx_pipeline.py 20250404 inv_trx_m inv_trx_cnt # 지정 단계만
+    python krx_pipeline.py 20250102 20250630              # 기간 백필 (완료된 단계는 건너뜀)
+    python krx_pipeline.py 20250102 20250630 --force      # 기간 백필 (전체 재실행)
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from contextlib import contextmanager
+from functools import partial
+
+from sqlalchemy import text
+
+import krx_ledger
+import krx_metrics
+from krx_calendar import get_calendar
+from krx_partition import ensure_partitions
+from krx_tb_work_day_4 import update_work_days
+from krx_tb_stock_day_price_2 import load_day_price
+from krx_tb_inv_net_buy_day_2 import load_inv_net_buy_day
+from krx_stock_idx_calc import compute_and_insert_indicators
+from krx_tb_stock_inv_trx_m import build_inv_trx_m
+from krx_tb_stock_inv_trx_cnt_3 import main as build_inv_trx_cnt
+from krx_flow_cum import append_day as append_inv_flow, saved_last_day as inv_flow_last_day
+from krx_trx_m_stat import update_day as update_trx_m_stat
+from stockdb import get_engine
+
+
+# 동시에 실행할 단계 수 (KRX 요청 동시 실행 수는 krx_client 의 KRX_MAX_WORKERS 로 별도 제한)
+MAX_WORKERS = int(os.getenv("PIPELINE_MAX_WORKERS", str(os.cpu_count() or 4)))
+
+# 단계 잠금 대기 시간(초)
+LOCK_TIMEOUT = 600
+
+
+# 병렬 단계 수에 맞춘 공용 커넥션 풀 (프로세스 공용 엔진을 처음 만들 때 크기 적용)
+def create_pipeline_engine(max_workers=MAX_WORKERS):
+    return get_engine(pool_size=max_workers + 1, max_overflow=max_workers)
+
+
+# 거래일 갱신 후 캘린더 다시 로드, 새 거래일 파티션 추가
+def refresh_work_days(base_dt, engine):
+    update_work_days(engine=engine)
+    get_calendar(engine, refresh=True)
+    ensure_partitions(engine)
+
+
+# 단계 정의 : 단계명 → (실행 함수(base_dt, engine), 선행 단계 목록)
+STEPS = {
+    "work_day": (refresh_work_days, []),
+    "day_price": (load_day_price, []),
+    "inv_net_buy": (load_inv_net_buy_day, []),
+    "idx": (compute_and_insert_indicators, ["day_price", "work_day"]),
+    "inv_trx_m": (build_inv_trx_m, ["inv_net_buy", "work_day"]),
+    "trx_m_stat": (update_trx_m_stat, ["inv_trx_m"]),
+    "inv_trx_cnt": (build_inv_trx_cnt, ["inv_trx_m", "trx_m_stat", "idx", "day_price"]),
+    "inv_flow": (append_inv_flow, ["inv_net_buy", "work_day"]),
+}
+
+# 과거 거래일을 참조하는 단계 : 단계명 → (참조하는 선행 단계, 기준일 포함 참조 거래일 수)
+WINDOW_DEPS = {
+    "idx": ("day_price", 15),
+    "inv_trx_m": ("inv_net_buy", 7),
+    "inv_flow": ("inv_flow", 2),    # 전 거래일 누적값에서 이어서 계산
+    "trx_m_stat": ("trx_m_stat", 2),    # 전 거래일까지 반영된 요약에서 이어서 계산
+}
+
+# 백필 단계 : 단계명 → (다음 거래일도 대상일 때 대신 실행하는 함수(기준일만 계산, 이후 구간 삭제),
+#                        백필 시작 전 결과 마지막 거래일 조회 함수(engine) : 마지막 날짜가 여기까지 다시 계산)
+BACKFILL_FUNCS = {
+    "inv_flow": (partial(append_inv_flow, propagate=False), inv_flow_last_day),
+}
+
+
+@contextmanager
+def step_lock(engine, base_dt, step_name, timeout=LOCK_TIMEOUT):
+    """(기준일, 단계) 단위 MySQL 이름 잠금. 같은 작업을 다른 프로세스가 실행 중이면 끝날 때까지 대기"""
+    lock_name = f"stock.{step_name}.{base_dt}"
+    with engine.connect() as conn:
+        acquired = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"),
+                                {"name": lock_name, "timeout": timeout}).scalar()
+        if acquired != 1:
+            raise RuntimeError(f"DB 잠금 획득 실패: {lock_name}")
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": lock_name})
+
+
+def _locked_step(step_name, base_dt, engine, resume=False, func=None):
+    func = func or STEPS[step_name][0]
+
+    def run():
+        with krx_metrics.step_context(base_dt, step_name), step_lock(engine, base_dt, step_name):
+            with krx_metrics.span("ledger_check"):
+                krx_ledger.ensure_ledger(engine)
+                in_hash = krx_ledger.input_hash(engine, get_calendar(engine), step_name, base_dt)
+                complete = resume and krx_ledger.is_complete(engine, step_name, base_dt, in_hash)
+            if complete:
+                print(f"[⏩] 완료 이력이 있고 입력이 같아 건너뜀: {base_dt}:{step_name}")
+                return
+
+            start_tm = datetime.now()
+            try:
+                with krx_metrics.span("total") as s:
+                    func(base_dt, engine)
+                    s.rows = krx_ledger.output_rows(engine, step_name, base_dt)
+            except BaseException:
+                krx_ledger.record(engine, step_name, base_dt, "failed", in_hash, start_tm)
+                raise
+            krx_ledger.record(engine, step_name, base_dt, "done", in_hash, start_tm, s.rows)
+    return run
+
+
+def _run_task(key, func):
+    start = time.time()
+    print(f"[▶] 실행 중: {key}")
+    try:
+        func()
+    except (Exception, SystemExit) as e:
+        print(f"[✖] 실패: {key} - {e!r}")
+        return False
+    print(f"[✔] 완료: {key} ({time.time() - start:.1f}s)")
+    return True
+
+
+def run_dag(tasks, max_workers=MAX_WORKERS):
+    """tasks : {작업키: (인자 없는 실행 함수, 선행 작업키 목록)}
+
+    선행 작업이 모두 끝난 작업부터 병렬 실행. tasks 에 없는 선행 작업은 완료된 것으로 간주
+    동시에 실행 중인 작업은 max_workers 개까지만 제출하므로, 실행 가능한 작업은 tasks 순서대로 우선 실행
+    결과 : {작업키: "done" | "failed" | "skipped"}
+    """
+    status = {}
+    pending = dict(tasks)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for key, (func, deps) in list(pending.items()):
+                deps = [d for d in deps if d in tasks]
+                if any(status.get(d) in ("failed", "skipped") for d in deps):
+                    print(f"[⏩] 선행 단계 실패로 건너뜀: {key}")
+                    status[key] = "skipped"
+                    del pending[key]
+                elif len(running) < max_workers and all(status.get(d) == "done" for d in deps):
+                    running[executor.submit(_run_task, key, func)] = key
+                    del pending[key]
+
+            if not running:
+                # 순환 의존 등으로 실행할 수 있는 작업이 없음
+                for key in pending:
+                    status[key] = "skipped"
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                status[key] = "done" if future.result() else "failed"
+
+    return status
+
+
+def run_pipeline(base_dt, steps=None, engine=None, max_workers=MAX_WORKERS, resume=False):
+    """기준일 하나에 대해 선택한 단계(기본 전체)를 DAG 순서로 실행"""
+    engine = engine or create_pipeline_engine(max_workers)
+    selected = [name for name in STEPS if steps is None or name in steps]
+
+    tasks = {}
+    for name in selected:
+        tasks[name] = (_locked_step(name, base_dt, engine, resume), STEPS[name][1])
+
+    start = time.time()
+    status = run_dag(tasks, max_workers)
+    print(f"\n[i] {base_dt} 파이프라인 종료 ({time.time() - start:.1f}s) : {status}")
+    krx_metrics.flush(engine)
+    return status
+
+
+def run_backfill(dates, steps=None, engine=None, max_workers=MAX_WORKERS, resume=True):
+    """여러 기준일을 (날짜, 단계) 작업으로 펼쳐 한번에 병렬 실행
+
+    - 같은 날짜 안의 선행 관계는 STEPS 그대로
+    - WINDOW_DEPS 단계는 참조 구간 중 이번 백필 대상 날짜의 선행 단계도 기다림
+      (대상이 아닌 과거 날짜는 이미 적재된 것으로 간주)
+    - BACKFILL_FUNCS 단계는 다음 거래일도 대상이면 기준일만 계산하고, 마지막 날짜에서 한번만
+      백필 시작 전 결과 마지막 거래일까지 이후 구간 갱신 (중간 날짜가 지운 백필 구간 이후 결과 복구)
+    - work_day 는 날짜와 무관하므로 백필 전에 한번만 실행 (refresh_work_days)
+    - resume=True 이면 tb_pipeline_run 기준 완료되고 입력이 같은 단계는 건너뜀
+    """
+    engine = engine or create_pipeline_engine(max_workers)
+    dates = sorted(dates)
+    selected = [name for name in STEPS if name != "work_day" and (steps is None or name in steps)]
+    calendar = get_calendar(engine)
+    date_set = set(dates)
+    backfill_ends = {name: last_day(engine) for name, (_, last_day) in BACKFILL_FUNCS.items() if name in selected}
+
+    # 앞 날짜의 작업부터 제출되도록 날짜 순으로 등록
+    tasks = {}
+    for base_dt in dates:
+        for name in selected:
+            deps = [f"{base_dt}:{d}" for d in STEPS[name][1]]
+            if name in WINDOW_DEPS:
+                dep_step, n_days = WINDOW_DEPS[name]
+                deps += [f"{day}:{dep_step}" for day in calendar.window(base_dt, n_days)
+                         if day != base_dt and day in date_set]
+            func = None
+            if name in BACKFILL_FUNCS:
+                if calendar.shift(base_dt, 1) in date_set:
+                    func = BACKFILL_FUNCS[name][0]
+                else:
+                    func = partial(STEPS[name][0], to_dt=backfill_ends[name])
+            tasks[f"{base_dt}:{name}"] = (_locked_step(name, base_dt, engine, resume, func), deps)
+
+    start = time.time()
+    status = run_dag(tasks, max_workers)
+    failed = sorted({key.split(":")[0] for key, result in status.items() if result != "done"})
+    print(f"\n[i] 백필 종료 : {len(dates)}일, {len(tasks)}개 작업 ({time.time() - start:.1f}s)")
+    if failed:
+        print(f"[!] 실패/건너뜀 단계가 있는 날짜: {failed}")
+    krx_metrics.flush(engine)
+    return status
+
+
+def validate_date(date_str):
+    try:
+        datetime.strptime(date_str, "%Y%m%d")
+        return True
+    except ValueError:
+        print(f"Invalid date format: {date_str}. Please use YYYYMMDD (e.g., 20250404).")
+        return False
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and validate_date(sys.argv[1]):
+        base_dt = sys.argv[1]
+    else:
+        while True:
+            base_dt = input("Enter base date (YYYYMMDD, e.g., 20250404): ").strip()
+            if validate_date(base_dt):
+                break
+            print("잘못된 날짜 형식입니다. 다시 입력해주세요 (예: 20250404)")
+
+    args = [a for a in sys.argv[2:] if not a.startswith("--")]
+    force = "--force" in sys.argv[2:]
+    to_date = args.pop(0) if args and args[0].isdigit() and validate_date(args[0]) else None
+
+    steps = args or None
+    unknown = [s for s in steps or [] if s not in STEPS]
+    if unknown:
+        print(f"알 수 없는 단계: {unknown} (가능한 단계: {list(STEPS)})")
+        sys.exit(1)
+
+    if to_date:
+        engine = create_pipeline_engine()
+        if steps is None or "work_day" in steps:
+            refresh_work_days(None, engine)
+        status = run_backfill(get_calendar(engine).range(base_dt, to_date), steps, engine=engine,
+                              resume=not force)
+    else:
+        status = run_pipeline(base_dt, steps)
+    sys.exit(0 if all(v == "done" for v in status.values()) else 1)
@@ -0,0 +1,185 @@
+"""
+KRX CSV 보고서별 컬럼 매핑 / dtype 레지스트리
+
+- 보고서(MDCSTAT*) CSV 의 한글 컬럼 → 테이블 컬럼 매핑과 dtype 을 한 곳에서 선언
+- parse_report : euc-kr CSV 원본을 바로 테이블 컬럼 순서의 타입 지정 DataFrame 으로 변환
+- insert_report : 같은 스키마 정보로 테이블에 일괄 저장 (krx_loader.bulk_load)
+
+dtype 구분
+    str      : 문자열 (종목코드는 앞자리 0 유지)
+    date     : 'YYYY/MM/DD' → 'YYYYMMDD' 문자열
+    category : 반복되는 구분 코드 (시장구분, 투자자구분)
+    int32 / int64 / float32 : 숫자 (빈 값은 0)
+"""
+
+import io
+
+import pandas as pd
+
+from krx_loader import bulk_load
+
+
+NUMERIC_DTYPES = ("int32", "int64", "float32")
+
+
+class ReportSchema:
+    """보고서 1종 → 테이블 1개 매핑
+
+    columns : (테이블 컬럼, KRX 컬럼, dtype) 목록. 테이블 컬럼 순서와 동일
+              KRX 컬럼이 None 이면 parse_report 호출 시 값을 넘겨 받는 상수 컬럼
+    """
+
+    def __init__(self, name, report, table, columns):
+        self.name = name
+        self.report = report
+        self.table = table
+        self.columns = columns
+
+    @property
+    def table_columns(self):
+        return [col for col, _, _ in self.columns]
+
+    @property
+    def source_columns(self):
+        return {src: col for col, src, _ in self.columns if src is not None}
+
+    @property
+    def constant_columns(self):
+        return [col for col, src, _ in self.columns if src is None]
+
+    @property
+    def dtypes(self):
+        return {col: dtype for col, _, dtype in self.columns}
+
+
+# 전종목 시세 → tb_stock_day_price
+STOCK_DAY_PRICE = ReportSchema("stock_day_price", "MDCSTAT01501", "tb_stock_day_price", [
+    ("BASE_DT", None, "str"),
+    ("STOCK_CD", "종목코드", "str"),
+    ("STOCK_NM", "종목명", "str"),
+    ("MRKT_DIV", None, "category"),
+    ("STOCK_MNG", None, "str"),
+    ("CLOSE_PRICE", "종가", "int32"),
+    ("PRICE_GAP", "대비", "int32"),
+    ("PRICE_GAP_RATE", "등락률", "float32"),
+    ("OPEN_PRICE", "시가", "int32"),
+    ("HIGH_PRICE", "고가", "int32"),
+    ("LOW_PRICE", "저가", "int32"),
+    ("TRADE_QTY", "거래량", "int64"),
+    ("TRADE_AMT", "거래대금", "int64"),
+    ("MRKT_CAPITAL", "시가총액", "int64"),
+    ("ISSUE_STOCK_QTY", "상장주식수", "int64"),
+])
+
+# 개별종목 시세 추이 → tb_stock_day_price
+STOCK_HISTORY_PRICE = ReportSchema("stock_history_price", "MDCSTAT01701", "tb_stock_day_price", [
+    ("BASE_DT", "일자", "date"),
+    ("STOCK_CD", None, "str"),
+    ("STOCK_NM", None, "str"),
+    ("MRKT_DIV", None, "category"),
+    ("STOCK_MNG", None, "str"),
+    ("CLOSE_PRICE", "종가", "int32"),
+    ("PRICE_GAP", "대비", "int32"),
+    ("PRICE_GAP_RATE", "등락률", "float32"),
+    ("OPEN_PRICE", "시가", "int32"),
+    ("HIGH_PRICE", "고가", "int32"),
+    ("LOW_PRICE", "저가", "int32"),
+    ("TRADE_QTY", "거래량", "int64"),
+    ("TRADE_AMT", "거래대금", "int64"),
+    ("MRKT_CAPITAL", "시가총액", "int64"),
+    ("ISSUE_STOCK_QTY", "상장주식수", "int64"),
+])
+
+# 개별종목 시세 추이 → tb_stock_day_trx
+STOCK_DAY_TRX = ReportSchema("stock_day_trx", "MDCSTAT01701", "tb_stock_day_trx", [
+    ("BASE_DT", "일자", "date"),
+    ("STOCK_CD", None, "str"),
+    ("STOCK_NM", None, "str"),
+    ("DOD", "대비", "int32"),
+    ("DOD_RATE", "등락률", "float32"),
+    ("OPEN_PRICE", "시가", "int32"),
+    ("HIGH_PRICE", "고가", "int32"),
+    ("LOW_PRICE", "저가", "int32"),
+    ("TRADE_QTY", "거래량", "int64"),
+])
+
+# 투자자별 순매수 상위종목 → tb_inv_net_buy_day
+INV_NET_BUY_DAY = ReportSchema("inv_net_buy_day", "MDCSTAT02401", "tb_inv_net_buy_day", [
+    ("BASE_DT", None, "str"),
+    ("INV_DIV", None, "category"),
+    ("STOCK_CD", "종목코드", "str"),
+    ("STOCK_NM", "종목명", "str"),
+    ("TRADE_SEL_QTY", "거래량_매도", "int64"),
+    ("TRADE_BUY_QTY", "거래량_매수", "int64"),
+    ("TRADE_NET_BUY_QTY", "거래량_순매수", "int64"),
+    ("TRADE_SEL_AMT", "거래대금_매도", "int64"),
+    ("TRADE_BUY_AMT", "거래대금_매수", "int64"),
+    ("TRADE_NET_BUY_AMT", "거래대금_순매수", "int64"),
+])
+
+SCHEMAS = {schema.name: schema for schema in (
+    STOCK_DAY_PRICE,
+    STOCK_HISTORY_PRICE,
+    STOCK_DAY_TRX,
+    INV_NET_BUY_DAY,
+)}
+
+
+def get_schema(schema):
+    return SCHEMAS[schema] if isinstance(schema, str) else schema
+
+
+def _read_dtype(dtype):
+    # read_csv 단계에서 지정할 dtype (date 는 문자열로 읽은 뒤 변환)
+    return "str" if dtype == "date" else dtype
+
+
+def cast_frame(df, schema):
+    """테이블 컬럼 이름을 가진 DataFrame 을 스키마 dtype / 컬럼 순서로 맞춤"""
+    schema = get_schema(schema)
+    out = {}
+    for col, _, dtype in schema.columns:
+        values = df[col]
+        if dtype in NUMERIC_DTYPES:
+            values = pd.to_numeric(values, errors="coerce").fillna(0).astype(dtype)
+        elif dtype == "date":
+            values = values.astype(str).str.replace("/", "", regex=False).str.replace("-", "", regex=False)
+        elif dtype == "category":
+            values = values.astype("category")
+        out[col] = values
+    return pd.DataFrame(out)
+
+
+def parse_report(schema, raw, **constants):
+    """KRX CSV 원본(euc-kr bytes) → 테이블 컬럼 순서의 타입 지정 DataFrame. 데이터가 없으면 None"""
+    schema = get_schema(schema)
+    if raw is None:
+        return None
+
+    missing = [col for col in schema.constant_columns if col not in constants]
+    if missing:
+        raise ValueError(f"{schema.name} 상수 컬럼 값이 없습니다: {missing}")
+
+    sources = schema.source_columns
+    dtypes = {src: _read_dtype(dtype) for col, src, dtype in schema.columns if src is not None}
+    try:
+        df = pd.read_csv(io.BytesIO(raw), encoding="euc-kr", usecols=list(sources), dtype=dtypes)
+    except ValueError:
+        # 빈 값 등으로 정수 변환이 안되는 경우 숫자 컬럼은 cast_frame 에서 보정
+        str_dtypes = {src: "str" for src, dtype in dtypes.items() if dtype not in NUMERIC_DTYPES}
+        df = pd.read_csv(io.BytesIO(raw), encoding="euc-kr", usecols=list(sources), dtype=str_dtypes)
+
+    if df.empty:
+        print(f"No data available in {schema.report} data")
+        return None
+
+    df = df.rename(columns=sources)
+    for col in schema.constant_columns:
+        df[col] = constants[col]
+    return cast_frame(df, schema)
+
+
+def insert_report(df, schema, con, upsert=False):
+    """스키마 테이블에 일괄 저장 (LOAD DATA, 안되면 다건 INSERT)"""
+    schema = get_schema(schema)
+    return bulk_load(df[schema.table_columns], schema.table, con, upsert=upsert)
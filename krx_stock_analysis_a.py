@@ -1,6 +1,5 @@
 
 import pandas as pd
-from sqlalchemy import create_engine
 from sqlalchemy import text  # Make sure this is at the top
 
 import getpass
@@ -14,37 +13,14 @@ import matplotlib.pyplot as plt
 from datetime import datetime
 import os, sys
 
+from krx_calendar import get_calendar
+from stockdb import get_engine
+
 
 
 def fetch_data(base_dt, engine):
     query = """
-    with trx_base_dt as
-    (
-        select
-            a.base_dt
-            ,b.work_seq
-            ,b.work_seq + 1 as next_work_seq
-        from
-            stock.tb_stock_inv_trx_cnt a
-            ,stock.tb_work_day b
-        where 1=1
-            and a.base_dt = :base_dt
-            and b.work_day = a.base_dt
-        group by work_day
-            ,work_seq
-    )
-    ,trx_next_base_dt as
-    (
-        select
-             b1.*
-            ,b2.work_day as next_base_dt
-        from
-            trx_base_dt b1
-            ,stock.tb_work_day b2
-        where 1=1
-            and b1.next_work_seq = b2.work_seq
-    )
-    , trx_net_buy_rank as (
+    with trx_net_buy_rank as (
     
            SELECT
                 BASE_DT, STOCK_CD,
@@ -55,7 +31,7 @@ def fetch_data(base_dt, engine):
             GROUP BY BASE_DT, STOCK_CD
     )
     select
-        a.BASE_DT
+        DATE_FORMAT(a.BASE_DT, '%Y%m%d') as BASE_DT
         ,a.STOCK_CD
         ,a.STOCK_NM
         ,a.INST_CNT
@@ -67,7 +43,7 @@ def fetch_data(base_dt, engine):
         ,a.D1_TRX_QTY
         ,a.D7_AVG_TRX_RATE
         ,a.BUY_GRADE
-        ,c.BASE_DT as NEXT_BASE_DT
+        ,DATE_FORMAT(c.BASE_DT, '%Y%m%d') as NEXT_BASE_DT
         ,c.MRKT_DIV
         ,c.CLOSE_PRICE
         ,c.PRICE_GAP
@@ -80,22 +56,27 @@ def fetch_data(base_dt, engine):
         ,c.MRKT_CAPITAL
         ,c.ISSUE_STOCK_QTY
     from
-        trx_next_base_dt x
-        ,stock.tb_stock_inv_trx_cnt a
+        stock.tb_stock_inv_trx_cnt a
         ,stock.tb_stock_day_price c
         ,trx_net_buy_rank d
     where 1=1
-        and a.base_dt = x.base_dt
-        and c.base_dt = x.next_base_dt
+        and a.base_dt = :base_dt
+        and c.base_dt = :next_base_dt
         and c.stock_cd = a.stock_cd
 
-        and d.base_dt = x.base_dt
+        and d.base_dt = a.base_dt
         and d.stock_cd = a.stock_cd
         and d.INV_RANK_AMT < 20
         and d.FOR_RANK_AMT < 20
     """
     try:
-        df = pd.read_sql(text(query), engine, params={'base_dt': base_dt})
+        # 다음 거래일은 캘린더에서 계산 (tb_work_day self-join 제거)
+        next_base_dt = get_calendar(engine).shift(base_dt, 1)
+        if next_base_dt is None:
+            print(f"{base_dt} 의 다음 거래일이 없습니다.")
+            return None
+
+        df = pd.read_sql(text(query), engine, params={'base_dt': base_dt, 'next_base_dt': next_base_dt})
         return df
     except Exception as e:
         print(f"Error fetching data: {e}")
@@ -184,8 +165,8 @@ def main():
     base_dt = input("Enter base date (YYYYMMDD): ")
 
 
-    # DB 연결 설정
-    engine = create_engine("mysql+mysqlconnector://root@localhost/stock?charset=utf8")
+    # 프로세스 공용 엔진
+    engine = get_engine()
 
     # 데이터 가져오기
     df = fetch_data(base_dt, engine)
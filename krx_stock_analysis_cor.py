@@ -1,14 +1,11 @@
 
 import pandas as pd
 from datetime import datetime
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import os, sys
 
-# MySQL 연결 설정
-MYSQL_USER = "root"
-MYSQL_PASSWORD = ""
-MYSQL_HOST = "localhost"
-MYSQL_DB = "stock"
+from krx_calendar import get_calendar
+from stockdb import get_engine
 
 def validate_date(date_str):
     try:
@@ -28,32 +25,15 @@ else:
             break
         print("잘못된 날짜 형식입니다. 다시 입력해주세요 (예: 20250404)")
 
-# SQLAlchemy 엔진 생성
-engine = create_engine(
-    f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}?charset=utf8"
-)
+# 프로세스 공용 엔진
+engine = get_engine()
 
 with engine.connect() as conn:
-    # 1. base_dt에 해당하는 work_seq 조회
-    work_seq_query = text("""
-        SELECT work_seq
-        FROM stock.tb_work_day
-        WHERE work_day = :base_dt
-    """)
-    result = conn.execute(work_seq_query, {'base_dt': base_dt}).fetchone()
-    if result is None:
+    # 1~2. 기준일 포함 이후 5거래일 추출 (캘린더)
+    calendar = get_calendar(engine)
+    if base_dt not in calendar:
         raise ValueError(f"[!] No work_seq found for base_dt {base_dt}")
-    work_seq = result[0]
-
-    # 2. work_seq 기준 7일간의 work_day 추출
-    seq_range_query = text("""
-        SELECT work_day
-        FROM stock.tb_work_day
-        WHERE work_seq BETWEEN :start AND :end
-        ORDER BY work_seq
-    """)
-    result = conn.execute(seq_range_query, {'start': work_seq, 'end': work_seq + 4})
-    dates = [row[0] for row in result.fetchall()]
+    dates = calendar.range(base_dt, calendar.shift(base_dt, 4, clip=True))
 
     if not dates:
         raise ValueError("[!] work_day 조회 실패")
@@ -64,7 +44,7 @@ with engine.connect() as conn:
     # 3. 가격정보 조회
     placeholders = ", ".join([f":date{i}" for i in range(len(sorted_dates))])
     price_query = text(f"""
-        SELECT stock_cd, base_dt, price_gap_rate
+        SELECT stock_cd, DATE_FORMAT(base_dt, '%Y%m%d') AS base_dt, price_gap_rate
         FROM stock.tb_stock_day_price
         WHERE base_dt IN ({placeholders})
     """)
@@ -87,7 +67,7 @@ with engine.connect() as conn:
     # 6. 종목 정보 조회
     inv_query = text("""
         SELECT  
-            base_dt, stock_cd, stock_nm, inst_cnt, inst_con_cnt,
+            DATE_FORMAT(base_dt, '%Y%m%d') AS base_dt, stock_cd, stock_nm, inst_cnt, inst_con_cnt,
             fore_cnt, fore_con_cnt, buy_con_cnt, avg_trx_qty,
             d1_trx_qty, d7_avg_trx_rate, buy_grade
         FROM stock.tb_stock_inv_trx_cnt 
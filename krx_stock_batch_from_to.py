@@ -1,16 +1,11 @@
-import subprocess
-import sys, os
+import sys
 from datetime import datetime
-import pymysql
 
-# 🔹 DB 연결 설정
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': '',
-    'db': 'stock',
-    'charset': 'utf8'
-}
+from krx_calendar import get_calendar
+from krx_pipeline import create_pipeline_engine, refresh_work_days, run_backfill
+
+# 🔹 DB 연결 (모든 단계가 공유하는 커넥션 풀)
+engine = create_pipeline_engine()
 
 # 🔹 날짜 유효성 검사
 def validate_date(date_str):
@@ -21,33 +16,18 @@ def validate_date(date_str):
         print(f"Invalid date format: {date_str}. Please use YYYYMMDD.")
         return False
 
-# 🔹 work_day 기준으로 날짜 리스트 조회
+# 🔹 work_day 기준으로 날짜 리스트 조회 (캘린더)
 def get_work_days(from_date, to_date):
-    try:
-        conn = pymysql.connect(**DB_CONFIG)
-        with conn.cursor() as cursor:
-            sql = """
-                SELECT work_day
-                FROM tb_work_day
-                WHERE work_day BETWEEN %s AND %s
-                ORDER BY work_day;
-            """
-            cursor.execute(sql, (from_date, to_date))
-            return [row[0] for row in cursor.fetchall()]
-    finally:
-        conn.close()
-
-# 🔹 실행 환경 설정
-venv_python_path = r"D:/python_proj/venv_stock/Scripts/python.exe"
-SCRIPT_DIR = r"d:/python_proj/venv_stock/stock"
+    return get_calendar(engine).range(from_date, to_date)
 
-# 🔹 실행할 스크립트 목록
+# 🔹 날짜별 실행 단계 (krx_pipeline.STEPS)
 scripts = [
-    ("krx_stock_init.py", True),
-    ("krx_tb_stock_day_price_2.py", True),
-    ("krx_tb_inv_net_buy_day_2.py", True),
-    ("krx_tb_stock_inv_trx_m.py", True),
-    ("krx_tb_stock_inv_trx_cnt_2.py", True),
+    "day_price",
+    "inv_net_buy",
+    "inv_trx_m",
+    "trx_m_stat",
+    "inv_trx_cnt",
+    "inv_flow",
 ]
 
 # 🔹 실행 날짜 선택
@@ -93,37 +73,24 @@ while mode not in ["1", "2"]:
     print("2. 단계별로 선택 실행")
     mode = input("선택 (1 또는 2): ").strip()
 
-print("\n[✔] 실행 시작\n")
-
-# 🔹 날짜별 배치 실행
-for date_str in date_list:
-    print(f"\n=== [날짜: {date_str}] ===")
-
-    # krx_tb_work_day_3.py 항상 선실행
-    work_day_script = os.path.join(SCRIPT_DIR, "krx_tb_work_day_3.py")
-    cmd = [venv_python_path, work_day_script]
-    print(f"[▶] work_day 스크립트 실행: {' '.join(cmd)}")
-    subprocess.run(cmd)
-
-    for script_name, use_date in scripts:
-        if mode == "2":
-            user_input = ""
-            while user_input not in ["y", "n"]:
-                user_input = input(f"▶ {script_name} 실행할까요? (y/n): ").strip().lower()
-            if user_input == "n":
-                print(f"⏩ {script_name} 건너뜀\n")
-                continue
+if mode == "2":
+    selected = []
+    for step_name in scripts:
+        user_input = ""
+        while user_input not in ["y", "n"]:
+            user_input = input(f"▶ {step_name} 실행할까요? (y/n): ").strip().lower()
+        if user_input == "n":
+            print(f"⏩ {step_name} 건너뜀\n")
+            continue
+        selected.append(step_name)
+    scripts = selected
 
-        args = [date_str] if use_date else []
-        script_path = os.path.join(SCRIPT_DIR, script_name)
-        cmd = [venv_python_path, script_path] + args
+print("\n[✔] 실행 시작\n")
 
-        print(f"[▶] 실행 중: {' '.join(cmd)}")
-        try:
-            subprocess.run(cmd, check=True)
-            print(f"[✔] 완료: {script_name}\n")
-        except subprocess.CalledProcessError as e:
-            print(f"[✖] 실패: {script_name} - 에러 코드 {e.returncode}")
-            print(f"    => 무시하고 다음 스크립트 또는 날짜로 계속 진행합니다.\n")
-            continue
+# 🔹 work_day 는 기간 시작 전에 한번만 갱신
+print("[▶] work_day 갱신")
+refresh_work_days(None, engine)
 
+# 🔹 날짜별 배치 병렬 실행 (실패한 날짜의 후속 단계만 건너뛰고 나머지 날짜는 계속 진행)
+#    이전 실행에서 완료되고 입력이 바뀌지 않은 단계는 건너뜀 (--force 인자 시 전체 재실행)
+run_backfill(date_list, scripts, engine=engine, resume="--force" not in sys.argv[1:])
@@ -1,16 +1,13 @@
 
 
 import pandas as pd
-import pymysql
-from sqlalchemy import create_engine
 from datetime import datetime
 import sys
 
-from sqlalchemy import text
-
-# ✅ DB 연결 함수
-def get_db_connection():
-    return create_engine("mysql+pymysql://root@localhost:3306/stock")  # DB 정보 수정 필요
+from krx_calendar import get_calendar
+from krx_metrics import span
+from krx_loader import bulk_load
+from stockdb import get_engine, repository
 
 # ✅ 날짜 유효성 검사
 def validate_date(date_str):
@@ -55,32 +52,13 @@ def calculate_obv(df):
 
 
 # ✅ RSI & OBV 계산 및 저장 함수
-def compute_and_insert_indicators(base_date: str):
-    engine = get_db_connection()
-    conn = engine.raw_connection()
-    cursor = conn.cursor()
-
-    # ✅ 기준일의 work_seq 값 가져오기
-    query_seq = f"""
-        SELECT work_seq FROM stock.tb_work_day
-        WHERE work_day = '{base_date}'
-    """
-    with engine.connect() as con:
-        result = con.execute(text(query_seq)).fetchone()
-        if result is None:
-            raise ValueError("기준일의 WORK_SEQ 값을 찾을 수 없습니다.")
-        base_seq = result[0]
+def compute_and_insert_indicators(base_date: str, engine=None):
+    engine = engine or get_engine()
 
     # ✅ 기준일 포함, 과거 14일의 WORK_DAY 가져오기
-    query_days = f"""
-        SELECT work_day FROM stock.tb_work_day
-        WHERE work_seq BETWEEN {base_seq - 14} AND {base_seq}
-        ORDER BY work_seq
-    """
-    with engine.connect() as con:
-        days = [row[0] for row in con.execute(text(query_days)).fetchall()]
-        if len(days) < 15:
-            raise ValueError("거래일 수가 부족합니다.")
+    days = get_calendar(engine).window(base_date, 15)
+    if len(days) < 15:
+        raise ValueError("거래일 수가 부족합니다.")
 
     start_date = days[0]   # 과거 14일 전
     end_date = days[-1]    # 기준일
@@ -88,12 +66,9 @@ def compute_and_insert_indicators(base_date: str):
     print(f"📅 기준일: {end_date}, 조회 시작일: {start_date}")
 
     # ✅ 데이터 조회
-    query = f"""
-        SELECT BASE_DT, STOCK_CD, STOCK_NM, CLOSE_PRICE, TRADE_QTY
-        FROM tb_stock_day_price
-        WHERE BASE_DT BETWEEN '{start_date}' AND '{end_date}'
-    """
-    df = pd.read_sql(query, engine)
+    with span("select") as s:
+        df = repository.day_prices(engine, start_date, end_date)
+        s.rows = len(df)
 
     # ✅ 종목별 RSI + OBV 계산
     def process_group(group_df):
@@ -101,39 +76,23 @@ def compute_and_insert_indicators(base_date: str):
         group_df = calculate_obv(group_df)
         return group_df
 
-    result_df = (
-        df.groupby('STOCK_CD', group_keys=False)
-          .apply(process_group)
-          .dropna(subset=['RSI'])
-          .reset_index(drop=True)
-    )
+    with span("compute") as s:
+        result_df = (
+            df.groupby('STOCK_CD', group_keys=False)
+              .apply(process_group)
+              .dropna(subset=['RSI'])
+              .reset_index(drop=True)
+        )
+        s.rows = len(result_df)
 
     print(result_df.head())  # 디버깅용 출력
 
-    # ✅ INSERT 또는 UPSERT
-    insert_sql = """
-        INSERT INTO tb_stock_trx_idx (BASE_DT, STOCK_CD, STOCK_NM, CLOSE_PRICE, RSI, OBV)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-            CLOSE_PRICE = VALUES(CLOSE_PRICE),
-            RSI = VALUES(RSI),
-            OBV = VALUES(OBV)
-    """
-
-    for _, row in result_df.iterrows():
-        cursor.execute(insert_sql, (
-            row['BASE_DT'],
-            row['STOCK_CD'],
-            row['STOCK_NM'],
-            row['CLOSE_PRICE'],
-            float(row['RSI']),
-            float(row['OBV'])
-        ))
-        print(f"✅ Inserted/Updated: {row['STOCK_CD']} on {row['BASE_DT']}")
-
-    conn.commit()
-    cursor.close()
-    conn.close()
+    # ✅ 일괄 UPSERT (기존 키는 CLOSE_PRICE, RSI, OBV 갱신)
+    with span("upsert") as s:
+        s.rows = bulk_load(
+            result_df[['BASE_DT', 'STOCK_CD', 'STOCK_NM', 'CLOSE_PRICE', 'RSI', 'OBV']],
+            "tb_stock_trx_idx", engine, upsert=True, update_cols=['CLOSE_PRICE', 'RSI', 'OBV'],
+        )
     print(f"✅ RSI & OBV 저장 완료 ({start_date} ~ {end_date})")
 
     
@@ -0,0 +1,149 @@
+"""
+팩트 테이블 압축 저장 구조 (실제 테이블 + 호환 뷰)
+
+- 압축 전환된 테이블은 데이터를 {table}_data 에 두고, 원래 이름은 같은 컬럼 구성의 호환 뷰로 제공
+    BASE_DT  : VARCHAR(8) → DATE (3 bytes)
+    STOCK_CD : VARCHAR(10~20) → CHAR(6)
+    INV_DIV  : VARCHAR(20) → CHAR(4)
+    STOCK_NM : 일자별 행에서 제거하고 tb_stock_code 에만 보관 (뷰에서 종목코드로 조인)
+- 조회는 원래 이름(뷰) 그대로 사용. 'YYYYMMDD' 문자열 조건은 DATE 로 변환되어 인덱스 / 파티션을 그대로 탐
+  (조회 결과의 BASE_DT 는 date 값이므로 문자열이 필요하면 DATE_FORMAT(BASE_DT, '%Y%m%d') 로 조회)
+- 적재 / 삭제 / 파티션 작업은 storage_table 로 얻은 실제 테이블에 실행 (krx_loader, krx_partition 에서 처리)
+- 종목명은 적재할 때 새 종목 / 바뀐 이름만 tb_stock_code 에 반영 (뷰는 현재 종목명을 보여줌)
+- 전환은 krx_migrate.py (v5) 에서 실행
+
+사용 예)
+    from krx_storage import storage_table, prepare_frame
+
+    table_name = storage_table(conn, "tb_stock_day_price")      # tb_stock_day_price_data
+    table_name, df = prepare_frame(conn, "tb_stock_day_price", df)
+"""
+
+import threading
+
+from sqlalchemy import text
+
+
+DB_SCHEMA = "stock"
+DATA_SUFFIX = "_data"
+NAME_TABLE = "tb_stock_code"
+
+# 압축 전환 대상 테이블 : 변경할 컬럼 타입
+COMPACT_TABLES = {
+    "tb_stock_day_price": {"BASE_DT": "DATE NOT NULL", "STOCK_CD": "CHAR(6) NOT NULL"},
+    "tb_stock_day_trx": {"BASE_DT": "DATE NOT NULL", "STOCK_CD": "CHAR(6) NOT NULL"},
+    "tb_inv_net_buy_day": {"BASE_DT": "DATE NOT NULL", "INV_DIV": "CHAR(4) NOT NULL", "STOCK_CD": "CHAR(6) NOT NULL"},
+    "tb_stock_inv_trx_m": {"BASE_DT": "DATE NOT NULL", "STOCK_CD": "CHAR(6) NOT NULL"},
+    "tb_stock_inv_trx_cnt": {"BASE_DT": "DATE NOT NULL", "STOCK_CD": "CHAR(6) NOT NULL"},
+    "tb_stock_trx_idx": {"BASE_DT": "DATE NOT NULL", "STOCK_CD": "CHAR(6) NOT NULL"},
+}
+
+# 실제 테이블에서 빼고 tb_stock_code 에서 가져오는 컬럼
+NAME_COLUMN = "STOCK_NM"
+
+UPSERT_NAME_SQL = text(f"""
+    INSERT INTO {DB_SCHEMA}.{NAME_TABLE} (STOCK_CD, STOCK_NM)
+    VALUES (:stock_cd, :stock_nm)
+    ON DUPLICATE KEY UPDATE STOCK_NM = VALUES(STOCK_NM)
+""")
+
+
+_compact = set()
+_names = None
+_lock = threading.Lock()
+
+
+def data_table(table_name):
+    return f"{table_name}{DATA_SUFFIX}"
+
+
+def table_type(conn, table_name):
+    """'BASE TABLE' / 'VIEW' / None(없음)"""
+    sql = text("""
+        SELECT TABLE_TYPE FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table_name
+    """)
+    return conn.execute(sql, {"schema": DB_SCHEMA, "table_name": table_name}).scalar()
+
+
+def is_compact(conn, table_name):
+    """압축 전환된 테이블 여부 (전환된 테이블만 기억. 상주 프로세스 실행 중 전환되어도 다음 호출부터 반영)"""
+    if table_name not in COMPACT_TABLES:
+        return False
+    with _lock:
+        if table_name in _compact:
+            return True
+    compact = table_type(conn, table_name) == "VIEW" and table_type(conn, data_table(table_name)) is not None
+    if compact:
+        with _lock:
+            _compact.add(table_name)
+    return compact
+
+
+def reset_cache():
+    global _names
+    with _lock:
+        _compact.clear()
+        _names = None
+
+
+def storage_table(conn, table_name):
+    """적재 / 삭제 / 파티션 작업 대상 실제 테이블 이름"""
+    return data_table(table_name) if is_compact(conn, table_name) else table_name
+
+
+def prepare_frame(conn, table_name, df):
+    """(실제 테이블 이름, 실제 테이블 컬럼만 남긴 df). 종목명은 tb_stock_code 에 반영"""
+    if not is_compact(conn, table_name):
+        return table_name, df
+    name_cols = [col for col in df.columns if col.upper() == NAME_COLUMN]
+    if name_cols:
+        sync_stock_names(conn, df.rename(columns={name_cols[0]: NAME_COLUMN}))
+    return data_table(table_name), df.drop(columns=name_cols)
+
+
+def sync_stock_names(conn, df):
+    """새 종목 / 이름이 바뀐 종목만 tb_stock_code 에 반영. 반영 건수 반환
+
+    적재 트랜잭션과 별도의 짧은 트랜잭션으로 실행 (병렬 단계끼리 tb_stock_code 잠금을 오래 잡지 않도록)
+    """
+    global _names
+    stock_col = next(col for col in df.columns if col.upper() == "STOCK_CD")
+    names = df[[stock_col, NAME_COLUMN]].dropna().drop_duplicates(stock_col, keep="last")
+
+    with _lock:
+        if _names is None:
+            with conn.engine.connect() as name_conn:
+                _names = dict(name_conn.execute(text(f"SELECT STOCK_CD, STOCK_NM FROM {DB_SCHEMA}.{NAME_TABLE}")).all())
+        changed = [{"stock_cd": cd, "stock_nm": nm}
+                   for cd, nm in zip(names[stock_col], names[NAME_COLUMN]) if _names.get(cd) != nm]
+        _names.update((row["stock_cd"], row["stock_nm"]) for row in changed)
+
+    if changed:
+        with conn.engine.begin() as name_conn:
+            name_conn.execute(UPSERT_NAME_SQL, changed)
+        print(f"[i] {NAME_TABLE} 종목명 {len(changed)}건 반영")
+    return len(changed)
+
+
+def create_compat_view(conn, table_name):
+    """원래 컬럼 순서(STOCK_NM 은 STOCK_CD 다음)의 호환 뷰 생성"""
+    data_name = data_table(table_name)
+    sql = text("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = :schema AND TABLE_NAME = :table_name
+        ORDER BY ORDINAL_POSITION
+    """)
+    select_cols = []
+    for col in (row[0] for row in conn.execute(sql, {"schema": DB_SCHEMA, "table_name": data_name})):
+        select_cols.append(f"{data_name}.{col}")
+        if col.upper() == "STOCK_CD":
+            select_cols.append(f"c.{NAME_COLUMN}")
+
+    # MERGE : 뷰 조건이 실제 테이블 조건으로 합쳐져 인덱스 / 파티션 제거가 그대로 적용됨
+    conn.execute(text(f"""
+        CREATE OR REPLACE ALGORITHM = MERGE VIEW {DB_SCHEMA}.{table_name} AS
+        SELECT {", ".join(select_cols)}
+        FROM {DB_SCHEMA}.{data_name}
+        LEFT JOIN {DB_SCHEMA}.{NAME_TABLE} c ON c.STOCK_CD = {data_name}.STOCK_CD
+    """))
@@ -0,0 +1,108 @@
+"""
+연속 구간(streak) 계산 (numpy 벡터 연산)
+
+- 입력은 마지막 축이 거래일(오래된 날 → 최근 날)인 배열. (종목, 거래일) 2차원 또는 (기준일, 종목, 거래일) 3차원
+- 반복문 없이 누적합 / 누적 최대값으로 한번에 계산하므로 구간 길이, 종목 수가 늘어도 배열 연산 몇 번으로 끝남
+    run_lengths          : 각 거래일에서 끝나는 연속 구간 길이 (조건이 거짓이면 0)
+    longest_run          : 최장 연속 구간 길이
+    current_run          : 마지막 거래일에서 끝나는 연속 구간 길이
+    current_run_start    : 현재 연속 구간 시작 위치 (구간이 없으면 -1)
+    run_sums             : 각 거래일에서 끝나는 연속 구간의 값 합계 (예: 연속 순매수 기간 순매수 수량)
+    streak_features      : 위 값을 한번에 계산 (longest, current, start, current_qty, longest_qty)
+    add_streak_columns   : D1 ~ D7 순매수 수량 컬럼 → {prefix}_con_cnt / _cur_cnt / _run_qty 컬럼
+                           (tb_stock_inv_trx_cnt 일별 / 기간 적재 공용)
+
+사용 예)
+    from krx_streak import streak_features
+
+    feats = streak_features(net_buy_qty)      # net_buy_qty > 0 인 연속 구간
+    df["inst_con_cnt"] = feats["longest"]
+"""
+
+import numpy as np
+
+
+def _last_break(mask):
+    """각 위치에서 마지막으로 조건이 거짓이었던 위치 + 1 (처음부터 참이면 0)"""
+    pos = np.arange(1, mask.shape[-1] + 1)
+    return np.maximum.accumulate(np.where(mask, 0, pos), axis=-1)
+
+
+def run_lengths(mask):
+    """각 거래일에서 끝나는 연속 참 구간 길이"""
+    mask = np.asarray(mask, dtype=bool)
+    return np.arange(1, mask.shape[-1] + 1) - _last_break(mask)
+
+
+def longest_run(mask):
+    mask = np.asarray(mask, dtype=bool)
+    if mask.shape[-1] == 0:
+        return np.zeros(mask.shape[:-1], dtype=np.int64)
+    return run_lengths(mask).max(axis=-1)
+
+
+def current_run(mask):
+    mask = np.asarray(mask, dtype=bool)
+    if mask.shape[-1] == 0:
+        return np.zeros(mask.shape[:-1], dtype=np.int64)
+    return run_lengths(mask)[..., -1]
+
+
+def current_run_start(mask):
+    """현재(마지막 거래일에서 끝나는) 연속 구간의 시작 위치. 구간이 없으면 -1"""
+    current = current_run(mask)
+    return np.where(current > 0, np.asarray(mask).shape[-1] - current, -1)
+
+
+def run_sums(values, mask):
+    """각 거래일에서 끝나는 연속 구간의 values 합계 (조건이 거짓인 위치는 0)"""
+    values = np.asarray(values)
+    mask = np.asarray(mask, dtype=bool)
+    total = np.cumsum(np.where(mask, values, 0), axis=-1)
+    # 구간 시작 전까지의 누적합 : total 앞에 0 을 붙여 마지막 끊긴 위치에서 꺼냄
+    padded = np.concatenate([np.zeros(total.shape[:-1] + (1,), dtype=total.dtype), total], axis=-1)
+    return np.where(mask, total - np.take_along_axis(padded, _last_break(mask), axis=-1), 0)
+
+
+def streak_features(values, mask=None):
+    """values > 0 (또는 mask) 연속 구간 지표
+
+    longest     : 최장 연속 구간 길이
+    current     : 마지막 거래일에서 끝나는 연속 구간 길이
+    start       : 현재 연속 구간 시작 위치 (없으면 -1)
+    current_qty : 현재 연속 구간의 values 합계
+    longest_qty : 최장 연속 구간의 values 합계 (길이가 같으면 최근 구간)
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == "f":
+        values = np.nan_to_num(values)
+    mask = values > 0 if mask is None else np.asarray(mask, dtype=bool)
+    n_days = mask.shape[-1]
+    if n_days == 0:
+        zeros = np.zeros(mask.shape[:-1], dtype=np.int64)
+        return {"longest": zeros, "current": zeros, "start": zeros - 1,
+                "current_qty": zeros.astype(values.dtype), "longest_qty": zeros.astype(values.dtype)}
+
+    runs = run_lengths(mask)
+    sums = run_sums(values, mask)
+    longest = runs.max(axis=-1)
+    # 최장 구간이 끝나는 위치 (뒤집어 argmax → 같은 길이면 최근 구간)
+    longest_end = n_days - 1 - np.argmax(runs[..., ::-1], axis=-1)
+    current = runs[..., -1]
+    return {
+        "longest": longest,
+        "current": current,
+        "start": np.where(current > 0, n_days - current, -1),
+        "current_qty": sums[..., -1],
+        "longest_qty": np.take_along_axis(sums, longest_end[..., None], axis=-1)[..., 0],
+    }
+
+
+def add_streak_columns(df, prefix, cols):
+    """D1 ~ D7 순매수 수량 컬럼의 연속 순매수 지표를 {prefix}_con_cnt / _cur_cnt / _run_qty 컬럼으로 추가합니다."""
+    # streak_features 는 오래된 날 → 최근 날 순서이므로 D7 ~ D1 로 뒤집어 넘김
+    feats = streak_features(df[cols[::-1]].to_numpy())
+    df[f'{prefix}_con_cnt'] = feats["longest"]      # 최장 연속 순매수일수
+    df[f'{prefix}_cur_cnt'] = feats["current"]      # 기준일까지 이어지는 연속 순매수일수
+    df[f'{prefix}_run_qty'] = feats["current_qty"]  # 기준일까지 이어지는 연속 순매수 기간 순매수 수량
+    return df
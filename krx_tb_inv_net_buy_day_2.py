@@ -1,239 +1,148 @@
 
 
-import requests
-import pandas as pd
 from datetime import datetime
-import time
-import io, sys
-from sqlalchemy import create_engine, text
+import sys
+import pandas as pd
+from sqlalchemy import text
 
-# MariaDB 연결 설정 (선택 사항)
-MYSQL_USER = "root"
-MYSQL_PASSWORD = ""
-MYSQL_HOST = "localhost"
-MYSQL_DB = "stock"
-TABLE_NAME = "tb_inv_net_buy_day"
+from krx_client import get_client, inv_net_buy_payload, INVESTOR_TYPES
+from krx_schema import INV_NET_BUY_DAY, parse_report
+from krx_metrics import span
+from krx_partition import reload_partition
+from krx_storage import storage_table
+from stockdb import get_engine
 
-# SQLAlchemy 엔진 생성 (선택 사항)
-engine = create_engine(
-    f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}?charset=utf8"
-)
+TABLE_NAME = "tb_inv_net_buy_day"
 
-# KRX 데이터 요청을 위한 헤더 설정
-headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-    "Referer": "http://data.krx.co.kr/contents/MDC/MDI/mdiLoader/index.cmd?menuId=MDC0201020303",
-}
+# 적재 시 DataFrame 에서 계산해 함께 저장하는 순위 컬럼
+RANK_COLUMNS = ["RANK_AMT", "RANK_CNT"]
 
+# 프로세스 공용 엔진
+engine = get_engine()
 
 # 투자자별 순매수 종목 데이터 요청 함수
 
 def get_investor_net_buy_data(start_date, end_date, market, investor_type ):
-    otp_url = "http://data.krx.co.kr/comm/fileDn/GenerateOTP/generate.cmd"
-    
-    payload = {
-        "locale" : "ko_KR",
-        "mktId": market,  # ALL, STK: KOSPI, KSQ: KOSDAQ
-        "strtDd": start_date,
-        "endDd": end_date,
-        "invstTpCd": investor_type,
-        "csvxls_isNo": "false",
-        "name": "fileDown",
-        "share" : 1,
-        "money" : 1,
-        "url": "dbms/MDC/STAT/standard/MDCSTAT02401"
-    }
+    return get_client().fetch_csv(inv_net_buy_payload(start_date, end_date, market, investor_type))
 
-    response = requests.post(otp_url, data=payload, headers=headers)
-    print( response.text)
 
-    if response.status_code != 200:
-        print(f"Failed to get OTP: {response.status_code}")
-        return None
-
-    otp_code = response.text
+# 기관, 외국인 순매수 데이터를 동시에 조회 (CSV 원본)
+def get_investor_net_buy_data_all(start_date, end_date, market, investor_types=INVESTOR_TYPES):
+    payloads = [inv_net_buy_payload(start_date, end_date, market, inv) for inv in investor_types]
+    return get_client().fetch_many(payloads, parse=False)
 
-    download_url = "http://data.krx.co.kr/comm/fileDn/download_csv/download.cmd"
-    csv_response = requests.post(download_url, data={"code": otp_code}, headers=headers)
 
-    print( csv_response.text[:500]
-          )
-    # CSV 응답 내용 확인
-    if csv_response.text.strip() == "":
-        print("CSV response is empty.")
-        return None
-
-    if csv_response.status_code != 200:
-        print(f"Failed to download CSV: {csv_response.status_code}")
-        return None
-
-    csv_response.encoding = "euc-kr"
-    df = pd.read_csv(io.StringIO(csv_response.text), encoding="euc-kr")
-
-    print(df.columns.tolist())
-
-    return df
-
-
-# 데이터를 테이블 칼럼에 매핑하는 함수 (선택 사항)
-def map_to_table(df, date, investor_type):
+# CSV 원본을 테이블 칼럼에 매핑하는 함수 (krx_schema 레지스트리 기준 dtype)
+def map_to_table(raw, date, investor_type):
     print(f"Mapping data for date: {date}")
-    if df.empty:
+    mapped_df = parse_report(INV_NET_BUY_DAY, raw, BASE_DT=date, INV_DIV=investor_type)
+    if mapped_df is None:
         print("No data available in trading data")
         return None
-    
-    print("Available columns in CSV data:", df.columns.tolist())
-    
-    data_dict = {
-        "BASE_DT": [date] * len(df),
-        "INV_DIV": [investor_type] * len(df),
-        "STOCK_CD": df["종목코드"],
-        "STOCK_NM": df["종목명"],
-        "TRADE_SEL_QTY": df["거래량_매도"],
-        "TRADE_BUY_QTY": df["거래량_매수"],
-        "TRADE_NET_BUY_QTY": df["거래량_순매수"],
-        "TRADE_SEL_AMT": df["거래대금_매도"],
-        "TRADE_BUY_AMT": df["거래대금_매수"],
-        "TRADE_NET_BUY_AMT": df["거래대금_순매수"]
-    }
-    
-    mapped_df = pd.DataFrame(data_dict)
     return mapped_df
 
-# tb_inv_net_buy_day 에 데이터 삽입
-def ins_tb_inv_net_buy_day (df, table_name, engine):
-    try:
-        df.to_sql(table_name, con=engine, if_exists="append", index=False)
-        print(f"Data successfully inserted into {table_name}")
-    except Exception as e:
-        print(f"Error inserting data: {e}")
-
-# tb_inv_net_buy_day 에 거래량_순매수 기준으로 rank 반영
-def upd_tb_inv_net_buy_day_cnt( work_date, investor_type, engine):
-
-    try:
-        with engine.begin() as conn:
-
-            # 기존 임시 테이블이 있으면 삭제
-            drop_temp_sql = text("DROP TEMPORARY TABLE IF EXISTS tmp_rank_cnt;")
-            conn.execute(drop_temp_sql)
+# 기준일 / 투자자구분별 순매수 순위 (DENSE_RANK, 순매수 큰 순서) 부여
+def add_ranks(df):
+    df = df.copy()
+    groups = df.groupby(["BASE_DT", "INV_DIV"], observed=True)
+    df["RANK_AMT"] = groups["TRADE_NET_BUY_AMT"].rank(method="dense", ascending=False).astype("int32")
+    df["RANK_CNT"] = groups["TRADE_NET_BUY_QTY"].rank(method="dense", ascending=False).astype("int32")
+    return df
 
-            # 1단계: 중간 랭킹 결과를 임시 테이블에 저장
-            create_temp_sql = text("""
-                CREATE TEMPORARY TABLE tmp_rank_cnt AS
-                SELECT 
+# 테이블 전체 순위를 한번에 다시 계산 (이력 보정용, 투자자구분 / 기준일별 DENSE_RANK)
+def rerank_history(engine=engine):
+    with span("rerank") as s, engine.begin() as conn:
+        target = storage_table(conn, TABLE_NAME)
+        rerank_sql = text(f"""
+            UPDATE stock.{target} t
+            JOIN (
+                SELECT
                     BASE_DT,
                     INV_DIV,
                     STOCK_CD,
+                    DENSE_RANK() OVER (PARTITION BY BASE_DT, INV_DIV ORDER BY TRADE_NET_BUY_AMT DESC) AS RNK_AMT,
                     DENSE_RANK() OVER (PARTITION BY BASE_DT, INV_DIV ORDER BY TRADE_NET_BUY_QTY DESC) AS RNK_CNT
-                FROM stock.tb_inv_net_buy_day
-                WHERE BASE_DT = :base_dt
-                AND INV_DIV = :inv_div
-            """)
-            conn.execute(create_temp_sql, {"base_dt": work_date, "inv_div": investor_type})
-
-            # 2단계: 임시 테이블을 이용해 UPDATE 수행
-            update_cnt_sql = text("""
-                UPDATE stock.tb_inv_net_buy_day t
-                JOIN tmp_rank_cnt r
-                  ON t.BASE_DT = r.BASE_DT
-                 AND t.INV_DIV = r.INV_DIV
-                 AND t.STOCK_CD = r.STOCK_CD
-                SET t.RANK_CNT = r.RNK_CNT
-                WHERE t.BASE_DT = :base_dt
-                AND t.INV_DIV = :inv_div
-            """)
-            conn.execute(update_cnt_sql, {"base_dt": work_date, "inv_div": investor_type})
-
-            print(f"Updated RANK_CNT for BASE_DT = {work_date}, INV_DIV = {investor_type}")
+                FROM stock.{target}
+            ) r
+              ON t.BASE_DT = r.BASE_DT
+             AND t.INV_DIV = r.INV_DIV
+             AND t.STOCK_CD = r.STOCK_CD
+            SET t.RANK_AMT = r.RNK_AMT,
+                t.RANK_CNT = r.RNK_CNT
+        """)
+        s.affected = conn.execute(rerank_sql).rowcount
+    print(f"Re-ranked {TABLE_NAME}: {s.affected} rows updated")
+    return s.affected
 
-    except Exception as e:
-        print(f" Error update rank_cnt data: {e}")
-        
-   
-
-# tb_inv_net_buy_day 에 거래대금_순매수 기준으로 rank 반영
-def upd_tb_inv_net_buy_day_amt( work_date, investor_type, engine):
 
+# 날짜 입력 유효성 검사 함수
+def validate_date(date_str):
     try:
-        with engine.begin() as conn:
-            
-            # 기존 임시 테이블이 있으면 삭제
-            drop_temp_sql = text("DROP TEMPORARY TABLE IF EXISTS tmp_rank_amt;")
-            conn.execute(drop_temp_sql)
-
-            # 1단계: 중간 랭킹 결과를 임시 테이블에 저장
-            create_temp_sql = text("""
-                CREATE TEMPORARY TABLE tmp_rank_amt AS
-                SELECT 
-                    BASE_DT,
-                    INV_DIV,
-                    STOCK_CD,
-                    DENSE_RANK() OVER (PARTITION BY BASE_DT, INV_DIV ORDER BY TRADE_NET_BUY_AMT DESC) AS RNK_AMT
-                FROM stock.tb_inv_net_buy_day
-                WHERE BASE_DT = :base_dt
-                AND INV_DIV = :inv_div
-            """)
-            conn.execute(create_temp_sql, {"base_dt": work_date, "inv_div": investor_type})
-
-            # 2단계: 임시 테이블을 이용해 UPDATE 수행
-            update_amt_sql = text("""
-                UPDATE stock.tb_inv_net_buy_day t
-                JOIN tmp_rank_amt r
-                  ON t.BASE_DT = r.BASE_DT
-                 AND t.INV_DIV = r.INV_DIV
-                 AND t.STOCK_CD = r.STOCK_CD
-                SET t.RANK_AMT = r.RNK_AMT
-                WHERE t.BASE_DT = :base_dt
-                AND t.INV_DIV = :inv_div
-            """)
-            conn.execute(update_amt_sql, {"base_dt": work_date, "inv_div": investor_type})
+        datetime.strptime(date_str, "%Y%m%d")
+        return True
+    except ValueError:
+        print(f"Invalid date format: {date_str}. Please use YYYYMMDD (e.g., 20250404).")
+        return False
+    
+    
+# 기관, 외국인 데이터 다운로드 및 순위 부여 후 기준일 데이터 교체
+#   다운로드 / 변환이 모두 끝난 뒤 교체하므로 실패하면 기존 데이터가 그대로 남음
+def load_inv_net_buy_day(work_date, engine=engine):
 
-            print(f"Updated RANK_AMT for BASE_DT = {work_date}, INV_DIV = {investor_type}")
+    # 기관합계 investor_type="7050", 외국인 investor_type="9000"
+    start_date = work_date
+    end_date = work_date 
+    market = "ALL"
 
-    except Exception as e:
-        print(f" Error update rank_amt data: {e}")
+    print(f"Fetching investor net buy data for {start_date} to {end_date}...")
+    with span("download") as s:
+        net_buy_list = get_investor_net_buy_data_all(start_date, end_date, market)
+        s.bytes = sum(len(raw) for raw in net_buy_list if raw)
 
-   
+    frames = []
+    for investor_type, net_buy_data in zip(INVESTOR_TYPES, net_buy_list):
+        print(f"\nProcessing {investor_type} data...")
 
-# tb_inv_net_buy_day 데이터 적재를 위해 초기화 
-def del_tb_inv_net_buy_day( work_date, engine):
+        if net_buy_data is not None:
+            with span(f"parse_{investor_type}") as s:
+                mapped_data = map_to_table(net_buy_data, start_date, investor_type)
+                s.rows = 0 if mapped_data is None else len(mapped_data)
+            if mapped_data is not None:
+                frames.append(mapped_data)
+            else:
+                print("Failed to map data due to empty net_buy_data")
 
-    # 실행할 SQL 정의
-    del_sql = text ( 
-    """
-        DELETE 
-        FROM stock.tb_inv_net_buy_day
-        WHERE 1=1
-        AND BASE_DT = :base_dt;
-    """ 
-    )
+        else:
+            print("Failed to fetch investor net buy data")
 
-    # SQL 실행
-    try:
-        with engine.begin() as conn:
-            conn.execute(del_sql, {"base_dt": work_date})
-            print(f"Deleted records for BASE_DT = {work_date}")
-    except Exception as e:
-        print(f"Error delete tb_inv_net_buy_day: {e}")
+    # 다운로드 실패가 있으면 일부 투자자만으로 교체하지 않음 (기존 데이터 유지, 단계 실패 처리)
+    failed = [inv for inv, raw in zip(INVESTOR_TYPES, net_buy_list) if raw is None]
+    if failed:
+        raise RuntimeError(f"{work_date} 투자자 {failed} 순매수 데이터 다운로드 실패로 적재하지 않습니다.")
+    if not frames:
+        print(f"No investor net buy data for {work_date}, existing data kept")
+        return
 
+    # 거래량 / 거래대금 순매수 기준 순위를 부여한 뒤 기관, 외국인 데이터를 한번에 저장
+    with span("rank") as s:
+        net_buy_df = add_ranks(pd.concat(frames, ignore_index=True))
+        s.rows = len(net_buy_df)
 
+    # 기준일 데이터 교체 (파티션이 있으면 EXCHANGE PARTITION, 없으면 한 트랜잭션에서 DELETE 후 INSERT)
+    with span("reload") as s:
+        s.rows = reload_partition(engine, TABLE_NAME, work_date, net_buy_df[INV_NET_BUY_DAY.table_columns + RANK_COLUMNS])
+    print(f"Data successfully inserted into {TABLE_NAME}: {s.rows} rows")
 
 
-# 날짜 입력 유효성 검사 함수
-def validate_date(date_str):
-    try:
-        datetime.strptime(date_str, "%Y%m%d")
-        return True
-    except ValueError:
-        print(f"Invalid date format: {date_str}. Please use YYYYMMDD (e.g., 20250404).")
-        return False
-    
-    
 # 메인 실행
+#   python krx_tb_inv_net_buy_day_2.py 20250404   : 기준일 적재
+#   python krx_tb_inv_net_buy_day_2.py --rerank   : 테이블 전체 순위 재계산
 if __name__ == "__main__":
 
-    
+    if "--rerank" in sys.argv[1:]:
+        rerank_history()
+        sys.exit(0)
+
 # Argument에서 base_dt 받기 또는 사용자 입력 받기
     if len(sys.argv) >= 2 and validate_date(sys.argv[1]):
         work_date = sys.argv[1]
@@ -244,47 +153,6 @@ if __name__ == "__main__":
                 break
             print("잘못된 날짜 형식입니다. 다시 입력해주세요 (예: 20250404)")
 
-
-    # tb_inv_net_buy_day  초기화 처리 
-    del_tb_inv_net_buy_day( work_date, engine)
-
-
-    # 기관합계 investor_type="7050", 외국인 investor_type="9000"
-    for investor_type in ["7050", "9000"]:
-        print(f"\nFetching {investor_type} data...")
-        
-        start_date = work_date
-        end_date = work_date 
-        market = "ALL"
-
-        print(f"Fetching investor net buy data for {start_date} to {end_date}...")
-        net_buy_data = get_investor_net_buy_data(start_date, end_date, market, investor_type )
-        
-        if net_buy_data is not None:
-            print("Raw Net Buy Data Preview:")
-            print(net_buy_data.head())
-            
-            # 테이블에 저장하려면 아래 주석 해제
-            
-            mapped_data = map_to_table(net_buy_data, start_date, investor_type)
-            if mapped_data is not None:
-                print("Mapped Data Preview:")
-                print(mapped_data.head())
-                
-                ins_tb_inv_net_buy_day(mapped_data, TABLE_NAME, engine)
-
-                # 거래량_순매수 기준으로 rank 부여 
-                upd_tb_inv_net_buy_day_cnt( work_date, investor_type, engine)
-
-                # 거래대금금_순매수 기준으로 rank 부여 
-                upd_tb_inv_net_buy_day_amt( work_date, investor_type, engine)
-
-            else:
-                print("Failed to map data due to empty net_buy_data")
-            
-        else:
-            print("Failed to fetch investor net buy data")
-        
-        time.sleep(1)
+    load_inv_net_buy_day(work_date)
 
     
\ No newline at end of file
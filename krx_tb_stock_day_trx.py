@@ -1,2 +1,201 @@
+"""
+종목별 일별 시세 이력 적재 (tb_stock_day_trx, tb_stock_day_price)
 
+- 종목 단위 : 개별종목 시세 추이(MDCSTAT01701) 로 종목당 1회 요청하여 기간 전체를 받음
+    요청에 쓰는 표준코드(ISIN)는 전종목 기본정보(MDCSTAT01901) 에서 조회 (우선주 등은 종목코드로 만들 수 없음)
+    표준코드가 없거나 데이터가 없는 종목은 끝에 목록으로 출력
+- 일자 단위 : 전종목 시세(MDCSTAT01501) 로 일자당 시장별(KOSPI, KOSDAQ) 1회 요청
+- auto 모드는 요청 수가 더 적은 방식을 선택 (일자수 x 시장수 vs 종목수)
 
+실행 예)
+    python krx_tb_stock_day_trx.py 20250102 20250630                 # 전종목, 자동 선택
+    python krx_tb_stock_day_trx.py 20240102 20250630 005930 000660   # 지정 종목만
+    python krx_tb_stock_day_trx.py 20250102 20250630 --by-stock      # 종목 단위 강제
+"""
+
+import io
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from krx_client import get_client, day_price_payload, stock_info_payload, stock_history_payload, MARKETS
+from krx_schema import STOCK_DAY_PRICE, STOCK_HISTORY_PRICE, STOCK_DAY_TRX, parse_report, cast_frame, insert_report
+from krx_tb_stock_day_price_2 import map_to_table
+from stockdb import get_engine, repository
+
+
+TRX_TABLE_NAME = "tb_stock_day_trx"
+PRICE_TABLE_NAME = "tb_stock_day_price"
+
+# 프로세스 공용 엔진
+engine = get_engine()
+
+# tb_stock_code.MRKT_DIV → tb_stock_day_price.MRKT_DIV
+MARKET_NAMES = dict(MARKETS)
+
+# tb_stock_day_trx 컬럼 (tb_stock_day_price 컬럼에서 변환)
+TRX_COLUMNS = {
+    "BASE_DT": "BASE_DT",
+    "STOCK_CD": "STOCK_CD",
+    "STOCK_NM": "STOCK_NM",
+    "PRICE_GAP": "DOD",
+    "PRICE_GAP_RATE": "DOD_RATE",
+    "OPEN_PRICE": "OPEN_PRICE",
+    "HIGH_PRICE": "HIGH_PRICE",
+    "LOW_PRICE": "LOW_PRICE",
+    "TRADE_QTY": "TRADE_QTY",
+}
+
+
+def validate_date(date_str):
+    try:
+        datetime.strptime(date_str, "%Y%m%d")
+        return True
+    except ValueError:
+        print(f"[!] Invalid date format: {date_str}. Please use YYYYMMDD (e.g., 20250404).")
+        return False
+
+
+# 종목코드 → KRX 표준코드(ISIN) : 전종목 기본정보의 단축코드 / 표준코드
+def get_isin_codes():
+    raw = get_client().fetch_csv(stock_info_payload())
+    if raw is None:
+        raise RuntimeError("전종목 기본정보(표준코드)를 가져오는 데 실패했습니다.")
+    df = pd.read_csv(io.BytesIO(raw), encoding="euc-kr", usecols=["표준코드", "단축코드"], dtype=str)
+    return dict(zip(df["단축코드"].str.strip(), df["표준코드"].str.strip()))
+
+
+# 기간 내 거래일 조회
+def get_work_days(from_date, to_date, engine):
+    return repository.work_days_between(engine, from_date, to_date)
+
+
+# 종목코드, 종목명, 시장구분 조회
+def get_stock_codes(engine, stock_cds=None):
+    df = repository.stock_codes(engine, stock_cds)
+    df["MRKT_DIV"] = df["MRKT_DIV"].map(lambda v: MARKET_NAMES.get(v, v))
+    return df
+
+
+# 요청 수가 적은 방식 선택
+def plan_fetch_mode(n_days, n_stocks):
+    date_requests = n_days * len(MARKETS)
+    stock_requests = n_stocks
+    mode = "stock" if stock_requests < date_requests else "date"
+    print(f"[i] 요청 수 비교 - 일자 단위: {date_requests}건, 종목 단위: {stock_requests}건 → {mode} 단위 선택")
+    return mode
+
+
+# tb_stock_day_price 컬럼 → tb_stock_day_trx 컬럼
+def price_to_trx(price_df):
+    return cast_frame(price_df[list(TRX_COLUMNS)].rename(columns=TRX_COLUMNS), STOCK_DAY_TRX)
+
+
+# 종목 단위 : 종목당 1회 요청
+def fetch_by_stock(stocks, from_date, to_date):
+    isin_codes = get_isin_codes()
+    no_isin = stocks[~stocks["STOCK_CD"].isin(isin_codes)]
+    stocks = stocks[stocks["STOCK_CD"].isin(isin_codes)]
+
+    payloads = [
+        stock_history_payload(isin_codes[row.STOCK_CD], row.STOCK_CD, row.STOCK_NM, from_date, to_date)
+        for row in stocks.itertuples()
+    ]
+    results = get_client().fetch_many(payloads, parse=False)
+
+    frames, no_data = [], []
+    for row, raw in zip(stocks.itertuples(), results):
+        mapped = parse_report(STOCK_HISTORY_PRICE, raw,
+                              STOCK_CD=row.STOCK_CD, STOCK_NM=row.STOCK_NM, MRKT_DIV=row.MRKT_DIV, STOCK_MNG=None)
+        if mapped is None:
+            no_data.append(f"{row.STOCK_CD} {row.STOCK_NM}")
+            continue
+        frames.append(mapped)
+
+    if not no_isin.empty:
+        print(f"⚠️ 표준코드를 찾지 못한 종목 {len(no_isin)}건: "
+              + ", ".join(f"{row.STOCK_CD} {row.STOCK_NM}" for row in no_isin.itertuples()))
+    if no_data:
+        print(f"⚠️ 데이터가 없는 종목 {len(no_data)}건: " + ", ".join(no_data))
+    return cast_frame(pd.concat(frames, ignore_index=True), STOCK_DAY_PRICE) if frames else None
+
+
+# 일자 단위 : 일자별 시장당 1회 요청
+def fetch_by_date(work_days, stock_cds=None):
+    keys = [(day, market, market_name) for day in work_days for market, market_name in MARKETS]
+    results = get_client().fetch_many([day_price_payload(day, market) for day, market, _ in keys], parse=False)
+
+    frames = []
+    for (day, market, market_name), raw in zip(keys, results):
+        if raw is None:
+            print(f"⚠️ {day} {market_name} 데이터를 가져오는 데 실패했습니다.")
+            continue
+        mapped = map_to_table(raw, day, market_name)
+        if mapped is not None:
+            frames.append(mapped)
+    if not frames:
+        return None
+
+    price_df = cast_frame(pd.concat(frames, ignore_index=True), STOCK_DAY_PRICE)
+    if stock_cds:
+        price_df = price_df[price_df["STOCK_CD"].isin(stock_cds)]
+    return price_df
+
+
+# 적재 대상 범위 삭제 후 두 테이블에 저장
+def save_history(price_df, from_date, to_date, engine):
+    codes = price_df["STOCK_CD"].unique().tolist()
+
+    with engine.begin() as conn:
+        for table_name in (PRICE_TABLE_NAME, TRX_TABLE_NAME):
+            repository.delete_stock_range(conn, table_name, from_date, to_date, codes)
+            print(f"[✔] {table_name} {from_date} ~ {to_date} 데이터 삭제 완료")
+
+        insert_report(price_df, STOCK_DAY_PRICE, conn)
+        insert_report(price_to_trx(price_df), STOCK_DAY_TRX, conn)
+
+    print(f"[✔] {len(price_df)}건 저장 완료 ({PRICE_TABLE_NAME}, {TRX_TABLE_NAME})")
+
+
+def load_history(from_date, to_date, stock_cds=None, mode="auto", engine=engine):
+    work_days = get_work_days(from_date, to_date, engine)
+    stocks = get_stock_codes(engine, stock_cds)
+
+    if mode == "auto":
+        mode = plan_fetch_mode(len(work_days), len(stocks))
+
+    if mode == "stock":
+        price_df = fetch_by_stock(stocks, from_date, to_date)
+    else:
+        price_df = fetch_by_date(work_days, stock_cds)
+
+    if price_df is None or price_df.empty:
+        print("❌ 저장할 데이터가 없습니다.")
+        return
+    save_history(price_df, from_date, to_date, engine)
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    flags = [a for a in sys.argv[1:] if a.startswith("--")]
+
+    if len(args) >= 2 and validate_date(args[0]) and validate_date(args[1]):
+        from_date, to_date = args[0], args[1]
+        stock_cds = args[2:]
+    else:
+        while True:
+            from_date = input("Enter from_date (YYYYMMDD): ").strip()
+            to_date = input("Enter to_date (YYYYMMDD): ").strip()
+            if validate_date(from_date) and validate_date(to_date) and from_date <= to_date:
+                break
+            print("잘못된 날짜 형식입니다. 다시 입력해주세요 (예: 20250404)")
+        stock_cds = input("종목코드 (공백 구분, 전체는 Enter): ").split()
+
+    mode = "auto"
+    if "--by-stock" in flags:
+        mode = "stock"
+    elif "--by-date" in flags:
+        mode = "date"
+
+    load_history(from_date, to_date, stock_cds or None, mode)
@@ -1,5 +1,5 @@
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 import numpy as np
 import os
@@ -7,10 +7,40 @@ import sys
 from datetime import datetime
 import logging
 
+from krx_calendar import get_calendar
+from krx_flow import load_window, window_panel
+from krx_grade import GRADE_RULE_VERSION, assign_grades
+from krx_loader import bulk_load
+from krx_metrics import span
+from krx_partition import reload_partition
+from krx_storage import storage_table
+from krx_streak import add_streak_columns
+import krx_trx_m_stat
+from krx_tb_stock_inv_trx_m import WINDOW_DAYS, RANK_LIMIT
+from stockdb import get_engine, repository
+
 # --- 1. 설정 변수 ---
 # 설정 정보를 코드 상단에 모아두어 관리를 용이하게 합니다.
-DB_URL = "mysql+mysqlconnector://root@localhost/stock?charset=utf8"
 SAVE_DIR = r"D:\python_proj\venv_stock\stock_file"
+TABLE_NAME = "tb_stock_inv_trx_cnt"
+
+# 기간 재계산 시 한 트랜잭션에서 교체하는 거래일 수
+HISTORY_CHUNK_DAYS = 20
+
+# 지표 컬럼 정의 (D1 = 기준일)
+INST_COLS = [f'D{i}A_TRADE_NET_BUY_QTY' for i in range(1, WINDOW_DAYS + 1)]
+FORE_COLS = [f'D{i}B_TRADE_NET_BUY_QTY' for i in range(1, WINDOW_DAYS + 1)]
+BUY_COLS = ['D1A_TRADE_NET_BUY_QTY', 'D2A_TRADE_NET_BUY_QTY', 'D1B_TRADE_NET_BUY_QTY', 'D2B_TRADE_NET_BUY_QTY']
+
+# tb_stock_inv_trx_cnt 에 저장하는 컬럼
+INSERT_COLS = ['BASE_DT', 'STOCK_CD', 'STOCK_NM',
+               'inst_cnt', 'inst_con_cnt', 'fore_cnt', 'fore_con_cnt',
+               'buy_con_cnt', 'avg_trx_qty', 'd1_trx_qty', 'd7_avg_trx_rate',
+               'inst_cur_cnt', 'fore_cur_cnt', 'inst_run_qty', 'fore_run_qty',
+               'inv_rank_amt', 'for_rank_amt', 'price_gap_rate', 'buy_grade']
+
+# 순매수 금액 순위 컬럼 : 투자자 구분
+RANK_INVESTORS = {'inv_rank_amt': '7050', 'for_rank_amt': '9000'}
 
 # --- 2. 로깅 설정 ---
 # print 대신 logging을 사용하여 로그를 체계적으로 관리합니다.
@@ -25,32 +55,66 @@ def validate_date(date_str):
     except ValueError:
         return False
 
-def count_max_con_buy(values):
-    """연속된 양수(순매수)의 최대 길이를 계산합니다."""
-    max_count = count = 0
-    for v in values:
-        if v > 0:
-            count += 1
-        else:
-            max_count = max(max_count, count)
-            count = 0
-    max_count = max(max_count, count)  # 마지막까지 연속된 경우를 처리
-    return max_count
+def compute_counts(df):
+    """D1 ~ D7 기관/외국인 순매수 수량 컬럼으로 순매수일수, 연속 순매수, 평균 거래량 지표를 계산합니다.
+
+    일별 실행(tb_stock_inv_trx_m 조회)과 기간 재계산(krx_flow.window_panel)이 같은 함수를 사용합니다.
+    """
+    # 순매수일수 및 연속 순매수일수 계산
+    df['inst_cnt'] = df[INST_COLS].gt(0).sum(axis=1)
+    df['fore_cnt'] = df[FORE_COLS].gt(0).sum(axis=1)
+    add_streak_columns(df, 'inst', INST_COLS)
+    add_streak_columns(df, 'fore', FORE_COLS)
+    df['buy_con_cnt'] = df[BUY_COLS].gt(0).sum(axis=1) # D1, D2 기관/외인 동시 순매수일 수
+    df['d1_trx_qty'] = df['D1A_TRADE_NET_BUY_QTY'] + df['D1B_TRADE_NET_BUY_QTY']
+
+    # [성능개선] apply 대신 벡터화 연산을 사용하여 평균 거래량 계산
+    # 0 이하 값은 NaN으로 바꾼 뒤 평균을 계산하면 양수 값들의 평균만 남게 됩니다.
+    avg_cols = INST_COLS + FORE_COLS
+    df['avg_trx_qty'] = df[avg_cols].where(df[avg_cols] > 0).mean(axis=1).fillna(0)
+
+    # WOW_QTY_RATE (d7_avg_trx_rate) 계산 (0으로 나누기 방지)
+    df['d7_avg_trx_rate'] = np.where(
+        df['avg_trx_qty'] > 0,
+        (df['d1_trx_qty'] / df['avg_trx_qty']).round(1),
+        0
+    )
+    return df
+
+def add_rank_price(df, engine, from_date, to_date, long_df=None):
+    """기관/외국인 순매수 금액 순위 합계와 등락률 컬럼을 붙입니다. (INSERT 전에 계산, 별도 UPDATE 없음)
+
+    long_df(tb_inv_net_buy_day long 형식)를 이미 조회했으면 넘겨받아 다시 조회하지 않습니다.
+    """
+    if long_df is None:
+        long_df = load_window(engine, [from_date, to_date])
+    rank_amt = long_df['RANK_AMT'].fillna(0)
+    inv_div = long_df['INV_DIV'].astype(str)
+    ranks = pd.DataFrame({'BASE_DT': long_df['BASE_DT'], 'STOCK_CD': long_df['STOCK_CD'],
+                          **{col: rank_amt.where(inv_div == inv, 0) for col, inv in RANK_INVESTORS.items()}})
+    ranks = ranks.groupby(['BASE_DT', 'STOCK_CD'], as_index=False).sum()
+
+    prices = repository.day_price_gaps(engine, from_date, to_date)
+    prices = prices.rename(columns={'PRICE_GAP_RATE': 'price_gap_rate'})
+
+    df = df.merge(ranks, on=['BASE_DT', 'STOCK_CD'], how='left').merge(prices, on=['BASE_DT', 'STOCK_CD'], how='left')
+    for col in RANK_INVESTORS:
+        df[col] = df[col].fillna(0).astype(np.int64)
+    return df
 
 # --- 4. 메인 실행 로직 ---
-def main(base_date):
+def main(base_date, engine=None):
     """주어진 기준일자에 대한 투자자별 거래 데이터를 분석하고 저장합니다."""
     
-    # DB 엔진 생성
+    # DB 엔진 생성 (파이프라인에서 공용 엔진을 넘겨받으면 그대로 사용)
     try:
-        engine = create_engine(DB_URL)
+        engine = engine or get_engine()
     except ImportError:
         logging.error("mysql-connector-python 라이브러리를 찾을 수 없습니다. 'pip install mysql-connector-python'으로 설치해주세요.")
         sys.exit(1)
 
     # --- 데이터 조회 ---
     logging.info("데이터베이스에서 투자자별 거래내역 조회를 시작합니다.")
-    # d1_trx_qty를 SQL에서 미리 계산하여 Python 연산 부하를 줄입니다.
     select_sql = text("""
         SELECT
             BASE_DT, STOCK_CD, STOCK_NM,
@@ -59,14 +123,15 @@ def main(base_date):
             D7A_TRADE_NET_BUY_QTY,
             D1B_TRADE_NET_BUY_QTY, D2B_TRADE_NET_BUY_QTY, D3B_TRADE_NET_BUY_QTY,
             D4B_TRADE_NET_BUY_QTY, D5B_TRADE_NET_BUY_QTY, D6B_TRADE_NET_BUY_QTY,
-            D7B_TRADE_NET_BUY_QTY,
-            (D1A_TRADE_NET_BUY_QTY + D1B_TRADE_NET_BUY_QTY) AS d1_trx_qty
+            D7B_TRADE_NET_BUY_QTY
         FROM stock.tb_stock_inv_trx_m
         WHERE BASE_DT = :base_date
     """)
     
     try:
-        df = pd.read_sql(select_sql, engine, params={"base_date": base_date})
+        with span("select") as s:
+            df = pd.read_sql(select_sql, engine, params={"base_date": base_date})
+            s.rows = len(df)
         if df.empty:
             logging.warning(f"{base_date} 기준일에 해당하는 데이터가 'tb_stock_inv_trx_m' 테이블에 없습니다.")
             return # 데이터가 없으면 함수 종료
@@ -79,90 +144,30 @@ def main(base_date):
     # --- 지표 계산 ---
     logging.info("주요 지표 계산을 시작합니다.")
     
-    # 컬럼 정의
-    inst_cols = [f'D{i}A_TRADE_NET_BUY_QTY' for i in range(1, 8)]
-    fore_cols = [f'D{i}B_TRADE_NET_BUY_QTY' for i in range(1, 8)]
-    avg_cols = inst_cols + fore_cols
-    buy_cols = ['D1A_TRADE_NET_BUY_QTY', 'D2A_TRADE_NET_BUY_QTY', 'D1B_TRADE_NET_BUY_QTY', 'D2B_TRADE_NET_BUY_QTY']
-
-    # 순매수일수 및 연속 순매수일수 계산
-    df['inst_cnt'] = df[inst_cols].gt(0).sum(axis=1)
-    df['inst_con_cnt'] = df[inst_cols].apply(count_max_con_buy, axis=1)
-    df['fore_cnt'] = df[fore_cols].gt(0).sum(axis=1)
-    df['fore_con_cnt'] = df[fore_cols].apply(count_max_con_buy, axis=1)
-    df['buy_con_cnt'] = df[buy_cols].gt(0).sum(axis=1) # D1, D2 기관/외인 동시 순매수일 수
-
-    # [성능개선] apply 대신 벡터화 연산을 사용하여 평균 거래량 계산
-    # 0 이하 값은 NaN으로 바꾼 뒤 평균을 계산하면 양수 값들의 평균만 남게 됩니다.
-    df['avg_trx_qty'] = df[avg_cols].where(df[avg_cols] > 0).mean(axis=1).fillna(0)
-    
-    # WOW_QTY_RATE (d7_avg_trx_rate) 계산 (0으로 나누기 방지)
-    df['d7_avg_trx_rate'] = np.where(
-        df['avg_trx_qty'] > 0,
-        (df['d1_trx_qty'] / df['avg_trx_qty']).round(1),
-        0
-    )
-    logging.info("주요 지표 계산을 완료했습니다.")
+    # 일별 조회는 BASE_DT 형식이 테이블마다 다를 수 있어 기준일 문자열로 맞춤
+    df['BASE_DT'] = base_date
+    with span("compute") as s:
+        compute_counts(df)
+        df = add_rank_price(df, engine, base_date, base_date)
+        df['buy_grade'] = assign_grades(df)
+        s.rows = len(df)
+    logging.info(f"주요 지표 및 매수 등급(규칙 {GRADE_RULE_VERSION}) 계산을 완료했습니다.")
 
     # --- DB 저장 (단일 트랜잭션 처리) ---
-    insert_df = df[['BASE_DT', 'STOCK_CD', 'STOCK_NM',
-                    'inst_cnt', 'inst_con_cnt', 'fore_cnt', 'fore_con_cnt',
-                    'buy_con_cnt', 'avg_trx_qty', 'd1_trx_qty', 'd7_avg_trx_rate']]
+    insert_df = df[INSERT_COLS]
 
-    # [안정성개선] DELETE와 INSERT를 하나의 트랜잭션으로 묶어 데이터 정합성 보장
+    # [안정성개선] 기준일 데이터를 한번에 교체하여 데이터 정합성 보장
+    # (거래일 파티션이 있으면 EXCHANGE PARTITION, 없으면 한 트랜잭션에서 DELETE 후 INSERT)
     try:
-        with engine.begin() as conn:
-            # 1. 기존 데이터 삭제
-            del_sql = text("DELETE FROM stock.tb_stock_inv_trx_cnt WHERE BASE_DT = :base_dt")
-            logging.info(f"{base_date}의 기존 데이터를 'tb_stock_inv_trx_cnt' 테이블에서 삭제합니다.")
-            conn.execute(del_sql, {'base_dt': base_date})
-
-            # 2. 신규 데이터 삽입
-            logging.info(f"{len(insert_df)}건의 신규 데이터를 테이블에 저장합니다.")
-            insert_df.to_sql('tb_stock_inv_trx_cnt', conn, schema='stock', if_exists='append', index=False)
-            logging.info("데이터베이스 저장이 성공적으로 완료되었습니다.")
+        logging.info(f"{base_date}의 'tb_stock_inv_trx_cnt' 데이터를 {len(insert_df)}건으로 교체합니다.")
+        with span("reload") as s:
+            s.rows = reload_partition(engine, TABLE_NAME, base_date, insert_df)
+        logging.info("데이터베이스 저장이 성공적으로 완료되었습니다.")
     except SQLAlchemyError as e:
         logging.error(f"데이터베이스 처리 중 오류가 발생하여 작업이 롤백되었습니다: {e}")
         sys.exit(1)
 
 
-    # --- Rank 및 Grade 업데이트 (통합 쿼리) ---
-    # [성능개선] 여러 UPDATE 쿼리를 JOIN을 사용한 단일 쿼리로 통합
-    logging.info("순매수 순위, 등락률, 매수 등급 업데이트를 시작합니다.")
-    update_sql = text("""
-        UPDATE
-            stock.TB_STOCK_INV_TRX_CNT T1
-        LEFT JOIN (
-            SELECT
-                BASE_DT, STOCK_CD,
-                SUM(CASE WHEN INV_DIV = '7050' THEN RANK_AMT ELSE 0 END) AS INV_RANK_AMT,
-                SUM(CASE WHEN INV_DIV = '9000' THEN RANK_AMT ELSE 0 END) AS FOR_RANK_AMT
-            FROM stock.TB_INV_NET_BUY_DAY
-            WHERE BASE_DT = :base_date
-            GROUP BY BASE_DT, STOCK_CD
-        ) T2 ON T1.BASE_DT = T2.BASE_DT AND T1.STOCK_CD = T2.STOCK_CD
-        LEFT JOIN stock.TB_STOCK_DAY_PRICE T3 ON T1.BASE_DT = T3.BASE_DT AND T1.STOCK_CD = T3.STOCK_CD
-        SET
-            T1.INV_RANK_AMT = COALESCE(T2.INV_RANK_AMT, 0),
-            T1.FOR_RANK_AMT = COALESCE(T2.FOR_RANK_AMT, 0),
-            T1.PRICE_GAP_RATE = T3.PRICE_GAP_RATE,
-            T1.BUY_GRADE = CASE
-                WHEN (T1.BUY_CON_CNT >= 3 AND T1.D7_AVG_TRX_RATE > 1.3) OR T1.D7_AVG_TRX_RATE >= 2 THEN 'S'
-                WHEN T1.INST_CNT + T1.FORE_CNT >= 10 THEN 'A'
-                ELSE 'B'
-            END
-        WHERE
-            T1.BASE_DT = :base_date;
-    """)
-    try:
-        with engine.begin() as conn:
-            conn.execute(update_sql, {'base_date': base_date})
-        logging.info("순위, 등락률, 등급 컬럼 업데이트가 성공적으로 완료되었습니다.")
-    except SQLAlchemyError as e:
-        logging.error(f"Rank 및 Grade 업데이트 중 DB 오류가 발생했습니다: {e}")
-        sys.exit(1)
-
-
     # --- 엑셀 파일 저장 ---
     logging.info("최종 결과 데이터 조회 및 엑셀 파일 저장을 시작합니다.")
     os.makedirs(SAVE_DIR, exist_ok=True)
@@ -177,28 +182,76 @@ def main(base_date):
         WHERE A.BASE_DT = :base_date
         ORDER BY A.BUY_GRADE, A.STOCK_NM
     """)
-    result_df = pd.read_sql(result_sql, engine, params={"base_date": base_date})
-    excel_filename = f"tb_stock_inv_trx_cnt_{base_date}.xlsx"
-    file_path = os.path.join(SAVE_DIR, excel_filename)
-    result_df.to_excel(file_path, index=False)
+    with span("excel_result") as s:
+        result_df = pd.read_sql(result_sql, engine, params={"base_date": base_date})
+        excel_filename = f"tb_stock_inv_trx_cnt_{base_date}.xlsx"
+        file_path = os.path.join(SAVE_DIR, excel_filename)
+        result_df.to_excel(file_path, index=False)
+        s.rows = len(result_df)
     logging.info(f"분석 결과 엑셀 파일 저장 완료: {file_path}")
 
     # 2. 통계 요약 저장
-    stock_cnt_sql = text("""
-        SELECT stock_cd, stock_nm, COUNT(1) AS record_count
-        FROM stock.tb_stock_inv_trx_m
-        WHERE base_dt <= :base_date
-        GROUP BY stock_cd, stock_nm
-        ORDER BY record_count DESC
-    """)
-    stock_cnt_df = pd.read_sql(stock_cnt_sql, engine, params={"base_date": base_date})
-    stock_cnt_filename = f"stock_trx_analysis_{base_date}.xlsx"
-    stock_cnt_file_path = os.path.join(SAVE_DIR, stock_cnt_filename)
-    stock_cnt_df.to_excel(stock_cnt_file_path, index=False)
+    with span("excel_stock_cnt") as s:
+        stock_cnt_df = krx_trx_m_stat.report(engine, base_date)  # 종목별 수집 빈도 요약 조회
+        stock_cnt_filename = f"stock_trx_analysis_{base_date}.xlsx"
+        stock_cnt_file_path = os.path.join(SAVE_DIR, stock_cnt_filename)
+        stock_cnt_df.to_excel(stock_cnt_file_path, index=False)
+        s.rows = len(stock_cnt_df)
     logging.info(f"종목별 데이터 수집 빈도 엑셀 파일 저장 완료: {stock_cnt_file_path}")
 
 
+# --- 5. 기간 재계산 ---
+def rebuild_history(from_date, to_date, engine=None, chunk_days=HISTORY_CHUNK_DAYS):
+    """from_date ~ to_date 전체를 한번에 다시 계산합니다. (날짜별 반복 실행 없음)
+
+    순매수 데이터(tb_inv_net_buy_day)를 한번 조회해 (거래일, 종목, 투자자) 배열로 만들고,
+    모든 기준일의 7거래일 구간을 tb_stock_inv_trx_m 과 같은 규칙으로 잘라 지표를 한번에 계산합니다.
+    순위/등락률/매수 등급도 적재 전에 함께 계산하고, 결과는 chunk_days 거래일씩 DELETE 후 일괄 적재합니다.
+    """
+    engine = engine or get_engine()
+    calendar = get_calendar(engine)
+    days = calendar.range(from_date, to_date)
+    if not days:
+        logging.warning(f"{from_date} ~ {to_date} 사이에 거래일이 없습니다.")
+        return 0
+    panel_days = calendar.window(days[0], WINDOW_DAYS)[:-1] + days
+
+    with span("select") as s:
+        long_df = load_window(engine, panel_days)
+        s.rows = len(long_df)
+    logging.info(f"{panel_days[0]} ~ {panel_days[-1]} 투자자별 순매수 {len(long_df)}건을 조회했습니다.")
+
+    with span("compute") as s:
+        df = compute_counts(window_panel(long_df, panel_days, WINDOW_DAYS, RANK_LIMIT))
+        df = add_rank_price(df, engine, days[0], days[-1], long_df)
+        df['buy_grade'] = assign_grades(df)
+        s.rows = len(df)
+    logging.info(f"{days[0]} ~ {days[-1]} {len(days)}일, {len(df)}건 지표 계산을 완료했습니다.")
+
+    insert_df = df[INSERT_COLS]
+    for i in range(0, len(days), chunk_days):
+        chunk = days[i:i + chunk_days]
+        with span("reload") as s, engine.begin() as conn:
+            target = storage_table(conn, TABLE_NAME)
+            conn.execute(text(f"DELETE FROM stock.{target} WHERE BASE_DT BETWEEN :from_date AND :to_date"),
+                         {'from_date': chunk[0], 'to_date': chunk[-1]})
+            s.rows = bulk_load(insert_df[insert_df['BASE_DT'].isin(chunk)], TABLE_NAME, conn)
+        logging.info(f"{chunk[0]} ~ {chunk[-1]} {s.rows}건 저장")
+    return len(insert_df)
+
+
 if __name__ == "__main__":
+    # 기간 재계산 : python krx_tb_stock_inv_trx_cnt_3.py --history 20250102 20251230
+    if "--history" in sys.argv[1:]:
+        dates = [a for a in sys.argv[1:] if validate_date(a)]
+        if len(dates) != 2:
+            print("사용법: python krx_tb_stock_inv_trx_cnt_3.py --history FROM_DATE TO_DATE")
+            sys.exit(1)
+        logging.info(f"====== {dates[0]} ~ {dates[1]} 기간 재계산 시작 ======")
+        rebuild_history(dates[0], dates[1])
+        logging.info(f"====== {dates[0]} ~ {dates[1]} 기간 재계산 완료 ======")
+        sys.exit(0)
+
     # Argument 또는 사용자 입력을 통해 기준일자 받기
     if len(sys.argv) >= 2 and validate_date(sys.argv[1]):
         base_dt = sys.argv[1]
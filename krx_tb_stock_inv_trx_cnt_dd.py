@@ -1,5 +1,5 @@
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 import numpy as np
 import os
@@ -7,9 +7,14 @@ import sys
 from datetime import datetime
 import logging
 
+from krx_grade import assign_grades
+from krx_storage import prepare_frame, storage_table
+from krx_streak import add_streak_columns
+import krx_trx_m_stat
+from stockdb import get_engine
+
 # --- 1. 설정 변수 ---
 # 설정 정보를 코드 상단에 모아두어 관리를 용이하게 합니다.
-DB_URL = "mysql+mysqlconnector://root@localhost/stock?charset=utf8"
 SAVE_DIR = r"D:\python_proj\venv_stock\stock_file"
 
 # --- 2. 로깅 설정 ---
@@ -25,25 +30,13 @@ def validate_date(date_str):
     except ValueError:
         return False
 
-def count_max_con_buy(values):
-    """연속된 양수(순매수)의 최대 길이를 계산합니다."""
-    max_count = count = 0
-    for v in values:
-        if v > 0:
-            count += 1
-        else:
-            max_count = max(max_count, count)
-            count = 0
-    max_count = max(max_count, count)  # 마지막까지 연속된 경우를 처리
-    return max_count
-
 # --- 4. 메인 실행 로직 ---
 def main(base_date):
     """주어진 기준일자에 대한 투자자별 거래 데이터를 분석하고 저장합니다."""
     
     # DB 엔진 생성
     try:
-        engine = create_engine(DB_URL)
+        engine = get_engine()
     except ImportError:
         logging.error("mysql-connector-python 라이브러리를 찾을 수 없습니다. 'pip install mysql-connector-python'으로 설치해주세요.")
         sys.exit(1)
@@ -87,9 +80,9 @@ def main(base_date):
 
     # 순매수일수 및 연속 순매수일수 계산
     df['inst_cnt'] = df[inst_cols].gt(0).sum(axis=1)
-    df['inst_con_cnt'] = df[inst_cols].apply(count_max_con_buy, axis=1)
     df['fore_cnt'] = df[fore_cols].gt(0).sum(axis=1)
-    df['fore_con_cnt'] = df[fore_cols].apply(count_max_con_buy, axis=1)
+    add_streak_columns(df, 'inst', inst_cols)
+    add_streak_columns(df, 'fore', fore_cols)
     df['buy_con_cnt'] = df[buy_cols].gt(0).sum(axis=1) # D1, D2 기관/외인 동시 순매수일 수
 
     # [성능개선] apply 대신 벡터화 연산을 사용하여 평균 거래량 계산
@@ -102,24 +95,29 @@ def main(base_date):
         (df['d1_trx_qty'] / df['avg_trx_qty']).round(1),
         0
     )
+    df['buy_grade'] = assign_grades(df) # 매수 등급 (krx_grade 규칙, 저장 전에 계산)
     logging.info("주요 지표 계산을 완료했습니다.")
 
     # --- DB 저장 (단일 트랜잭션 처리) ---
     insert_df = df[['BASE_DT', 'STOCK_CD', 'STOCK_NM',
                     'inst_cnt', 'inst_con_cnt', 'fore_cnt', 'fore_con_cnt',
-                    'buy_con_cnt', 'avg_trx_qty', 'd1_trx_qty', 'd7_avg_trx_rate']]
+                    'buy_con_cnt', 'avg_trx_qty', 'd1_trx_qty', 'd7_avg_trx_rate',
+                    'inst_cur_cnt', 'fore_cur_cnt', 'inst_run_qty', 'fore_run_qty', 'buy_grade']]
 
     # [안정성개선] DELETE와 INSERT를 하나의 트랜잭션으로 묶어 데이터 정합성 보장
     try:
         with engine.begin() as conn:
+            # 압축 전환된 테이블은 실제 테이블(tb_stock_inv_trx_cnt_data)에 STOCK_NM 없이 저장
+            target, insert_df = prepare_frame(conn, 'tb_stock_inv_trx_cnt', insert_df)
+
             # 1. 기존 데이터 삭제
-            del_sql = text("DELETE FROM stock.tb_stock_inv_trx_cnt WHERE BASE_DT = :base_dt")
+            del_sql = text(f"DELETE FROM stock.{target} WHERE BASE_DT = :base_dt")
             logging.info(f"{base_date}의 기존 데이터를 'tb_stock_inv_trx_cnt' 테이블에서 삭제합니다.")
             conn.execute(del_sql, {'base_dt': base_date})
 
             # 2. 신규 데이터 삽입
             logging.info(f"{len(insert_df)}건의 신규 데이터를 테이블에 저장합니다.")
-            insert_df.to_sql('tb_stock_inv_trx_cnt', conn, schema='stock', if_exists='append', index=False)
+            insert_df.to_sql(target, conn, schema='stock', if_exists='append', index=False)
             logging.info("데이터베이스 저장이 성공적으로 완료되었습니다.")
     except SQLAlchemyError as e:
         logging.error(f"데이터베이스 처리 중 오류가 발생하여 작업이 롤백되었습니다: {e}")
@@ -128,10 +126,11 @@ def main(base_date):
 
     # --- Rank 및 Grade 업데이트 (통합 쿼리) ---
     # [성능개선] 여러 UPDATE 쿼리를 JOIN을 사용한 단일 쿼리로 통합
-    logging.info("순매수 순위, 등락률, 매수 등급 업데이트를 시작합니다.")
-    update_sql = text("""
+    logging.info("순매수 순위, 등락률 업데이트를 시작합니다.")
+    # 압축 전환된 테이블은 호환 뷰(외부 조인)로 UPDATE 할 수 없으므로 실제 테이블을 대상으로 함
+    update_sql = """
         UPDATE
-            stock.TB_STOCK_INV_TRX_CNT T1
+            stock.{target} T1
         LEFT JOIN (
             SELECT
                 BASE_DT, STOCK_CD,
@@ -145,19 +144,15 @@ def main(base_date):
         SET
             T1.INV_RANK_AMT = COALESCE(T2.INV_RANK_AMT, 0),
             T1.FOR_RANK_AMT = COALESCE(T2.FOR_RANK_AMT, 0),
-            T1.PRICE_GAP_RATE = T3.PRICE_GAP_RATE,
-            T1.BUY_GRADE = CASE
-                WHEN (T1.BUY_CON_CNT >= 3 AND T1.D7_AVG_TRX_RATE > 1.3) OR T1.D7_AVG_TRX_RATE >= 2 THEN 'S'
-                WHEN T1.INST_CNT + T1.FORE_CNT >= 10 THEN 'A'
-                ELSE 'B'
-            END
+            T1.PRICE_GAP_RATE = T3.PRICE_GAP_RATE
         WHERE
             T1.BASE_DT = :base_date;
-    """)
+    """
     try:
         with engine.begin() as conn:
-            conn.execute(update_sql, {'base_date': base_date})
-        logging.info("순위, 등락률, 등급 컬럼 업데이트가 성공적으로 완료되었습니다.")
+            conn.execute(text(update_sql.format(target=storage_table(conn, "tb_stock_inv_trx_cnt"))),
+                         {'base_date': base_date})
+        logging.info("순위, 등락률 컬럼 업데이트가 성공적으로 완료되었습니다.")
     except SQLAlchemyError as e:
         logging.error(f"Rank 및 Grade 업데이트 중 DB 오류가 발생했습니다: {e}")
         sys.exit(1)
@@ -184,14 +179,7 @@ def main(base_date):
     logging.info(f"분석 결과 엑셀 파일 저장 완료: {file_path}")
 
     # 2. 통계 요약 저장
-    stock_cnt_sql = text("""
-        SELECT stock_cd, stock_nm, COUNT(1) AS record_count
-        FROM stock.tb_stock_inv_trx_m
-        WHERE base_dt <= :base_date
-        GROUP BY stock_cd, stock_nm
-        ORDER BY record_count DESC
-    """)
-    stock_cnt_df = pd.read_sql(stock_cnt_sql, engine, params={"base_date": base_date})
+    stock_cnt_df = krx_trx_m_stat.report(engine, base_date)  # 종목별 수집 빈도 요약 조회
     stock_cnt_filename = f"stock_trx_analysis_{base_date}.xlsx"
     stock_cnt_file_path = os.path.join(SAVE_DIR, stock_cnt_filename)
     stock_cnt_df.to_excel(stock_cnt_file_path, index=False)
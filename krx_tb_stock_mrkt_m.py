@@ -1,8 +1,10 @@
 import requests
 from bs4 import BeautifulSoup
 import pandas as pd
-import mysql.connector
 from datetime import datetime
+from sqlalchemy import text
+
+from stockdb import get_engine
 
 # 1. 시황 데이터 가져오기
 def get_market_summary():
@@ -66,16 +68,15 @@ def get_special_stocks():
 
 # 3. MariaDB에 저장
 def save_to_mariadb(market_summary, special_stocks):
-    conn = mysql.connector.connect(
-        host="localhost",   # ✅ 여기에 본인 DB 정보 입력
-        user="your_username",
-        password="your_password",
-        database="your_database"
-    )
-    cursor = conn.cursor()
+    # 접속 정보는 stockdb 환경변수(STOCK_DB_*)로 설정
+    with get_engine().begin() as conn:
+        save_market_summary(conn, market_summary, special_stocks)
+    print("✅ MariaDB 저장 완료.")
+
 
+def save_market_summary(conn, market_summary, special_stocks):
     # 테이블 생성 (없으면)
-    cursor.execute("""
+    conn.execute(text("""
         CREATE TABLE IF NOT EXISTS market_summary (
             date DATE PRIMARY KEY,
             kospi VARCHAR(20),
@@ -88,9 +89,9 @@ def save_to_mariadb(market_summary, special_stocks):
             kospi200_change VARCHAR(20),
             kospi200_rate VARCHAR(20)
         )
-    """)
+    """))
 
-    cursor.execute("""
+    conn.execute(text("""
         CREATE TABLE IF NOT EXISTS special_stocks (
             id INT AUTO_INCREMENT PRIMARY KEY,
             date DATE,
@@ -99,43 +100,22 @@ def save_to_mariadb(market_summary, special_stocks):
             change VARCHAR(20),
             rate VARCHAR(20)
         )
-    """)
+    """))
 
     # market_summary 저장
-    cursor.execute("""
+    conn.execute(text("""
         REPLACE INTO market_summary 
         (date, kospi, kospi_change, kospi_rate, kosdaq, kosdaq_change, kosdaq_rate, kospi200, kospi200_change, kospi200_rate)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """, (
-        market_summary['date'],
-        market_summary['kospi'],
-        market_summary['kospi_change'],
-        market_summary['kospi_rate'],
-        market_summary['kosdaq'],
-        market_summary['kosdaq_change'],
-        market_summary['kosdaq_rate'],
-        market_summary['kospi200'],
-        market_summary['kospi200_change'],
-        market_summary['kospi200_rate']
-    ))
-
-    # special_stocks 저장
-    for stock in special_stocks:
-        cursor.execute("""
+        VALUES (:date, :kospi, :kospi_change, :kospi_rate, :kosdaq, :kosdaq_change, :kosdaq_rate,
+                :kospi200, :kospi200_change, :kospi200_rate)
+    """), market_summary)
+
+    # special_stocks 저장 (한번에 executemany)
+    if special_stocks:
+        conn.execute(text("""
             INSERT INTO special_stocks (date, stock_name, current_price, change, rate)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (
-            stock['date'],
-            stock['stock_name'],
-            stock['current_price'],
-            stock['change'],
-            stock['rate']
-        ))
-
-    conn.commit()
-    cursor.close()
-    conn.close()
-    print("✅ MariaDB 저장 완료.")
+            VALUES (:date, :stock_name, :current_price, :change, :rate)
+        """), special_stocks)
 
 # 4. 메인 실행
 if __name__ == "__main__":
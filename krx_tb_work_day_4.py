@@ -1,50 +1,28 @@
-import requests
+import sys
 import pandas as pd
-from datetime import datetime
-import io
-from sqlalchemy import create_engine, text
-
-# DB 설정
-MYSQL_USER = "root"
-MYSQL_PASSWORD = ""
-MYSQL_HOST = "localhost"
-MYSQL_DB = "stock"
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+from krx_client import get_client, stock_history_payload
+from krx_loader import bulk_load
+from stockdb import get_engine
+
 TABLE_NAME = "tb_work_day"
 
-# SQLAlchemy 엔진 생성
-engine = create_engine(
-    f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}?charset=utf8"
-)
+# 전체 재생성 시 조회 시작일
+START_DATE = '2025-01-01'
+
+# 프로세스 공용 엔진
+engine = get_engine()
 
 # 삼성전자 거래일 데이터 조회
 def get_samsung_trading_days(start_date, end_date):
-    session = requests.Session()
-    headers = {
-        'User-Agent': 'Mozilla/5.0',
-        'Referer': 'http://data.krx.co.kr/',
-        'X-Requested-With': 'XMLHttpRequest'
-    }
-
-    otp_payload = {
-        'tboxisuCd_finder_stkisu0_0': '005930/삼성전자',
-        'isuCd': 'KR7005930003',
-        'strtDd': start_date.replace('-', ''),
-        'endDd': end_date.replace('-', ''),
-        'csvxls_isNo': 'false',
-        'name': 'fileDown',
-        'url': 'dbms/MDC/STAT/standard/MDCSTAT01701'
-    }
+    otp_payload = stock_history_payload('KR7005930003', '005930', '삼성전자', start_date, end_date)
 
     try:
-        otp_resp = session.post('http://data.krx.co.kr/comm/fileDn/GenerateOTP/generate.cmd', headers=headers, data=otp_payload)
-        otp_resp.raise_for_status()
-        otp = otp_resp.text.strip()
-
-        download_resp = session.post('http://data.krx.co.kr/comm/fileDn/download_csv/download.cmd', headers=headers, data={'code': otp})
-        download_resp.raise_for_status()
-        csv_data = download_resp.content.decode('euc-kr')
-
-        df = pd.read_csv(io.StringIO(csv_data))
+        df = get_client().fetch_df(otp_payload)
+        if df is None:
+            return None
         if '일자' not in df.columns:
             print("⚠️ '일자' 컬럼이 없습니다.")
             return None
@@ -58,51 +36,99 @@ def get_samsung_trading_days(start_date, end_date):
         print(f"❌ 데이터 요청 실패: {e}")
         return None
 
-# 거래일 DB 테이블 저장
-def recreate_work_days(df):
-    if df.empty:
-        print("⚠️ 저장할 거래일이 없습니다.")
-        return
-
+# 마지막으로 저장된 거래일, 순번 조회 (없으면 None)
+def get_last_work_day(engine=engine):
+    sql = text(f"""
+        SELECT DATE_FORMAT(WORK_DAY, '%Y%m%d') AS WORK_DAY, WORK_SEQ FROM {TABLE_NAME}
+        WHERE WORK_DIV = 'stock'
+        ORDER BY WORK_SEQ DESC
+        LIMIT 1
+    """)
+    with engine.connect() as conn:
+        row = conn.execute(sql).fetchone()
+    return (row[0], int(row[1])) if row else None
+
+# 거래일 → tb_work_day 컬럼 (start_seq 부터 순번 부여)
+def to_work_df(df, start_seq=1):
     df = df.sort_values('Date').reset_index(drop=True)
-
-    work_df = pd.DataFrame({
+    return pd.DataFrame({
         'WORK_DAY': df['Date'].dt.strftime('%Y%m%d'),
         'WORK_YN': 'Y',
         'WORK_DIV': 'stock',
-        'WORK_SEQ': df.index + 1
+        'WORK_SEQ': df.index + start_seq
     })
 
+# 다건 INSERT ... ON DUPLICATE KEY UPDATE 로 저장
+def write_work_days(conn, work_df):
+    bulk_load(work_df, TABLE_NAME, conn, upsert=True, key_cols=['WORK_DAY'])
+
+# 거래일 DB 테이블 전체 재생성
+def recreate_work_days(df, engine=engine):
+    if df.empty:
+        print("⚠️ 저장할 거래일이 없습니다.")
+        return
+
+    work_df = to_work_df(df)
+
     try:
-        with engine.connect() as conn:
-            with conn.begin():
-                conn.execute(text(f"DELETE FROM {TABLE_NAME} WHERE WORK_DIV = 'stock'"))
-                print(f"✅ 기존 데이터 삭제 완료")
-
-                # 수동 REPLACE INTO 사용 (to_sql은 REPLACE 미지원)
-                insert_sql = text(f"""
-                    REPLACE INTO {TABLE_NAME} (WORK_DAY, WORK_YN, WORK_DIV, WORK_SEQ)
-                    VALUES (:WORK_DAY, :WORK_YN, :WORK_DIV, :WORK_SEQ)
-                """)
-                for _, row in work_df.iterrows():
-                    conn.execute(insert_sql, row.to_dict())
+        with engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {TABLE_NAME} WHERE WORK_DIV = 'stock'"))
+            print(f"✅ 기존 데이터 삭제 완료")
+            write_work_days(conn, work_df)
 
         print(f"✅ 총 {len(work_df)}개의 거래일이 저장되었습니다.")
 
     except Exception as e:
         print(f"❌ DB 저장 실패: {e}")
 
-# 메인 실행
-if __name__ == '__main__':
-    start_date = '2025-01-01'
-    end_date = datetime.now().strftime('%Y-%m-%d')
+# 마지막 거래일 이후 거래일만 추가 저장
+def append_work_days(df, last_day, last_seq, engine=engine):
+    df = df[df['Date'].dt.strftime('%Y%m%d') > last_day]
+    if df.empty:
+        print(f"✅ 추가할 거래일이 없습니다. (마지막 거래일: {last_day})")
+        return
 
-    print(f"📅 삼성전자 거래일 조회: {start_date} ~ {end_date}")
-    trading_days = get_samsung_trading_days(start_date, end_date)
+    work_df = to_work_df(df, start_seq=last_seq + 1)
+
+    try:
+        with engine.begin() as conn:
+            write_work_days(conn, work_df)
+        print(f"✅ {len(work_df)}개의 거래일이 추가되었습니다. ({work_df['WORK_DAY'].iloc[0]} ~ {work_df['WORK_DAY'].iloc[-1]})")
 
-    if trading_days is not None:
-        recreate_work_days(trading_days)
+    except Exception as e:
+        print(f"❌ DB 저장 실패: {e}")
+
+# 거래일 갱신 : 기본은 마지막 거래일 이후만 추가, full=True 또는 데이터가 없으면 전체 재생성
+def update_work_days(full=False, engine=engine):
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    last = None if full else get_last_work_day(engine)
+
+    if last is None:
+        print(f"📅 삼성전자 거래일 전체 조회: {START_DATE} ~ {end_date}")
+        trading_days = get_samsung_trading_days(START_DATE, end_date)
+        if trading_days is None:
+            print("❌ 거래일 데이터를 불러오지 못했습니다.")
+            return
+        recreate_work_days(trading_days, engine)
         trading_days.to_csv('samsung_work_days.csv', index=False, encoding='utf-8-sig')
         print("📁 'samsung_work_days.csv' 저장 완료.")
-    else:
-        print("❌ 거래일 데이터를 불러오지 못했습니다.")
\ No newline at end of file
+        return
+
+    last_day, last_seq = last
+    start_date = (datetime.strptime(last_day, '%Y%m%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+    if start_date > end_date:
+        print(f"✅ 최신 상태입니다. (마지막 거래일: {last_day})")
+        return
+
+    print(f"📅 삼성전자 거래일 추가 조회: {start_date} ~ {end_date} (마지막 거래일: {last_day}, 순번: {last_seq})")
+    trading_days = get_samsung_trading_days(start_date, end_date)
+    if trading_days is None:
+        print("❌ 거래일 데이터를 불러오지 못했습니다.")
+        return
+    append_work_days(trading_days, last_day, last_seq, engine)
+
+# 메인 실행
+#   python krx_tb_work_day_4.py          : 마지막 거래일 이후만 추가
+#   python krx_tb_work_day_4.py --full   : 전체 재생성
+if __name__ == '__main__':
+    update_work_days(full='--full' in sys.argv[1:])
@@ -0,0 +1,269 @@
+"""
+종목별 tb_stock_inv_trx_m 수집 빈도 요약 (tb_stock_trx_m_stat)
+
+- 종목당 1행 : 등장 횟수, 첫 / 마지막 등장일, 마지막 등장일까지 연속 등장 거래일 수, 최장 연속 등장 거래일 수
+- 전체 이력 GROUP BY 대신 거래일 적재 / 재적재 때마다 해당 거래일만 반영 (krx_pipeline 의 trx_m_stat 단계)
+    다음 거래일 적재 : 기준일 등장 종목 행만 +1 (기준일 1일치 조회)
+    이미 반영한 거래일 재적재 : 기준일 전후로 바뀔 수 있는 종목(기준일 등장 종목 + 마지막 등장일이 기준일 이후인 종목)만
+                              해당 종목 이력으로 다시 계산
+    요약이 비어 있으면 전체 재계산 (rebuild)
+- report : 기준일 종목별 수집 빈도 (요약 테이블 조회 1번)
+
+실행 예)
+    python krx_trx_m_stat.py 20250404            # 기준일 반영 후 상위 종목 출력
+    python krx_trx_m_stat.py --rebuild           # 전체 재계산
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text, bindparam
+from sqlalchemy.engine import Engine
+
+from krx_calendar import get_calendar
+from krx_loader import bulk_load
+from krx_metrics import span
+from krx_streak import run_lengths
+from stockdb import get_engine
+
+
+TABLE_NAME = "tb_stock_trx_m_stat"
+SOURCE_TABLE = "tb_stock_inv_trx_m"
+
+STAT_COLUMNS = ["STOCK_CD", "APPEAR_CNT", "FIRST_DT", "LAST_DT", "LAST_RUN", "MAX_RUN"]
+
+CREATE_TABLE_SQL = text(f"""
+    CREATE TABLE IF NOT EXISTS stock.{TABLE_NAME} (
+        STOCK_CD    CHAR(6)  NOT NULL,
+        APPEAR_CNT  INT      NOT NULL,
+        FIRST_DT    DATE     NOT NULL,
+        LAST_DT     DATE     NOT NULL,
+        LAST_RUN    INT      NOT NULL,
+        MAX_RUN     INT      NOT NULL,
+        PRIMARY KEY (STOCK_CD),
+        KEY IX_TRX_M_STAT_1 (LAST_DT)
+    )
+""")
+
+SELECT_AS_OF_SQL = text(f"SELECT DATE_FORMAT(MAX(LAST_DT), '%Y%m%d') FROM stock.{TABLE_NAME}")
+
+SELECT_STAT_SQL = text(f"""
+    SELECT STOCK_CD, APPEAR_CNT, DATE_FORMAT(FIRST_DT, '%Y%m%d') AS FIRST_DT,
+           DATE_FORMAT(LAST_DT, '%Y%m%d') AS LAST_DT, LAST_RUN, MAX_RUN
+    FROM stock.{TABLE_NAME}
+    WHERE STOCK_CD IN :stock_cds
+""").bindparams(bindparam("stock_cds", expanding=True))
+
+SELECT_SEEN_SINCE_SQL = text(f"""
+    SELECT STOCK_CD FROM stock.{TABLE_NAME}
+    WHERE LAST_DT >= :base_dt
+""")
+
+DELETE_STOCKS_SQL = text(f"""
+    DELETE FROM stock.{TABLE_NAME}
+    WHERE STOCK_CD IN :stock_cds
+""").bindparams(bindparam("stock_cds", expanding=True))
+
+SELECT_APPEAR_RANGE_SQL = text(f"""
+    SELECT DATE_FORMAT(BASE_DT, '%Y%m%d') AS BASE_DT, STOCK_CD FROM stock.{SOURCE_TABLE}
+    WHERE BASE_DT BETWEEN :from_dt AND :to_dt
+""")
+
+SELECT_APPEAR_STOCKS_SQL = text(f"""
+    SELECT DATE_FORMAT(BASE_DT, '%Y%m%d') AS BASE_DT, STOCK_CD FROM stock.{SOURCE_TABLE}
+    WHERE BASE_DT <= :to_dt
+    AND STOCK_CD IN :stock_cds
+""").bindparams(bindparam("stock_cds", expanding=True))
+
+SELECT_REPORT_SQL = text(f"""
+    SELECT S.STOCK_CD AS stock_cd, C.STOCK_NM AS stock_nm, S.APPEAR_CNT AS record_count,
+           DATE_FORMAT(S.FIRST_DT, '%Y%m%d') AS first_dt, DATE_FORMAT(S.LAST_DT, '%Y%m%d') AS last_dt,
+           CASE WHEN S.LAST_DT = :base_dt THEN S.LAST_RUN ELSE 0 END AS cur_run,
+           S.MAX_RUN AS max_run
+    FROM stock.{TABLE_NAME} S
+    LEFT JOIN stock.tb_stock_code C ON C.STOCK_CD = S.STOCK_CD
+    ORDER BY S.APPEAR_CNT DESC
+""")
+
+# 요약이 기준일과 맞지 않을 때(과거 기준일 재실행 등) 사용하는 전체 이력 집계 (SELECT_REPORT_SQL 과 같은 컬럼)
+#   연속 등장 구간 : WORK_SEQ - ROW_NUMBER() 가 같은 행끼리 한 구간
+SELECT_REPORT_SCAN_SQL = text(f"""
+    WITH A AS (
+        SELECT M.STOCK_CD, M.BASE_DT,
+               W.WORK_SEQ - ROW_NUMBER() OVER (PARTITION BY M.STOCK_CD ORDER BY W.WORK_SEQ) AS GRP
+        FROM stock.{SOURCE_TABLE} M
+        JOIN stock.tb_work_day W ON W.WORK_DIV = 'stock' AND W.WORK_DAY = M.BASE_DT
+        WHERE M.BASE_DT <= :base_dt
+    ), R AS (
+        SELECT STOCK_CD, COUNT(1) AS RUN_LEN, MIN(BASE_DT) AS RUN_START, MAX(BASE_DT) AS RUN_END
+        FROM A
+        GROUP BY STOCK_CD, GRP
+    )
+    SELECT R.STOCK_CD AS stock_cd, C.STOCK_NM AS stock_nm, SUM(R.RUN_LEN) AS record_count,
+           DATE_FORMAT(MIN(R.RUN_START), '%Y%m%d') AS first_dt, DATE_FORMAT(MAX(R.RUN_END), '%Y%m%d') AS last_dt,
+           MAX(CASE WHEN R.RUN_END = :base_dt THEN R.RUN_LEN ELSE 0 END) AS cur_run,
+           MAX(R.RUN_LEN) AS max_run
+    FROM R
+    LEFT JOIN stock.tb_stock_code C ON C.STOCK_CD = R.STOCK_CD
+    GROUP BY R.STOCK_CD, C.STOCK_NM
+    ORDER BY record_count DESC
+""")
+
+
+_table_ready = set()
+
+
+def ensure_table(engine):
+    if id(engine) in _table_ready:
+        return
+    with engine.begin() as conn:
+        conn.execute(CREATE_TABLE_SQL)
+    _table_ready.add(id(engine))
+
+
+def as_of(con):
+    """요약에 반영된 마지막 거래일 (비어 있으면 None)"""
+    if isinstance(con, Engine):
+        with con.connect() as conn:
+            return as_of(conn)
+    return con.execute(SELECT_AS_OF_SQL).scalar()
+
+
+def summarize(appear, days):
+    """(BASE_DT, STOCK_CD) 등장 행 + 거래일 목록(오름차순) → 종목별 요약 행"""
+    stocks = pd.Index(appear["STOCK_CD"].unique())
+    mask = np.zeros((len(stocks), len(days)), dtype=bool)
+    day_pos = pd.Index(days).get_indexer(appear["BASE_DT"])
+    ok = day_pos >= 0
+    mask[stocks.get_indexer(appear["STOCK_CD"])[ok], day_pos[ok]] = True
+
+    runs = run_lengths(mask)
+    # 마지막 등장 위치 (뒤집어 argmax), 첫 등장 위치
+    last_pos = len(days) - 1 - np.argmax(mask[:, ::-1], axis=1)
+    first_pos = np.argmax(mask, axis=1)
+    day_arr = np.asarray(days, dtype=object)
+    out = pd.DataFrame({
+        "STOCK_CD": stocks,
+        "APPEAR_CNT": mask.sum(axis=1),
+        "FIRST_DT": day_arr[first_pos],
+        "LAST_DT": day_arr[last_pos],
+        "LAST_RUN": runs[np.arange(len(stocks)), last_pos],
+        "MAX_RUN": runs.max(axis=1) if len(days) else 0,
+    })
+    return out[out["APPEAR_CNT"] > 0]
+
+
+def advance(stat, appear, days, calendar):
+    """기존 요약(stat, 등장 종목 행만) 에 이후 거래일(days) 등장 행을 순서대로 반영"""
+    stat = stat.set_index("STOCK_CD")
+    for day in days:
+        stock_cds = appear.loc[appear["BASE_DT"] == day, "STOCK_CD"].unique()
+        cur = stat.reindex(stock_cds)
+        new = cur["APPEAR_CNT"].isna()
+        prev_day = calendar.shift(day, -1)
+        # 전 거래일에도 등장했으면 연속 구간 이어서, 아니면 1부터
+        run = np.where(cur["LAST_DT"].to_numpy() == prev_day, cur["LAST_RUN"].fillna(0) + 1, 1)
+        cur["APPEAR_CNT"] = cur["APPEAR_CNT"].fillna(0) + 1
+        cur["FIRST_DT"] = cur["FIRST_DT"].where(~new, day)
+        cur["LAST_DT"] = day
+        cur["LAST_RUN"] = run
+        cur["MAX_RUN"] = np.maximum(cur["MAX_RUN"].fillna(0), run)
+        stat = pd.concat([stat.drop(stock_cds, errors="ignore"), cur])
+    return stat.rename_axis("STOCK_CD").reset_index()
+
+
+def load_stat(con, stock_cds):
+    stock_cds = list(stock_cds)
+    if not stock_cds:
+        return pd.DataFrame(columns=STAT_COLUMNS)
+    return pd.read_sql(SELECT_STAT_SQL, con, params={"stock_cds": stock_cds})
+
+
+def save_stat(conn, stat, delete_cds=()):
+    """요약 행 저장 (STOCK_CD 기준 갱신). delete_cds 중 stat 에 없는 종목은 삭제"""
+    gone = sorted(set(delete_cds) - set(stat["STOCK_CD"]))
+    if gone:
+        conn.execute(DELETE_STOCKS_SQL, {"stock_cds": gone})
+    stat = stat[STAT_COLUMNS].astype({col: np.int64 for col in ("APPEAR_CNT", "LAST_RUN", "MAX_RUN")})
+    return bulk_load(stat, TABLE_NAME, conn, upsert=True, key_cols=["STOCK_CD"])
+
+
+def rebuild(engine, to_dt=None):
+    """to_dt(기본 마지막 거래일) 까지 전체 이력으로 요약 재계산"""
+    ensure_table(engine)
+    calendar = get_calendar(engine)
+    days = calendar.range(calendar.days[0], to_dt or calendar.last_day)
+    with span("select") as s:
+        appear = pd.read_sql(SELECT_APPEAR_RANGE_SQL, engine, params={"from_dt": days[0], "to_dt": days[-1]})
+        s.rows = len(appear)
+    with span("summarize") as s:
+        stat = summarize(appear, days)
+        s.rows = len(stat)
+    with span("insert") as s, engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM stock.{TABLE_NAME}"))
+        s.affected = save_stat(conn, stat)
+    print(f"[✔] {TABLE_NAME} {days[-1]} 까지 {len(stat)}종목 재계산")
+    return len(stat)
+
+
+def update_day(base_dt, engine):
+    """기준일 적재 / 재적재 반영. 갱신한 종목 수 반환"""
+    ensure_table(engine)
+    calendar = get_calendar(engine)
+    last_dt = as_of(engine)
+    if last_dt is None:
+        return rebuild(engine, base_dt)
+
+    if base_dt > last_dt:
+        # 다음 거래일 적재 : 빠진 거래일이 있으면 함께 순서대로 반영
+        days = calendar.range(calendar.shift(last_dt, 1), base_dt)
+        with span("select") as s:
+            appear = pd.read_sql(SELECT_APPEAR_RANGE_SQL, engine, params={"from_dt": days[0], "to_dt": days[-1]})
+            s.rows = len(appear)
+        with span("advance") as s:
+            stat = advance(load_stat(engine, appear["STOCK_CD"].unique()), appear, days, calendar)
+            s.rows = len(stat)
+        delete_cds = ()
+    else:
+        # 재적재 : 기준일에 등장했을 수 있는 종목만 이력으로 다시 계산
+        with span("select") as s, engine.connect() as conn:
+            now = pd.read_sql(SELECT_APPEAR_RANGE_SQL, conn, params={"from_dt": base_dt, "to_dt": base_dt})
+            before = [row[0] for row in conn.execute(SELECT_SEEN_SINCE_SQL, {"base_dt": base_dt})]
+            delete_cds = sorted(set(now["STOCK_CD"]) | set(before))
+            appear = now.iloc[:0]
+            if delete_cds:
+                appear = pd.read_sql(SELECT_APPEAR_STOCKS_SQL, conn, params={"to_dt": last_dt, "stock_cds": delete_cds})
+            s.rows = len(appear)
+        with span("summarize") as s:
+            stat = summarize(appear, calendar.range(calendar.days[0], last_dt))
+            s.rows = len(stat)
+
+    with span("insert") as s, engine.begin() as conn:
+        s.affected = save_stat(conn, stat, delete_cds)
+    print(f"[✔] {TABLE_NAME} {base_dt} 반영 ({len(stat)}종목 갱신)")
+    return len(stat)
+
+
+def report(engine, base_dt):
+    """기준일 종목별 수집 빈도. 요약이 기준일까지 반영되어 있으면 요약 조회, 아니면 전체 이력 집계"""
+    ensure_table(engine)
+    if as_of(engine) == base_dt:
+        return pd.read_sql(SELECT_REPORT_SQL, engine, params={"base_dt": base_dt})
+    print(f"[i] {TABLE_NAME} 가 {base_dt} 기준이 아니어서 전체 이력을 집계합니다.")
+    return pd.read_sql(SELECT_REPORT_SCAN_SQL, engine, params={"base_dt": base_dt})
+
+
+if __name__ == "__main__":
+    engine = get_engine()
+
+    if "--rebuild" in sys.argv[1:]:
+        rebuild(engine)
+        sys.exit(0)
+
+    if len(sys.argv) < 2:
+        print("사용법: python krx_trx_m_stat.py BASE_DT | --rebuild")
+        sys.exit(1)
+
+    update_day(sys.argv[1], engine)
+    print(report(engine, sys.argv[1]).head(30).to_string(index=False))
@@ -1,7 +1,7 @@
 """
 https://github.com/FinanceData/FinanceDataReader?tab=readme-ov-file
 
-pip install --upgrade finance-datareader pymysql sqlalchemy
+pip install --upgrade finance-datareader mysql-connector-python sqlalchemy
 
 
 OPMARGIN       FLOAT,     -- 영업이익률 (%)
@@ -32,26 +32,26 @@ PEG = PER / EPS 증가율 (정상값일 때만 계산)
 
 import pandas as pd
 import FinanceDataReader as fdr
-from sqlalchemy import create_engine
-import pymysql
 import os
 from datetime import datetime
 import logging
 import time
 import random
 import requests.exceptions
+from functools import lru_cache
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from stockdb import get_engine
 
-# --- MariaDB 연결 설정 ---
-MYSQL_USER = "root"
-MYSQL_PASSWORD = "" 
-MYSQL_HOST = "localhost"
-MYSQL_DB = "stock"
 FIN_SUMMARY_TABLE_NAME = "tb_stock_fin_summary"
+FIN_SUMMARY_KEY_COLUMNS = ["STOCK_CD", "BASE_YEAR"]
+
+# executemany 한번에 보내는 행 수 (mysql-connector 가 다건 VALUES 한 문장으로 묶어 전송)
+UPSERT_BATCH_SIZE = 1000
 
-# SQLAlchemy 엔진 생성 
-engine = create_engine(
-    f"mysql+mysqlconnector://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DB}?charset=utf8"
-)
+# 프로세스 공용 엔진
+engine = get_engine()
 
 # --- 저장 경로 및 날짜 ---
 EXPORT_FOLDER = r'D:\python_proj\venv_stock\stock_file'
@@ -196,11 +196,35 @@ def extract_fin_summary(stock_cd, target_year):
             return None
     return None 
 
-# --- INSERT ... ON DUPLICATE KEY UPDATE로 중복 업데이트 저장 ---
-def insert_fin_summary_on_duplicate_key_update(data_list):
+# --- INSERT ... ON DUPLICATE KEY UPDATE 문장 (컬럼 구성별로 한번만 생성) ---
+@lru_cache(maxsize=None)
+def upsert_statement(columns):
+    updates = ", ".join(f"{col} = VALUES({col})" for col in columns if col not in FIN_SUMMARY_KEY_COLUMNS)
+    return text(f"""
+        INSERT INTO stock.{FIN_SUMMARY_TABLE_NAME} ({", ".join(columns)})
+        VALUES ({", ".join(f":{col}" for col in columns)})
+        ON DUPLICATE KEY UPDATE {updates}
+    """)
+
+
+# 실패한 배치를 행 단위(SAVEPOINT)로 다시 저장. 실패한 행 목록 반환
+def upsert_rows_one_by_one(conn, stmt, rows):
+    failed = []
+    for row in rows:
+        try:
+            with conn.begin_nested():
+                conn.execute(stmt, row)
+        except DBAPIError as e:
+            logging.error(f"데이터 삽입/업데이트 중 오류 발생 for {row.get('STOCK_CD')} - {row.get('BASE_YEAR')}: {e.orig}")
+            failed.append(row)
+    return failed
+
+
+# --- INSERT ... ON DUPLICATE KEY UPDATE로 중복 업데이트 저장 (배치 executemany) ---
+def insert_fin_summary_on_duplicate_key_update(data_list, batch_size=UPSERT_BATCH_SIZE):
     if not data_list:
         logging.info("저장할 데이터 없음")
-        return
+        return 0
 
     # Assuming the database table 'tb_stock_fin_summary' has columns for all new fields.
     # If not, you'll need to run ALTER TABLE commands to add them.
@@ -209,25 +233,24 @@ def insert_fin_summary_on_duplicate_key_update(data_list):
     # ALTER TABLE stock.tb_stock_fin_summary ADD COLUMN `PRETAX_CONT_PROFIT` BIGINT NULL;
     # ... and so on for all new columns ...
 
-    with engine.begin() as conn: 
-        for row in data_list:
-            keys = ", ".join(row.keys())
-            values_placeholders = ", ".join(["%s"] * len(row))
-            
-            update_clauses = [f"{k}=VALUES({k})" for k in row.keys() if k not in ['STOCK_CD', 'BASE_YEAR']]
-            updates = ", ".join(update_clauses)
-            
-            sql = f"""
-                INSERT INTO stock.{FIN_SUMMARY_TABLE_NAME} ({keys}) 
-                VALUES ({values_placeholders})
-                ON DUPLICATE KEY UPDATE {updates};
-            """
-            try:
-                conn.execute(sql, tuple(row.values()))
-            except Exception as e:
-                logging.error(f"데이터 삽입/업데이트 중 오류 발생 for {row.get('STOCK_CD')} - {row.get('BASE_YEAR')}: {e}")
+    stmt = upsert_statement(tuple(data_list[0].keys()))
+    failed = []
 
-    logging.info(f"{len(data_list)}건 저장 완료 (INSERT ... ON DUPLICATE KEY UPDATE)")
+    with engine.connect() as conn:
+        for start in range(0, len(data_list), batch_size):
+            batch = data_list[start:start + batch_size]
+            try:
+                with conn.begin():
+                    conn.execute(stmt, batch)
+            except DBAPIError as e:
+                # 배치 전체는 롤백되므로 행 단위로 다시 저장해 실패한 행만 제외
+                logging.warning(f"배치 저장 실패 ({start + 1}~{start + len(batch)}행), 행 단위로 재시도: {e.orig}")
+                with conn.begin():
+                    failed += upsert_rows_one_by_one(conn, stmt, batch)
+
+    saved = len(data_list) - len(failed)
+    logging.info(f"{saved}건 저장 완료 (INSERT ... ON DUPLICATE KEY UPDATE), 실패 {len(failed)}건")
+    return saved
 
 # --- 엑셀 저장 ---
 def export_to_excel(data_list, target_year):
@@ -247,6 +247,14 @@ and base_dt >= '20250501'
 ) 
 
 
+-- 연속 순매수 지표 (krx_migrate.py v7, krx_streak.py)
+ALTER TABLE stock.tb_stock_inv_trx_cnt
+    ADD COLUMN INST_CUR_CNT INT,      -- 기준일까지 이어지는 기관 연속 순매수일수
+    ADD COLUMN FORE_CUR_CNT INT,      -- 기준일까지 이어지는 외국인 연속 순매수일수
+    ADD COLUMN INST_RUN_QTY BIGINT,   -- 기관 현재 연속 순매수 기간 순매수 수량
+    ADD COLUMN FORE_RUN_QTY BIGINT;   -- 외국인 현재 연속 순매수 기간 순매수 수량
+
+
 ALTER TABLE stock.tb_stock_inv_trx_cnt  MODIFY COLUMN AVG_TRX_QTY float;
 
 desc stock.tb_stock_inv_trx_cnt
@@ -592,3 +600,147 @@ ALTER DATABASE stock CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci;
 
 
 
+--------------------------------------------------
+
+-- 파이프라인 단계 실행 이력 (krx_ledger.py 에서 없으면 생성)
+CREATE TABLE stock.tb_pipeline_run (
+    BASE_DT     VARCHAR(8)  NOT NULL,
+    STEP_NM     VARCHAR(30) NOT NULL,
+    STATUS      VARCHAR(10) NOT NULL,
+    ROW_CNT     BIGINT,
+    INPUT_HASH  CHAR(64),
+    START_TM    DATETIME,
+    END_TM      DATETIME,
+    PRIMARY KEY (BASE_DT, STEP_NM)
+)
+
+
+select  *
+from stock.tb_pipeline_run
+where 1=1
+and status <> 'done'
+
+--------------------------------------------------
+
+-- 파이프라인 단계 / 구간별 소요 시간 (krx_metrics.py 에서 없으면 생성)
+CREATE TABLE stock.tb_pipeline_metrics (
+    METRIC_ID     BIGINT AUTO_INCREMENT PRIMARY KEY,
+    RUN_ID        VARCHAR(40) NOT NULL,
+    BASE_DT       VARCHAR(8),
+    STEP_NM       VARCHAR(30),
+    PHASE_NM      VARCHAR(50) NOT NULL,
+    START_TM      DATETIME(3),
+    ELAPSED_SEC   DECIMAL(12,3),
+    ROW_CNT       BIGINT,
+    BYTE_CNT      BIGINT,
+    AFFECTED_CNT  BIGINT,
+    STATUS        VARCHAR(10),
+    KEY IX_PIPELINE_METRICS_1 (BASE_DT, STEP_NM),
+    KEY IX_PIPELINE_METRICS_2 (RUN_ID)
+)
+
+
+select  step_nm, phase_nm, count(1), avg(elapsed_sec), max(elapsed_sec)
+from stock.tb_pipeline_metrics
+where 1=1
+and start_tm >= date_sub(now(), interval 30 day)
+group by step_nm, phase_nm
+order by avg(elapsed_sec) desc
+
+--------------------------------------------------
+
+-- 스키마 버전 이력 (krx_migrate.py 에서 없으면 생성, 키 / 인덱스는 krx_migrate.py MIGRATIONS 참고)
+CREATE TABLE stock.tb_schema_version (
+    VERSION     INT PRIMARY KEY,
+    DESCRIPTION VARCHAR(200),
+    APPLIED_TM  DATETIME
+)
+
+
+select  *
+from stock.tb_schema_version
+order by version
+
+--------------------------------------------------
+
+-- 팩트 테이블 압축 전환 (krx_migrate.py v5, krx_storage.py)
+--   실제 데이터 : tb_xxx_data (BASE_DT DATE, STOCK_CD CHAR(6), INV_DIV CHAR(4), STOCK_NM 없음)
+--   원래 이름   : 호환 뷰 (STOCK_NM 은 tb_stock_code 에서 조인)
+--   원본       : tb_xxx_legacy (확인 후 DROP)
+
+desc stock.tb_stock_day_price_data
+
+show create view stock.tb_stock_day_price
+
+select table_name, round(data_length / 1024 / 1024) as data_mb, round(index_length / 1024 / 1024) as index_mb
+from information_schema.tables
+where table_schema = 'stock'
+and (table_name like '%\_data' or table_name like '%\_legacy')
+order by table_name
+
+-- drop table stock.tb_stock_day_price_legacy
+
+
+--------------------------------------------------
+
+-- 투자자별 순매수 누적합 (krx_flow_cum.py, 파이프라인 inv_flow 단계에서 자동 생성)
+--   구간 합계 = 기준일 누적값 - 구간 시작 전 거래일 누적값
+
+CREATE TABLE stock.tb_inv_flow_cum (
+    WORK_SEQ  INT       NOT NULL,
+    INV_DIV   CHAR(4)   NOT NULL,
+    STOCK_CD  CHAR(6)   NOT NULL,
+    BASE_DT   DATE      NOT NULL,
+    CUM_QTY   BIGINT    NOT NULL,
+    CUM_AMT   BIGINT    NOT NULL,
+    PRIMARY KEY (WORK_SEQ, INV_DIV, STOCK_CD),
+    KEY IX_INV_FLOW_CUM_1 (BASE_DT)
+)
+
+
+select work_seq, base_dt, count(1)
+from stock.tb_inv_flow_cum
+group by work_seq, base_dt
+order by 1 desc
+
+
+--------------------------------------------------
+
+-- 매수 등급 규칙 버전별 재평가 결과 (krx_grade.py, 처음 실행 시 자동 생성)
+--   BUY_GRADE 는 적재 전에 krx_grade.GRADE_RULES 로 계산, 새 규칙은 python krx_grade.py RULE_VER FROM TO
+
+CREATE TABLE stock.tb_stock_buy_grade (
+    RULE_VER   INT          NOT NULL,
+    BASE_DT    DATE         NOT NULL,
+    STOCK_CD   CHAR(6)      NOT NULL,
+    BUY_GRADE  VARCHAR(10)  NOT NULL,
+    PRIMARY KEY (RULE_VER, BASE_DT, STOCK_CD)
+)
+
+
+select rule_ver, buy_grade, count(1)
+from stock.tb_stock_buy_grade
+group by rule_ver, buy_grade
+order by 1, 2
+
+
+--------------------------------------------------
+
+-- 종목별 tb_stock_inv_trx_m 수집 빈도 요약 (krx_trx_m_stat.py, 파이프라인 trx_m_stat 단계에서 자동 생성)
+--   거래일 적재 / 재적재 때 해당 거래일만 반영, 전체 재계산은 python krx_trx_m_stat.py --rebuild
+
+CREATE TABLE stock.tb_stock_trx_m_stat (
+    STOCK_CD    CHAR(6)  NOT NULL,
+    APPEAR_CNT  INT      NOT NULL,   -- 등장 횟수
+    FIRST_DT    DATE     NOT NULL,   -- 첫 등장일
+    LAST_DT     DATE     NOT NULL,   -- 마지막 등장일
+    LAST_RUN    INT      NOT NULL,   -- 마지막 등장일까지 연속 등장 거래일 수
+    MAX_RUN     INT      NOT NULL,   -- 최장 연속 등장 거래일 수
+    PRIMARY KEY (STOCK_CD),
+    KEY IX_TRX_M_STAT_1 (LAST_DT)
+)
+
+
+select *
+from stock.tb_stock_trx_m_stat
+order by appear_cnt desc
@@ -0,0 +1,19 @@
+"""
+stock DB 공용 접근 패키지
+
+- get_engine : 프로세스당 하나의 커넥션 풀 엔진 (환경변수 STOCK_DB_* 로 설정)
+- repository : 자주 쓰는 조회 / 저장 함수 (바인딩 파라미터 문장 재사용)
+- 대량 적재 / 기준일 교체는 krx_loader.bulk_load / krx_partition.reload_partition 사용
+
+사용 예)
+    from stockdb import get_engine, repository
+
+    engine = get_engine()
+    days = repository.work_days_between(engine, "20250401", "20250430")
+    prices = repository.day_prices(engine, days[0], days[-1])
+"""
+
+from stockdb.engine import DB_URL, get_engine
+from stockdb import repository
+
+__all__ = ["DB_URL", "get_engine", "repository"]
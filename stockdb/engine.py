@@ -0,0 +1,65 @@
+"""
+프로세스 공용 DB 엔진
+
+- 접속 정보 / 풀 크기는 환경변수로 설정 (없으면 로컬 기본값)
+    STOCK_DB_URL                     : 전체 URL (지정하면 아래 개별 항목 무시)
+    STOCK_DB_USER / STOCK_DB_PASSWORD / STOCK_DB_HOST / STOCK_DB_PORT / STOCK_DB_NAME
+    STOCK_DB_POOL_SIZE / STOCK_DB_MAX_OVERFLOW / STOCK_DB_POOL_RECYCLE
+- get_engine 은 프로세스당 엔진 하나를 만들어 재사용 (병렬 단계 수에 맞춘 커넥션 풀, pre-ping)
+- URL 의 드라이버에 맞춰 LOAD DATA LOCAL INFILE 허용 옵션 지정 (krx_loader.bulk_load 용)
+"""
+
+import os
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+
+DB_USER = os.getenv("STOCK_DB_USER", "root")
+DB_PASSWORD = os.getenv("STOCK_DB_PASSWORD", "")
+DB_HOST = os.getenv("STOCK_DB_HOST", "localhost")
+DB_PORT = os.getenv("STOCK_DB_PORT", "3306")
+DB_NAME = os.getenv("STOCK_DB_NAME", "stock")
+
+DB_URL = os.getenv(
+    "STOCK_DB_URL",
+    f"mysql+mysqlconnector://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8",
+)
+
+# LOAD DATA LOCAL INFILE 허용 접속 옵션 (드라이버별 인자 이름이 다름, 모르는 드라이버는 옵션 없음)
+LOCAL_INFILE_ARGS = {
+    "mysqlconnector": {"allow_local_infile": True},
+    "pymysql": {"local_infile": True},
+    "mysqldb": {"local_infile": 1},
+    "mariadbconnector": {"local_infile": True},
+}
+LOCAL_INFILE_CONNECT_ARGS = LOCAL_INFILE_ARGS.get(make_url(DB_URL).get_driver_name(), {})
+
+# 기본 풀 크기 : 병렬 단계 수(krx_pipeline 기본값 CPU 수) + 메인 스레드
+POOL_SIZE = int(os.getenv("STOCK_DB_POOL_SIZE", str((os.cpu_count() or 4) + 1)))
+MAX_OVERFLOW = int(os.getenv("STOCK_DB_MAX_OVERFLOW", str(POOL_SIZE)))
+
+# MySQL wait_timeout 보다 짧게 커넥션 재생성 (초)
+POOL_RECYCLE = int(os.getenv("STOCK_DB_POOL_RECYCLE", "3600"))
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(pool_size=None, max_overflow=None):
+    """프로세스 공용 엔진. 풀 크기는 처음 생성할 때만 적용"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_engine(
+                DB_URL,
+                pool_size=pool_size or POOL_SIZE,
+                max_overflow=MAX_OVERFLOW if max_overflow is None else max_overflow,
+                pool_pre_ping=True,
+                pool_recycle=POOL_RECYCLE,
+                connect_args=LOCAL_INFILE_CONNECT_ARGS,
+            )
+        return _engine
+
@@ -0,0 +1,129 @@
+"""
+자주 쓰는 조회 / 저장 함수
+
+- 모든 SQL 은 모듈 로드 시 한번 만든 text() 문장에 값만 바인딩 (날짜를 SQL 문자열에 넣지 않음)
+  같은 문장은 SQLAlchemy 컴파일 캐시에서 재사용
+- con 은 Engine 또는 Connection
+- 조회 결과의 BASE_DT / WORK_DAY 는 'YYYYMMDD' 문자열 (압축 전환된 DATE 컬럼도 동일)
+"""
+
+import pandas as pd
+from sqlalchemy import text, bindparam
+from sqlalchemy.engine import Engine
+
+from krx_storage import storage_table
+
+
+DB_SCHEMA = "stock"
+WORK_DIV = "stock"
+
+SELECT_WORK_DAYS = text(f"""
+    SELECT DATE_FORMAT(WORK_DAY, '%Y%m%d') AS WORK_DAY, WORK_SEQ FROM {DB_SCHEMA}.tb_work_day
+    WHERE WORK_DIV = :work_div
+    ORDER BY WORK_SEQ
+""")
+
+SELECT_WORK_DAYS_BETWEEN = text(f"""
+    SELECT DATE_FORMAT(WORK_DAY, '%Y%m%d') AS WORK_DAY FROM {DB_SCHEMA}.tb_work_day
+    WHERE WORK_DIV = :work_div AND WORK_DAY BETWEEN :from_dt AND :to_dt
+    ORDER BY WORK_DAY
+""")
+
+SELECT_STOCK_CODES = text(f"""
+    SELECT STOCK_CD, STOCK_NM, MRKT_DIV FROM {DB_SCHEMA}.tb_stock_code
+""")
+
+SELECT_DAY_PRICES = text(f"""
+    SELECT DATE_FORMAT(BASE_DT, '%Y%m%d') AS BASE_DT, STOCK_CD, STOCK_NM, CLOSE_PRICE, TRADE_QTY
+    FROM {DB_SCHEMA}.tb_stock_day_price
+    WHERE BASE_DT BETWEEN :from_dt AND :to_dt
+""")
+
+SELECT_DAY_PRICE_GAPS = text(f"""
+    SELECT BASE_DT, STOCK_CD, PRICE_GAP_RATE
+    FROM {DB_SCHEMA}.tb_stock_day_price
+    WHERE BASE_DT BETWEEN :from_dt AND :to_dt
+""")
+
+SELECT_INV_NET_BUY_RANGE = text(f"""
+    SELECT BASE_DT, INV_DIV, STOCK_CD, STOCK_NM, TRADE_NET_BUY_QTY, TRADE_NET_BUY_AMT, RANK_AMT, RANK_CNT
+    FROM {DB_SCHEMA}.tb_inv_net_buy_day
+    WHERE BASE_DT BETWEEN :from_dt AND :to_dt
+    AND INV_DIV IN :inv_divs
+""").bindparams(bindparam("inv_divs", expanding=True))
+
+SELECT_INV_TRX_M = text(f"""
+    SELECT * FROM {DB_SCHEMA}.tb_stock_inv_trx_m
+    WHERE BASE_DT = :base_dt
+""")
+
+
+def _format_dates(df, cols=("BASE_DT",)):
+    # DATE 컬럼(date → 'YYYY-MM-DD')과 문자열 컬럼 모두 'YYYYMMDD' 로 맞춤
+    for col in cols:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.replace("-", "", regex=False)
+    return df
+
+
+# --- 조회 ---
+
+def load_work_days(con, work_div=WORK_DIV):
+    """거래일 전체 [(WORK_DAY, WORK_SEQ)] (WORK_SEQ 순)"""
+    if isinstance(con, Engine):
+        with con.connect() as conn:
+            return load_work_days(conn, work_div)
+    return [(row[0], int(row[1])) for row in con.execute(SELECT_WORK_DAYS, {"work_div": work_div})]
+
+
+def work_days_between(con, from_dt, to_dt, work_div=WORK_DIV):
+    """from_dt ~ to_dt 사이 거래일 목록 (양 끝 포함)"""
+    if isinstance(con, Engine):
+        with con.connect() as conn:
+            return work_days_between(conn, from_dt, to_dt, work_div)
+    params = {"work_div": work_div, "from_dt": from_dt, "to_dt": to_dt}
+    return [row[0] for row in con.execute(SELECT_WORK_DAYS_BETWEEN, params)]
+
+
+def stock_codes(con, stock_cds=None):
+    """종목코드, 종목명, 시장구분 (stock_cds 를 주면 해당 종목만)"""
+    df = pd.read_sql(SELECT_STOCK_CODES, con)
+    if stock_cds:
+        df = df[df["STOCK_CD"].isin(stock_cds)]
+    return df.reset_index(drop=True)
+
+
+def day_prices(con, from_dt, to_dt):
+    """기간 내 종목별 종가 / 거래량"""
+    return pd.read_sql(SELECT_DAY_PRICES, con, params={"from_dt": from_dt, "to_dt": to_dt})
+
+
+def day_price_gaps(con, from_dt, to_dt):
+    """기간 내 종목별 등락률"""
+    return _format_dates(pd.read_sql(SELECT_DAY_PRICE_GAPS, con, params={"from_dt": from_dt, "to_dt": to_dt}))
+
+
+def inv_net_buy_range(con, from_dt, to_dt, inv_divs):
+    """기간 내 투자자별 순매수 / 순위 (long 형식, 기간 범위 조회 1번)"""
+    params = {"from_dt": from_dt, "to_dt": to_dt, "inv_divs": list(inv_divs)}
+    return _format_dates(pd.read_sql(SELECT_INV_NET_BUY_RANGE, con, params=params))
+
+
+def inv_trx_m(con, base_dt):
+    """기준일 tb_stock_inv_trx_m 전체 컬럼"""
+    return _format_dates(pd.read_sql(SELECT_INV_TRX_M, con, params={"base_dt": base_dt}))
+
+
+# --- 저장 ---
+
+def delete_stock_range(con, table_name, from_dt, to_dt, stock_cds):
+    """지정 종목의 기간 데이터 삭제 (압축 전환된 테이블은 실제 테이블에서 삭제). 삭제 건수 반환"""
+    if isinstance(con, Engine):
+        with con.begin() as conn:
+            return delete_stock_range(conn, table_name, from_dt, to_dt, stock_cds)
+    sql = text(f"""
+        DELETE FROM {DB_SCHEMA}.{storage_table(con, table_name)}
+        WHERE BASE_DT BETWEEN :from_dt AND :to_dt
+        AND STOCK_CD IN :stock_cds
+    """).bindparams(bindparam("stock_cds", expanding=True))
+    return con.execute(sql, {"from_dt": from_dt, "to_dt": to_dt, "stock_cds": list(stock_cds)}).rowcount
@@ -0,0 +1,133 @@
+"""
+krx_flow_cum 백필 : 중간 구간을 다시 적재해도 구간 이후 누적값이 유지되는지
+
+- tb_inv_flow_cum / tb_work_day / tb_inv_net_buy_day 대신 메모리 저장소(FakeEngine)를 사용
+- 백필 순서는 krx_pipeline.run_backfill 과 같음 (중간 날짜는 BACKFILL_FUNCS, 마지막 날짜는 시작 전 마지막 거래일까지)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import krx_flow_cum
+import krx_pipeline
+from krx_calendar import TradingCalendar
+
+
+DAYS = [f"202501{d:02d}" for d in range(2, 22)]
+STOCKS = ["005930", "000660", "035420"]
+CUM_KEY = ["WORK_SEQ", "INV_DIV", "STOCK_CD"]
+
+
+class FakeResult:
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeConn:
+
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, stmt, params=None):
+        cum = self.store.cum
+        if stmt is krx_flow_cum.SELECT_LAST_SEQ_SQL:
+            return FakeResult(int(cum["WORK_SEQ"].max()) if len(cum) else None)
+        if stmt is krx_flow_cum.DELETE_RANGE_SQL:
+            keep = ~cum["WORK_SEQ"].between(params["from_seq"], params["to_seq"])
+            self.store.cum = cum[keep].reset_index(drop=True)
+        return FakeResult()
+
+
+class FakeEngine:
+
+    def __init__(self, net_buy):
+        self.net_buy = net_buy
+        self.cum = pd.DataFrame(columns=[*CUM_KEY, "BASE_DT", "CUM_QTY", "CUM_AMT"])
+
+    def connect(self):
+        return FakeConn(self)
+
+    def begin(self):
+        return FakeConn(self)
+
+
+def make_net_buy(seed):
+    rng = np.random.default_rng(seed)
+    rows = [
+        (day, inv, stock, int(rng.integers(-1000, 1000)), int(rng.integers(-10**6, 10**6)))
+        for i, day in enumerate(DAYS)
+        for inv, _ in krx_flow_cum.FLOW_INVESTORS
+        for j, stock in enumerate(STOCKS)
+        if i >= j * 3 and rng.random() < 0.8   # 뒤 종목일수록 늦게 첫 등장
+    ]
+    return pd.DataFrame(rows, columns=["BASE_DT", "INV_DIV", "STOCK_CD", "TRADE_NET_BUY_QTY", "TRADE_NET_BUY_AMT"])
+
+
+@pytest.fixture(autouse=True)
+def fake_db(monkeypatch):
+    calendar = TradingCalendar(DAYS, list(range(1, len(DAYS) + 1)))
+
+    def load_cum(con, seqs):
+        return con.cum[con.cum["WORK_SEQ"].isin([int(seq) for seq in seqs])].reset_index(drop=True)
+
+    def inv_net_buy_range(con, from_dt, to_dt, inv_divs):
+        df = con.net_buy
+        return df[df["BASE_DT"].between(from_dt, to_dt) & df["INV_DIV"].isin(inv_divs)].reset_index(drop=True)
+
+    def bulk_load(df, table_name, con):
+        con.store.cum = pd.concat([con.store.cum, df], ignore_index=True)
+        return len(df)
+
+    monkeypatch.setattr(krx_flow_cum, "get_calendar", lambda engine=None: calendar)
+    monkeypatch.setattr(krx_flow_cum, "ensure_table", lambda engine: None)
+    monkeypatch.setattr(krx_flow_cum, "load_cum", load_cum)
+    monkeypatch.setattr(krx_flow_cum, "bulk_load", bulk_load)
+    monkeypatch.setattr(krx_flow_cum.repository, "inv_net_buy_range", inv_net_buy_range)
+
+
+def saved(engine):
+    df = engine.cum[[*CUM_KEY, "BASE_DT", "CUM_QTY", "CUM_AMT"]].astype(
+        {"WORK_SEQ": "int64", "INV_DIV": str, "STOCK_CD": str, "BASE_DT": str, "CUM_QTY": "int64", "CUM_AMT": "int64"})
+    return df.sort_values(CUM_KEY).reset_index(drop=True)
+
+
+def backfill(engine, dates):
+    """krx_pipeline.run_backfill 의 inv_flow 실행 순서"""
+    mid_func, last_day = krx_pipeline.BACKFILL_FUNCS["inv_flow"]
+    end_dt = last_day(engine)
+    for i, base_dt in enumerate(dates):
+        if i + 1 < len(dates):
+            mid_func(base_dt, engine)
+        else:
+            krx_flow_cum.append_day(base_dt, engine, to_dt=end_dt)
+
+
+def test_backfill_middle_range_keeps_later_rows():
+    old, new = make_net_buy(1), make_net_buy(2)
+    reload_days = DAYS[5:10]
+
+    # 처음 적재 후 중간 구간 순매수만 바뀐 상태
+    engine = FakeEngine(old)
+    krx_flow_cum.rebuild(engine)
+    engine.net_buy = pd.concat([old[~old["BASE_DT"].isin(reload_days)],
+                                new[new["BASE_DT"].isin(reload_days)]], ignore_index=True)
+
+    expected = FakeEngine(engine.net_buy)
+    krx_flow_cum.rebuild(expected)
+
+    backfill(engine, reload_days)
+
+    result = saved(engine)
+    assert result["BASE_DT"].max() == DAYS[-1]
+    pd.testing.assert_frame_equal(result, saved(expected))